@@ -11,10 +11,14 @@ EASY SOLUTION:
 OR use this script to try RSS feed extraction (works for some threads)
 """
 
-import requests
-from bs4 import BeautifulSoup
+import sys
 from pathlib import Path
-import time
+
+# The poller lives in src/ and imports its sibling modules by bare name
+sys.path.append(str(Path(__file__).parent / "src"))
+
+from ingestion import DataIngestor
+from tinto_poller import TintoPoller
 
 # ========================================  
 # 📋 PASTE YOUR TINTO TALKS URLs HERE
@@ -25,43 +29,6 @@ TINTO_TALKS_URLS = [
     
 ]
 
-def scrape_forum_rss(url):
-    """Try to scrape Paradox forum thread via RSS feed"""
-    try:
-        # Extract thread slug from URL
-        # URL: .../developer-diary/tinto-talks-5-march-27th-2024.1647775/
-        # RSS: https://forum.paradoxplaza.com/forum/threads/tinto-talks-5-march-27th-2024.1647775/index.rss
-        
-        path_parts = url.rstrip('/').split('/')
-        thread_slug_id = path_parts[-1]
-        
-        rss_url = f"https://forum.paradoxplaza.com/forum/threads/{thread_slug_id}/index.rss"
-        
-        print(f"  📡 Trying RSS: {rss_url}")
-        response = requests.get(rss_url, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'xml')
-        items = soup.find_all('item')
-        
-        if not items:
-            return None, "No posts found in RSS feed"
-        
-        posts = []
-        for i, item in enumerate(items, 1):
-            description = item.find('description')
-            if description:
-                desc_soup = BeautifulSoup(description.text, 'html.parser')
-                post_text = desc_soup.get_text(separator='\n', strip=True)
-                posts.append(f"=== Post {i} ===\n{post_text}")
-        
-        content = '\n\n---\n\n'.join(posts)
-        return content, None
-    
-    except Exception as e:
-        return None, str(e)
-
-
 if __name__ == "__main__":
     print("🌍 EU5 Oracle - Tinto Talks Ingestion")
     print("=" * 60)
@@ -80,38 +47,15 @@ if __name__ == "__main__":
         print("  (May not work for all forum threads)")
         exit(1)
     
-    print(f"📥 Found {len(TINTO_TALKS_URLS)} URLs to process\n")
-    
-    manual_dir = Path("manual_sources")
-    manual_dir.mkdir(exist_ok=True)
-    
-    success = 0
-    failed = 0
+    print(f"📥 Polling {len(TINTO_TALKS_URLS)} threads\n")
     
-    for i, url in enumerate(TINTO_TALKS_URLS, 1):
-        print(f"[{i}/{len(TINTO_TALKS_URLS)}] {url}")
-        
-        content, error = scrape_forum_rss(url)
-        
-        if content:
-            # Save to manual_sources
-            filename = f"tinto_talk_{i}.txt"
-            filepath = manual_dir / filename
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"Source: Tinto Talks (Paradox Forum)\n")
-                f.write(f"URL: {url}\n\n")
-                f.write(content)
-           
-            print(f"  ✅ Saved to manual_sources/{filename}")
-            success += 1
-        else:
-            print(f"  ❌ Failed: {error}")
-            print(f"  💡 Manual copy-paste recommended")
-            failed += 1
-        
-        time.sleep(1)  # Be polite to server
+    # Only posts newer than the last run are fetched and appended; unchanged threads cost a 304
+    data_dir = Path(__file__).parent / "data"
+    changed = TintoPoller(DataIngestor(str(data_dir)), urls=TINTO_TALKS_URLS).poll()
     
     print(f"\n{'=' * 60}")
-    print(f"📊 Summary: ✅ {success} success, ❌ {failed} failed")
-    print(f"\n🔄 Next: Delete chroma_db/ and restart app to rebuild index!")
+    print(f"📊 Summary: {len(changed)} threads with new posts")
+    for filename in changed:
+        print(f"  ✅ data/{filename}")
+    if changed:
+        print(f"\n🔄 Next: Run 'python src/index_versions.py' to build and promote a fresh index (the app keeps serving meanwhile)!")
@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests and queue length each backend accepts. Ollama answers one
+# request per loaded model at a time unless OLLAMA_NUM_PARALLEL is raised.
+BACKEND_LIMITS = {
+    "Local (Ollama)": {
+        "max_concurrent": int(os.getenv("EU5_OLLAMA_CONCURRENCY", "1")),
+        "max_queue": int(os.getenv("EU5_OLLAMA_MAX_QUEUE", "8")),
+    },
+    "Groq": {"max_concurrent": 8, "max_queue": 32},
+}
+
+# Longest a question waits for a slot; Ollama's own 300s timeout starts only after admission
+MAX_WAIT_SECONDS = float(os.getenv("EU5_MAX_QUEUE_WAIT", "120"))
+
+# Once this many questions are waiting for Ollama, new ones go to Groq when a key is available
+DIVERT_QUEUE_LENGTH = int(os.getenv("EU5_DIVERT_QUEUE_LENGTH", "3"))
+DIVERT_PROVIDER = "Groq"
+DIVERT_MODEL = "llama3-8b-8192"
+
+
+class QueueFull(Exception):
+    """Raised when a backend's queue is full or a question waited longer than allowed."""
+
+
+class AdmissionCancelled(Exception):
+    """Raised when a waiting question is cancelled before it got a slot."""
+
+
+class AdmissionQueue:
+    """
+    FIFO admission control for one LLM backend, shared by every session in the process.
+    At most max_concurrent questions run at once; later ones wait in arrival order and
+    are told their position. Past max_queue waiting questions, new ones are rejected
+    instead of piling onto the backend until everyone times out.
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 1, max_queue: int = 8,
+                 max_wait: float = MAX_WAIT_SECONDS):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting: Deque[object] = deque()
+        self._active = 0
+        # Recent queue times only, so the percentiles follow current load
+        self._wait_times: Deque[float] = deque(maxlen=500)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.diverted = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def should_divert(self, queue_length: int = DIVERT_QUEUE_LENGTH) -> bool:
+        return self._active >= self.max_concurrent and len(self._waiting) >= queue_length
+
+    def record_divert(self) -> None:
+        with self._cond:
+            self.diverted += 1
+
+    @contextmanager
+    def admit(self, on_wait: Optional[Callable[[int], None]] = None, poll: float = 0.5,
+              cancel: Optional[threading.Event] = None) -> Iterator[float]:
+        """
+        Holds a slot for the duration of the block and yields the seconds spent queued.
+        on_wait is called with the 1-based queue position whenever it changes, outside the lock.
+        Setting cancel while still queued gives up the place in line (AdmissionCancelled).
+        """
+        ticket = object()
+        enqueued = time.monotonic()
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{self.name} is busy ({len(self._waiting)} questions waiting)")
+            self._waiting.append(ticket)
+
+        try:
+            waited = self._wait_for_slot(ticket, enqueued, on_wait, poll, cancel)
+        except BaseException:
+            # Timed out, or the session went away mid-wait (Streamlit stops reruns with an exception)
+            with self._cond:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._cond.notify_all()
+            raise
+
+        if waited > 1:
+            logger.info(f"{self.name}: admitted after {waited:.1f}s in queue")
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _wait_for_slot(self, ticket: object, enqueued: float,
+                       on_wait: Optional[Callable[[int], None]], poll: float,
+                       cancel: Optional[threading.Event]) -> float:
+        last_position = None
+        while True:
+            with self._cond:
+                if self._waiting[0] is ticket and self._active < self.max_concurrent:
+                    self._waiting.popleft()
+                    self._active += 1
+                    self.admitted += 1
+                    waited = time.monotonic() - enqueued
+                    self._wait_times.append(waited)
+                    # The next in line may be admissible too when max_concurrent > 1
+                    self._cond.notify_all()
+                    return waited
+                if cancel is not None and cancel.is_set():
+                    raise AdmissionCancelled(f"Left the {self.name} queue")
+                if time.monotonic() - enqueued >= self.max_wait:
+                    self.timed_out += 1
+                    raise QueueFull(f"{self.name} did not free up within {self.max_wait:.0f}s")
+                position = self._waiting.index(ticket) + 1
+                if position == last_position or on_wait is None:
+                    self._cond.wait(timeout=poll)
+                    continue
+            last_position = position
+            on_wait(position)
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._wait_times)
+            stats = {"active": self._active, "waiting": len(self._waiting), "admitted": self.admitted,
+                     "rejected": self.rejected, "timed_out": self.timed_out, "diverted": self.diverted}
+        for q in (50, 95):
+            stats[f"wait_p{q}_ms"] = round(waits[min(len(waits) - 1, len(waits) * q // 100)] * 1000) if waits else 0
+        return stats
+
+
+_QUEUES: Dict[str, AdmissionQueue] = {}
+_QUEUES_LOCK = threading.Lock()
+
+
+def backend_queue(provider: str) -> AdmissionQueue:
+    """The process-wide queue for a provider, created on first use."""
+    with _QUEUES_LOCK:
+        if provider not in _QUEUES:
+            _QUEUES[provider] = AdmissionQueue(provider, **BACKEND_LIMITS.get(provider, {}))
+        return _QUEUES[provider]
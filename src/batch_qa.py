@@ -0,0 +1,205 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from benchmarking import collect_stages
+from manifest import CorpusManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRIES = 2
+# Seconds before the first retry, doubled for every further one
+RETRY_BACKOFF = 2.0
+
+
+def read_questions(path: Path) -> List[dict]:
+    """
+    Questions from a JSONL file, one {"question": ...} object per line.
+    Other fields are copied to the output; "id" defaults to the line number.
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record["id"] = str(record.get("id", lineno))
+            questions.append(record)
+    return questions
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """
+    Ids already answered in an existing output file. Failed records are not counted,
+    so a resumed run retries them; a line cut off by a crash is ignored.
+    """
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "answer" in record:
+                done.add(str(record["id"]))
+    return done
+
+
+def _end_with_newline(path: Path) -> None:
+    """Terminates a line cut off by a crash, so appended records start on their own line."""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, 2)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def source_records(response: Any, manifest: Optional[CorpusManifest] = None) -> List[dict]:
+    """The retrieved chunks behind an answer: file, URL (from the manifest), date and score."""
+    sources = []
+    for n in getattr(response, "source_nodes", None) or []:
+        filename = n.node.ref_doc_id
+        entry = manifest.get(filename) if manifest is not None and filename else None
+        sources.append({
+            "file": filename,
+            "url": (entry or {}).get("url"),
+            "date": n.node.metadata.get("date"),
+            "score": round(n.score, 4) if n.score is not None else None,
+        })
+    return sources
+
+
+class BatchRunner:
+    """
+    Answers a list of questions concurrently through the regular chat engine.
+    Each worker thread keeps one engine and resets its memory per question, so questions
+    stay independent. Results are appended to the output as they finish, which is what
+    makes an interrupted run resumable.
+    """
+
+    def __init__(self, make_engine: Callable[[], Any], workers: int = 1, retries: int = DEFAULT_RETRIES,
+                 backoff: float = RETRY_BACKOFF, manifest: Optional[CorpusManifest] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            make_engine: Builds a chat engine; called once per worker thread.
+            workers: Questions in flight at once. Match it to the LLM backend's capacity.
+            retries: Extra attempts per question after a failure.
+            backoff: Seconds before the first retry, doubled for each further one.
+            manifest: Corpus manifest used to resolve source URLs.
+            extra: Fields added to every output record (e.g. model and index version).
+        """
+        self.make_engine = make_engine
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.manifest = manifest
+        self.extra = extra or {}
+        self._local = threading.local()
+
+    def _engine(self) -> Any:
+        if getattr(self._local, "engine", None) is None:
+            self._local.engine = self.make_engine()
+        return self._local.engine
+
+    def answer(self, record: dict) -> dict:
+        """Answers one question, retrying failures; returns the output record."""
+        for attempt in range(1, self.retries + 2):
+            engine = self._engine()
+            engine.reset()
+            start = time.perf_counter()
+            try:
+                with collect_stages() as stages:
+                    response = engine.chat(record["question"])
+            except Exception as e:
+                logger.warning(f"Question {record['id']} failed (attempt {attempt}): {e}")
+                if attempt <= self.retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                    continue
+                return {**record, **self.extra, "error": str(e), "attempts": attempt}
+
+            total = time.perf_counter() - start
+            retrieve = stages.get("retrieve", 0.0)
+            return {
+                **record,
+                **self.extra,
+                "answer": str(response).strip(),
+                "sources": source_records(response, self.manifest),
+                "timings": {"retrieve_ms": round(retrieve * 1000, 1),
+                            "llm_ms": round((total - retrieve) * 1000, 1),
+                            "total_ms": round(total * 1000, 1)},
+                "attempts": attempt,
+            }
+
+    def run(self, questions: List[dict], output_path: Path) -> dict:
+        """Answers every question not yet in output_path and appends the results. Returns a summary."""
+        done = completed_ids(output_path)
+        todo = [q for q in questions if q["id"] not in done]
+        logger.info(f"{len(todo)} questions to answer, {len(questions) - len(todo)} already done")
+
+        _end_with_newline(output_path)
+        answered = failed = 0
+        start = time.perf_counter()
+        # Only this thread writes, so lines from different workers never interleave
+        with open(output_path, "a", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.answer, q) for q in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                if "answer" in result:
+                    answered += 1
+                else:
+                    failed += 1
+        elapsed = time.perf_counter() - start
+        return {
+            "skipped": len(questions) - len(todo),
+            "answered": answered,
+            "failed": failed,
+            "seconds": round(elapsed, 1),
+            "questions_per_minute": round(answered / elapsed * 60, 1) if elapsed and answered else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    from admission import BACKEND_LIMITS
+    from llm_factory import get_llm
+    from benchmarking import TimedRetriever
+    from rag_engine import RAGEngine
+
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with the Oracle.")
+    parser.add_argument("input", help="JSONL with one {\"question\": ...} per line")
+    parser.add_argument("output", help="JSONL answers; re-running resumes where it stopped")
+    parser.add_argument("--provider", default="Local (Ollama)", choices=list(BACKEND_LIMITS))
+    parser.add_argument("--model", default="llama3.1:8b")
+    parser.add_argument("--workers", type=int, help="Questions in flight (default: the backend's concurrency limit)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    rag_engine = RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db"))
+    llm = get_llm(args.provider, args.model)
+
+    def make_engine():
+        engine = rag_engine.get_chat_engine(llm)
+        engine._retriever = TimedRetriever(engine._retriever)
+        return engine
+
+    workers = args.workers or BACKEND_LIMITS[args.provider]["max_concurrent"]
+    runner = BatchRunner(make_engine, workers=workers, retries=args.retries,
+                         manifest=CorpusManifest(str(root_dir / "data")),
+                         extra={"provider": args.provider, "model": args.model,
+                                "index_version": rag_engine.collection_name})
+    summary = runner.run(read_questions(Path(args.input)), Path(args.output))
+    print(f"✅ {summary['answered']} answered, {summary['failed']} failed, {summary['skipped']} already done "
+          f"in {summary['seconds']}s ({summary['questions_per_minute']} questions/min)")
@@ -0,0 +1,83 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+# Shared by load_test.py, batch_qa.py, faq_store.py and query_log.py, so the production
+# CLIs need not import the load-test harness.
+
+# Asked by the load test, and precomputed by the FAQ job when no curated list is given
+DEFAULT_QUESTIONS = [
+    "How do estates work?",
+    "What is the best way to increase control in newly conquered provinces?",
+    "How does production work in EU5?",
+    "What are the differences between the burghers and the nobility?",
+    "How do I form a trade company?",
+    "What does the crown power mechanic do?",
+    "How should I prepare for my first war as Castile?",
+    "How do laws get passed?",
+    "What affects population growth?",
+    "How does naval combat work?",
+    "What is the best opening for Portugal?",
+    "How do I deal with rebels?",
+]
+
+# --- Per-request stage timings ---
+# Every request (a simulated user, a batch question) runs on its own thread and the chat
+# engine is synchronous, so the stage hooks below find the current request through a thread-local.
+_current = threading.local()
+
+
+@contextmanager
+def stage(name: str):
+    """Adds the wall time of the block to the current request's `name` stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = getattr(_current, "stages", None)
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def collect_stages():
+    """Yields the dict the stages recorded on this thread during the block are added to."""
+    _current.stages = stages = {}
+    try:
+        yield stages
+    finally:
+        _current.stages = None
+
+
+def record_stage(name: str, seconds: float) -> None:
+    stages = getattr(_current, "stages", None)
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+
+class TimedRetriever(BaseRetriever):
+    """Wraps the chat engine's retriever to time the retrieval stage (embedding + search)."""
+
+    def __init__(self, inner: BaseRetriever):
+        self._inner = inner
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        with stage("retrieve"):
+            return self._inner.retrieve(query_bundle)
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import random
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chunks at least this similar (estimated Jaccard of word shingles) count as duplicates
+DUPLICATE_THRESHOLD = 0.85
+
+# Sources listed first win when the same text appears in several places:
+# wiki pages, then Tinto Talks from RSS, then manual pastes and transcripts
+SOURCE_PRIORITY = ("", "tinto_", "manual_", "youtube_")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def source_rank(filename: str) -> int:
+    """Sort key that puts the most authoritative copy of a text first."""
+    for rank, prefix in enumerate(SOURCE_PRIORITY[1:], start=1):
+        if filename.startswith(prefix):
+            return rank
+    return 0
+
+
+class NearDuplicateFilter:
+    """
+    MinHash + LSH near-duplicate detector for chunks.
+    Each chunk is reduced to a signature of num_perm minimum shingle hashes; signatures are
+    split into bands, and only chunks sharing a band bucket are compared. The first chunk
+    seen is kept, later near-copies are reported as duplicates of it.
+    Pure Python: a signature costs a couple of milliseconds, far below the embedding it saves.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, num_perm: int = 64,
+                 bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(32) for _ in range(num_perm)]
+        self._exact: Dict[str, str] = {}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+        self.stats = {"checked": 0, "duplicates": 0, "duplicate_chars": 0}
+        self.dropped_by_doc: Counter = Counter()
+        self._doc_of: Dict[str, str] = {}
+        # Document of a kept chunk -> documents that had a near-copy of it dropped
+        self.duplicates_of: Dict[str, Set[str]] = defaultdict(set)
+
+    def _words(self, text: str) -> List[str]:
+        return _WORD_RE.findall(text.lower())
+
+    def signature(self, words: Sequence[str]) -> Optional[Tuple[int, ...]]:
+        """MinHash signature of the word shingles, or None for chunks too short to shingle."""
+        n = self.shingle_size
+        if len(words) < n:
+            return None
+        hashes = {zlib.crc32(" ".join(words[i:i + n]).encode("utf-8")) for i in range(len(words) - n + 1)}
+        # One base hash XOR-ed with random masks stands in for num_perm independent hash functions
+        return tuple(min(map(mask.__xor__, hashes)) for mask in self._masks)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / self.num_perm
+
+    def add(self, chunk_id: str, text: str, doc_id: Optional[str] = None) -> Optional[str]:
+        """
+        Registers a chunk. Returns the id of an earlier chunk it duplicates (in which case
+        it is not registered), or None if the chunk is new.
+        With doc_id, later copies of the chunk are attributed to that document in duplicates_of.
+        """
+        words = self._words(text)
+        exact_key = hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+        if exact_key in self._exact:
+            return self._exact[exact_key]
+
+        signature = self.signature(words)
+        if signature is not None:
+            candidates = {cid for key in self._band_keys(signature) for cid in self._buckets.get(key, ())}
+            for candidate in candidates:
+                if self._similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    return candidate
+
+        self._exact[exact_key] = chunk_id
+        if doc_id is not None:
+            self._doc_of[chunk_id] = doc_id
+        if signature is not None:
+            self._signatures[chunk_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets[key].append(chunk_id)
+        return None
+
+    def filter(self, nodes: list) -> list:
+        """Returns the nodes that are not near-duplicates of anything seen so far."""
+        kept = []
+        for node in nodes:
+            text = node.get_content()
+            self.stats["checked"] += 1
+            original = self.add(node.node_id, text, node.ref_doc_id)
+            if original is None:
+                kept.append(node)
+            else:
+                self.stats["duplicates"] += 1
+                self.stats["duplicate_chars"] += len(text)
+                self.dropped_by_doc[node.ref_doc_id] += 1
+                winner = self._doc_of.get(original)
+                if winner is not None and winner != node.ref_doc_id:
+                    self.duplicates_of[winner].add(node.ref_doc_id)
+        return kept
+
+    def log_report(self) -> None:
+        """Logs how much the dedup stage saved and which files contributed the most copies."""
+        checked, dropped = self.stats["checked"], self.stats["duplicates"]
+        if not checked:
+            return
+        logger.info(
+            f"Dedup: dropped {dropped}/{checked} chunks ({dropped / checked:.1%}), "
+            f"{self.stats['duplicate_chars']:,} chars not embedded"
+        )
+        for doc_id, count in self.dropped_by_doc.most_common(5):
+            logger.info(f"Dedup:   {doc_id}: {count} duplicate chunks")
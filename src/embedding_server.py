@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+import requests
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+from json_store import JsonRequestHandler
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+
+# Set to e.g. http://127.0.0.1:8765 to make every RAGEngine use the shared server
+EMBED_SERVER_ENV = "EU5_EMBED_SERVER_URL"
+DEFAULT_PORT = 8765
+
+# Query and passage embeddings use different bge instructions, so they are batched separately
+KINDS = ("query", "text")
+
+
+def create_embed_model() -> BaseEmbedding:
+    """
+    The embedding model RAGEngine should use: the shared server when EU5_EMBED_SERVER_URL
+    is set, otherwise an in-process bge-small.
+    """
+    server_url = os.getenv(EMBED_SERVER_ENV)
+    if server_url:
+        return RemoteEmbedding(server_url=server_url)
+    # Imported here because it pulls in torch, which workers using the server never need
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
+
+
+class _Request:
+    def __init__(self, texts: List[str], kind: str):
+        self.texts = texts
+        self.kind = kind
+        self.done = threading.Event()
+        self.result: Optional[List[List[float]]] = None
+        self.error: Optional[Exception] = None
+
+
+class DynamicBatcher:
+    """
+    Collects concurrent embedding requests into batches for one model instance.
+    A single worker thread takes the first waiting request, then keeps adding requests
+    for up to max_wait seconds or until max_batch_size texts are queued, and embeds
+    each kind with one model call.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str], str], List[List[float]]],
+                 max_batch_size: int = 64, max_wait: float = 0.005):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        threading.Thread(target=self._run, daemon=True, name="embed-batcher").start()
+
+    def submit(self, texts: List[str], kind: str = "text") -> List[List[float]]:
+        """Blocks until the texts have been embedded as part of some batch."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown embedding kind: {kind}")
+        request = _Request(texts, kind)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            for kind in KINDS:
+                requests_of_kind = [r for r in batch if r.kind == kind]
+                if not requests_of_kind:
+                    continue
+                texts = [text for r in requests_of_kind for text in r.texts]
+                try:
+                    embeddings = self.embed_batch(texts, kind)
+                except Exception as e:
+                    for r in requests_of_kind:
+                        r.error = e
+                        r.done.set()
+                    continue
+                self.stats["batches"] += 1
+                self.stats["texts"] += len(texts)
+                self.stats["requests"] += len(requests_of_kind)
+                offset = 0
+                for r in requests_of_kind:
+                    r.result = embeddings[offset:offset + len(r.texts)]
+                    offset += len(r.texts)
+                    r.done.set()
+
+
+def make_server(batcher: DynamicBatcher, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                model_name: str = EMBED_MODEL_NAME) -> ThreadingHTTPServer:
+    """
+    HTTP front end: POST /embed {"texts": [...], "kind": "query"|"text"} -> {"embeddings": [...]},
+    GET /health -> model name and batching stats. Each connection gets a thread; they all
+    feed the same batcher.
+    """
+
+    class Handler(JsonRequestHandler):
+        def do_GET(self):
+            if self.path != "/health":
+                return self._send(404, {"error": "not found"})
+            stats = dict(batcher.stats)
+            stats["avg_batch_texts"] = round(stats["texts"] / stats["batches"], 1) if stats["batches"] else 0.0
+            self._send(200, {"model": model_name, **stats})
+
+        def do_POST(self):
+            if self.path != "/embed":
+                return self._send(404, {"error": "not found"})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts = payload["texts"]
+                # Checked here: a bad entry would otherwise fail the whole batch it joins
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be a list of strings")
+                embeddings = batcher.submit(texts, payload.get("kind", "text"))
+            except (ValueError, KeyError) as e:
+                return self._send(400, {"error": str(e)})
+            except Exception as e:
+                logger.error(f"Embedding failed: {e}")
+                return self._send(500, {"error": str(e)})
+            self._send(200, {"embeddings": embeddings})
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+class RemoteEmbedding(BaseEmbedding):
+    """LlamaIndex embedding model backed by the shared embedding server."""
+
+    server_url: str = Field(description="Base URL of the embedding server.")
+    timeout: float = Field(default=60.0, description="Request timeout in seconds.")
+
+    _session: requests.Session = PrivateAttr()
+
+    def __init__(self, server_url: str, model_name: str = EMBED_MODEL_NAME, embed_batch_size: int = 64, **kwargs):
+        # model_name matches the local model so query-cache keys stay valid either way
+        super().__init__(server_url=server_url.rstrip("/"), model_name=model_name,
+                         embed_batch_size=embed_batch_size, **kwargs)
+        self._session = requests.Session()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RemoteEmbedding"
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        response = self._session.post(f"{self.server_url}/embed", json={"texts": texts, "kind": kind},
+                                      timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query], "query")[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text], "text")[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "text")
+
+
+if __name__ == "__main__":
+    import argparse
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    parser = argparse.ArgumentParser(description="Shared bge-small embedding server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    model = HuggingFaceEmbedding(model_name=EMBED_MODEL_NAME)
+    # _embed takes a list and the bge instruction name, so both kinds are one batched forward pass
+    batcher = DynamicBatcher(lambda texts, kind: model._embed(texts, prompt_name=kind),
+                             max_batch_size=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    server = make_server(batcher, args.host, args.port)
+    print(f"🧮 Embedding server for {EMBED_MODEL_NAME} on http://{args.host}:{args.port}")
+    print(f"   Point workers at it with {EMBED_SERVER_ENV}=http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,180 @@
+import argparse
+import json
+import logging
+import math
+import operator
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from json_store import write_json
+from query_cache import cached_query_embedding, normalize_query
+
+logger = logging.getLogger(__name__)
+
+FAQ_DIRNAME = "faq"
+
+# Cosine similarity on bge-small query embeddings above which a stored answer is served.
+# Rephrasings of the same question score ~0.93+, related but different questions lower.
+MATCH_THRESHOLD = float(os.getenv("EU5_FAQ_THRESHOLD", "0.93"))
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class FaqStore:
+    """
+    Precomputed answers for frequent questions, one JSON file per index version
+    (chroma_db/faq/<collection>.json), so a refresh never serves answers built on old content.
+    Lookups embed the query once (through the shared query-embedding cache, which retrieval
+    reuses on a miss) and compare it with every stored question; a few hundred entries
+    take a few milliseconds.
+    The file is re-read when its mtime changes, so answers precomputed for the live version
+    by another process are served without a restart.
+    """
+
+    def __init__(self, chroma_dir: str, index_version: str, threshold: float = MATCH_THRESHOLD):
+        self.dir = Path(chroma_dir) / FAQ_DIRNAME
+        self.index_version = index_version
+        self.path = self.dir / f"{index_version}.json"
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self.entries: List[dict] = []
+        self._vectors: List[List[float]] = []
+        self._reload_if_changed()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> List[dict]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))["entries"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _reload_if_changed(self) -> None:
+        """One stat() per call; the file is only parsed again after save() or the FAQ job replaced it."""
+        try:
+            stat = self.path.stat()
+            # save() replaces the file, so the inode changes even within one mtime tick
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return
+        entries = self._load() if signature is not None else []
+        vectors = [_unit(e["embedding"]) for e in entries]
+        with self._lock:
+            self.entries, self._vectors, self._signature = entries, vectors, signature
+        if entries:
+            logger.info(f"Loaded {len(entries)} FAQ answers for {self.index_version}")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self, entries: List[dict]) -> None:
+        """Replaces the stored answers atomically (tmp file + rename)."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        write_json(self.path, {"index_version": self.index_version, "entries": entries})
+        self._reload_if_changed()
+
+    def match(self, embedding: List[float]) -> Optional[Tuple[dict, float]]:
+        """The closest stored entry and its similarity, if it clears the threshold."""
+        with self._lock:
+            entries, vectors = self.entries, self._vectors
+        if not vectors:
+            return None
+        query = _unit(embedding)
+        score, best = max((sum(map(operator.mul, query, vector)), i) for i, vector in enumerate(vectors))
+        if score < self.threshold:
+            return None
+        return entries[best], score
+
+    def lookup(self, query: str, embed_model=None) -> Optional[dict]:
+        """Stored entry answering `query`, or None to fall through to the LLM."""
+        self._reload_if_changed()
+        if not self.entries:
+            return None
+        result = self.match(cached_query_embedding(normalize_query(query), embed_model))
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        entry, score = result
+        logger.info(f"FAQ hit ({score:.3f}): {query[:60]!r} -> {entry['question'][:60]!r}")
+        return entry
+
+    def stats(self) -> dict:
+        self._reload_if_changed()
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def build_entries(answers: List[dict], embed_model) -> List[dict]:
+    """FAQ entries from batch_qa output records; failed questions are left out."""
+    answered = [r for r in answers if "answer" in r]
+    embeddings = [cached_query_embedding(normalize_query(r["question"]), embed_model) for r in answered]
+    return [{"question": r["question"], "answer": r["answer"], "sources": r.get("sources", []),
+             "embedding": embedding} for r, embedding in zip(answered, embeddings)]
+
+
+def read_question_list(path: Path) -> List[dict]:
+    """Questions from a JSONL file (as for batch_qa) or a plain text file with one per line."""
+    from batch_qa import read_questions
+    if path.suffix == ".jsonl":
+        return read_questions(path)
+    lines = [line.strip() for line in path.read_text(encoding="utf-8").splitlines()]
+    return [{"id": str(i), "question": q} for i, q in enumerate(lines, 1) if q]
+
+
+if __name__ == "__main__":
+    from admission import BACKEND_LIMITS
+    from batch_qa import BatchRunner
+    from llama_index.core import Settings
+    from llm_factory import get_llm
+    from benchmarking import DEFAULT_QUESTIONS
+    from manifest import CorpusManifest
+    from rag_engine import RAGEngine
+
+    parser = argparse.ArgumentParser(description="Precompute FAQ answers for the live index version.")
+    parser.add_argument("--questions", help="Curated question list (.jsonl or one question per line)")
+    parser.add_argument("--provider", default="Local (Ollama)", choices=list(BACKEND_LIMITS))
+    parser.add_argument("--model", default="llama3.1:8b")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    rag_engine = RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db"))
+    store = FaqStore(str(root_dir / "chroma_db"), rag_engine.collection_name)
+    if args.questions:
+        questions = read_question_list(Path(args.questions))
+    else:
+        questions = [{"id": str(i), "question": q} for i, q in enumerate(DEFAULT_QUESTIONS, 1)]
+
+    llm = get_llm(args.provider, args.model)
+    runner = BatchRunner(lambda: rag_engine.get_chat_engine(llm),
+                         workers=args.workers or BACKEND_LIMITS[args.provider]["max_concurrent"],
+                         manifest=CorpusManifest(str(root_dir / "data")),
+                         extra={"model": args.model, "index_version": rag_engine.collection_name})
+    # Answers go through batch_qa's resumable JSONL first, so an interrupted run picks up where it stopped
+    answers_path = store.dir / f"{rag_engine.collection_name}.answers.jsonl"
+    store.dir.mkdir(parents=True, exist_ok=True)
+    print(f"📚 Precomputing {len(questions)} FAQ answers for {rag_engine.collection_name}...")
+    summary = runner.run(questions, answers_path)
+
+    with open(answers_path, "r", encoding="utf-8") as f:
+        latest = {}
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            latest[record["question"]] = record
+    store.save(build_entries(list(latest.values()), Settings.embed_model))
+    print(f"✅ {len(store)} FAQ answers stored in {store.path} ({summary['failed']} failed)")
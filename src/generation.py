@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from llama_index.core.chat_engine import ContextChatEngine
+from llama_index.core.llms import ChatMessage, LLM
+
+from admission import AdmissionCancelled, AdmissionQueue
+from profiling import QueryProfile, profile_call
+
+logger = logging.getLogger(__name__)
+
+
+class _CancellableLLM:
+    """
+    Wraps the engine's LLM so a streamed answer can be aborted between tokens.
+    Closing the stream closes the HTTP response, and Ollama stops generating once
+    its client disconnects.
+    """
+
+    def __init__(self, llm: LLM):
+        self._llm = llm
+        self.cancel_event = threading.Event()
+
+    def stream_chat(self, messages, **kwargs):
+        cancel = self.cancel_event
+        stream = self._llm.stream_chat(messages, **kwargs)
+
+        def gen():
+            try:
+                for chunk in stream:
+                    if cancel.is_set():
+                        logger.info("Generation cancelled, closing the LLM stream")
+                        return
+                    yield chunk
+            finally:
+                stream.close()
+        return gen()
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+
+class CancellableChatEngine(ContextChatEngine):
+    """ContextChatEngine whose streamed answers can be cancelled while the LLM is generating."""
+
+    def __init__(self, retriever, llm: LLM, *args, **kwargs):
+        super().__init__(retriever, _CancellableLLM(llm), *args, **kwargs)
+
+    def stream_chat(self, message: str, chat_history: Optional[List[ChatMessage]] = None,
+                    prev_chunks=None, cancel: Optional[threading.Event] = None):
+        """Like ContextChatEngine.stream_chat; setting cancel stops the answer at the next token."""
+        self._llm.cancel_event = cancel or threading.Event()
+        return super().stream_chat(message, chat_history=chat_history, prev_chunks=prev_chunks)
+
+    def cancel(self) -> None:
+        self._llm.cancel_event.set()
+
+    @property
+    def retrieval_cache_hit(self) -> Optional[bool]:
+        """Whether the last retrieval was served from the query cache (None if the retriever does not cache)."""
+        return getattr(self._retriever, "last_hit", None)
+
+    @property
+    def retrieval_plan(self) -> Optional[dict]:
+        """Plan the adaptive retriever chose for the last question (None for a fixed retriever)."""
+        return getattr(self._retriever, "last_plan", None)
+
+    def record_turn(self, message: str, answer: str) -> None:
+        """Adds a question answered elsewhere (e.g. from the FAQ store) to the conversation memory."""
+        self._memory.put(ChatMessage(content=message, role="user"))
+        self._memory.put(ChatMessage(content=answer, role="assistant"))
+
+
+class BackgroundGeneration:
+    """
+    One answer generated on a worker thread, so the Streamlit script thread only polls it.
+    When the script run ends early (rerun, Stop, closed tab) it calls cancel(), which gives up
+    the queue slot or aborts the LLM stream instead of letting an abandoned answer
+    occupy the local model until it finishes.
+    """
+
+    def __init__(self, engine: CancellableChatEngine, prompt: str,
+                 chat_history: Optional[List[ChatMessage]] = None,
+                 gate: Optional[AdmissionQueue] = None, profile: bool = False):
+        """
+        Args:
+            engine: Chat engine that answers the question.
+            prompt: The user's question.
+            chat_history: Replaces the engine's memory first (used when diverting to another backend).
+            gate: Admission queue to wait in before generating.
+            profile: Profiles the answer (see profiling.py); it stays cancellable.
+        """
+        self.engine = engine
+        self.prompt = prompt
+        self.chat_history = chat_history
+        self.gate = gate
+        self.profile_queries = profile
+        self.text = ""
+        self.queue_position: Optional[int] = None
+        self.profile: Optional[QueryProfile] = None
+        self.error: Optional[Exception] = None
+        # Filled in as the answer progresses, for the query log
+        self.timings: Dict[str, float] = {}
+        self.node_ids: List[str] = []
+        self.cache_hit: Optional[bool] = None
+        self.plan: Optional[dict] = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        threading.Thread(target=self._run, daemon=True, name="generation").start()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def _set_position(self, position: int) -> None:
+        self.queue_position = position
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            if self.gate is None:
+                self._generate()
+            else:
+                with self.gate.admit(on_wait=self._set_position, cancel=self._cancel) as waited:
+                    self.queue_position = None
+                    self.timings["queue_ms"] = round(waited * 1000, 1)
+                    self._generate()
+        except AdmissionCancelled:
+            pass
+        except Exception as e:
+            logger.error(f"Generation failed: {e}")
+            self.error = e
+        finally:
+            self.timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self._done.set()
+
+    def _generate(self) -> None:
+        if self._cancel.is_set():
+            return
+        start = time.perf_counter()
+        if self.profile_queries:
+            response, self.profile = profile_call(self.prompt, self._stream, start)
+            # Tokens are generated on LlamaIndex's stream thread, which cProfile does not see
+            self.profile.set_stage("llm", time.perf_counter() - start - self.timings["retrieve_ms"] / 1000)
+        else:
+            response = self._stream(start)
+        self.timings["answer_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self.node_ids = [n.node.node_id for n in response.source_nodes]
+        self.cache_hit = getattr(self.engine, "retrieval_cache_hit", None)
+        self.plan = getattr(self.engine, "retrieval_plan", None)
+
+    def _stream(self, start: float):
+        # stream_chat returns once retrieval is done; tokens then arrive from LlamaIndex's stream thread
+        response = self.engine.stream_chat(self.prompt, chat_history=self.chat_history, cancel=self._cancel)
+        self.timings["retrieve_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        # Ends early, without an error, once the stream is cancelled
+        for delta in response.response_gen:
+            if not self.text:
+                self.timings["first_token_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self.text += delta
+        return response
@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from json_store import read_json, write_json
+
+# zstd is faster and smaller; gzip keeps the archive usable without the extra package
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIRNAME = "raw_archive"
+
+
+class HtmlArchive:
+    """
+    Content-addressed, compressed store of raw scraped responses.
+    Objects live under objects/<sha[:2]>/<sha>.<codec>, so identical responses are
+    stored once; index.json maps each URL to its latest object.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self._index: Dict[str, dict] = self._load_index()
+
+    def _load_index(self) -> Dict[str, dict]:
+        return read_json(self.index_path, {})
+
+    def _save_index(self) -> None:
+        write_json(self.index_path, self._index, indent=1, sort_keys=True)
+
+    def _object_path(self, digest: str, codec: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.{codec}"
+
+    def put(self, url: str, html: str, prefix: str = "", date: Optional[str] = None) -> str:
+        """
+        Archives a raw response and points the URL at it. Returns the content hash.
+        `date` records a publication date known from outside the HTML (e.g. a wiki revision).
+        """
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        codec = "zst" if zstandard else "gz"
+        path = self._object_path(digest, codec)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = zstandard.ZstdCompressor(level=10).compress(raw) if zstandard else gzip.compress(raw)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._index[url] = {
+            "sha256": digest,
+            "codec": codec,
+            "prefix": prefix,
+            "date": date,
+            "fetched_at": datetime.now().strftime('%Y-%m-%d'),
+        }
+        self._save_index()
+        return digest
+
+    def get(self, url: str) -> Optional[str]:
+        """Latest archived HTML for a URL, or None if it was never archived."""
+        entry = self._index.get(url)
+        if entry is None:
+            return None
+        data = self._object_path(entry["sha256"], entry["codec"]).read_bytes()
+        if entry["codec"] == "zst":
+            if zstandard is None:
+                raise RuntimeError("Archive entry is zstd-compressed; install 'zstandard' to read it.")
+            return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+        return gzip.decompress(data).decode("utf-8")
+
+    def entries(self) -> Dict[str, dict]:
+        return dict(self._index)
+
+
+# --- Offline re-extraction ---
+
+_worker_state: dict = {}
+
+
+def _init_worker(archive_root: str, data_dir: str) -> None:
+    """Builds one archive reader and one ingestor per worker process instead of one per page."""
+    from ingestion import DataIngestor
+    _worker_state["archive"] = HtmlArchive(archive_root)
+    _worker_state["ingestor"] = DataIngestor(data_dir)
+
+
+def _extract_entry(url: str) -> Optional[Tuple[str, str, str, str, str]]:
+    """Worker task: re-runs the cleaning rules on one archived page."""
+    archive, ingestor = _worker_state["archive"], _worker_state["ingestor"]
+    entry = archive.entries()[url]
+    html = archive.get(url)
+    result = ingestor.process_html(html, url, entry["prefix"], fallback_date=entry["fetched_at"])
+    if result is None:
+        return None
+    filename, pub_date, clean_text = result
+    return url, entry["prefix"], filename, entry.get("date") or pub_date, clean_text
+
+
+def reextract(data_dir: str, archive_root: str, max_workers: Optional[int] = None) -> List[str]:
+    """
+    Regenerates data/ files from the archive with the current cleaning rules, without any
+    network access. Parsing runs in a process pool; files and the manifest are written by
+    the parent only. Returns the filenames whose content changed.
+    """
+    from ingestion import DataIngestor
+    ingestor = DataIngestor(data_dir)
+    urls = list(HtmlArchive(archive_root).entries())
+    changed = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(archive_root, data_dir)) as pool:
+        for result in pool.map(_extract_entry, urls, chunksize=8):
+            if result is None:
+                continue
+            url, prefix, filename, pub_date, clean_text = result
+            # Same raw response, so the stored HTTP validators and wiki revision still apply
+            previous = ingestor.manifest.get(filename) or {}
+            validators = {key: previous.get(key) for key in ("etag", "last_modified", "revid")}
+            if ingestor._save_document(filename, url, pub_date, clean_text, prefix=prefix, **validators):
+                changed.append(filename)
+    logger.info(f"Re-extracted {len(urls)} archived pages, {len(changed)} files changed")
+    return changed
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    if sys.argv[1:2] != ["reextract"]:
+        print("Usage: python src/html_archive.py reextract")
+        sys.exit(1)
+    print("🗜️  Re-extracting data/ from the raw HTML archive (offline)...")
+    changed = reextract(str(root_dir / "data"), str(root_dir / ARCHIVE_DIRNAME))
+    print(f"✅ {len(changed)} files changed.")
+    if changed:
+        print("🔄 Next: run 'python src/index_versions.py' to rebuild the index with the new text.")
@@ -0,0 +1,275 @@
+import logging
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set
+
+from llama_index.core import Document, Settings
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+from dedup import NearDuplicateFilter, source_rank
+from json_store import read_json, write_json
+from manifest import CorpusManifest, read_header
+
+logger = logging.getLogger(__name__)
+
+# Nodes per embedding call / Chroma upsert. bge-small handles this comfortably on CPU.
+EMBED_BATCH_SIZE = 64
+
+# Files held in memory at once. Bounds peak RSS and sets the checkpoint granularity.
+FILE_BATCH_SIZE = 32
+
+
+def extract_metadata_from_file(file_path: Path, manifest: Optional[CorpusManifest] = None) -> dict:
+    """
+    Helper function to extract the 'date' from the file content.
+    Expects a line 'Source Date: YYYY-MM-DD'.
+    Uses the corpus manifest when it has a fresh entry, so the file is only opened as a fallback.
+    """
+    file_path = Path(file_path)
+    metadata = {}
+    entry = manifest.get(file_path.name) if manifest is not None else None
+    if entry and entry.get("date"):
+        metadata["date"] = entry["date"]
+    else:
+        date_str = read_header(file_path).get("date")
+        if date_str:
+            # Ensure it's stored as an ISO string for LlamaIndex to parse
+            metadata["date"] = date_str
+
+    # Fallback to file creation time if no date found
+    if "date" not in metadata:
+        metadata["date"] = datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d')
+
+    return metadata
+
+
+def _clean_text(text: str) -> str:
+    """Normalizes whitespace left over from HTML extraction and copy-pasted sources."""
+    lines = (line.rstrip() for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _load_and_split(file_path: str, metadata: dict, chunk_size: int, chunk_overlap: int) -> List[BaseNode]:
+    """
+    Worker task: reads, cleans and splits one file into nodes.
+    Runs in a child process, so it must stay a top-level (picklable) function.
+    """
+    path = Path(file_path)
+    text = _clean_text(path.read_text(encoding="utf-8", errors="replace"))
+    if not text:
+        return []
+    # The filename is the document id, so a file's nodes can be replaced as a unit
+    document = Document(text=text, metadata=metadata, id_=path.name)
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.get_nodes_from_documents([document])
+
+
+def copy_collection(source, target, exclude_doc_ids: Set[str], page_size: int = 1000,
+                    dedup: Optional[NearDuplicateFilter] = None) -> int:
+    """
+    Copies stored nodes, with their embeddings, from one Chroma collection to another,
+    skipping nodes of the excluded documents. Used for incremental updates: unchanged
+    files are carried over without touching the embedding model.
+    Copied chunks are registered with `dedup`, so re-embedded files are checked against them.
+    """
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        ids = page["ids"]
+        if not ids:
+            break
+        offset += len(ids)
+        keep = [i for i, metadata in enumerate(page["metadatas"])
+                if metadata.get("document_id") not in exclude_doc_ids]
+        if keep:
+            target.add(
+                ids=[ids[i] for i in keep],
+                embeddings=[page["embeddings"][i] for i in keep],
+                documents=[page["documents"][i] for i in keep],
+                metadatas=[page["metadatas"][i] for i in keep],
+            )
+            copied += len(keep)
+            if dedup is not None:
+                for i in keep:
+                    dedup.add(ids[i], page["documents"][i] or "", page["metadatas"][i].get("document_id"))
+    return copied
+
+
+def register_collection(collection, dedup: NearDuplicateFilter, page_size: int = 1000) -> int:
+    """
+    Registers every stored chunk of a collection with `dedup` without copying it, so a
+    build of another collection drops chunks this one already has. Embeddings are not read.
+    """
+    registered = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=registered)
+        if not page["ids"]:
+            break
+        for node_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+            dedup.add(node_id, text or "", (metadata or {}).get("document_id"))
+        registered += len(page["ids"])
+    return registered
+
+
+class BuildCheckpoint:
+    """
+    Records which files an index build has fully written to the vector store,
+    so an interrupted build resumes where it stopped. Removed once the build completes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        state = read_json(self.path, {})
+        self.done = set(state.get("done", []))
+        self.in_progress = list(state.get("in_progress", []))
+
+    def exists(self) -> bool:
+        """True if a previous build was interrupted before finishing."""
+        return self.path.exists()
+
+    def save(self) -> None:
+        write_json(self.path, {"done": sorted(self.done), "in_progress": self.in_progress})
+
+    def start_batch(self, names: List[str]) -> None:
+        self.in_progress = names
+        self.save()
+
+    def finish_batch(self) -> None:
+        self.done.update(self.in_progress)
+        self.in_progress = []
+        self.save()
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class IndexBuilder:
+    """
+    Builds the vector index from data/ files.
+    Reading, cleaning and splitting run in a process pool; the parent streams the
+    resulting nodes into batched embedding calls and batched Chroma upserts.
+    Files are processed FILE_BATCH_SIZE at a time and checkpointed after each batch,
+    so memory stays bounded and an interrupted build can be resumed.
+    With a NearDuplicateFilter, chunks repeated across sources are dropped before
+    embedding; files are then ordered so the most authoritative copy is the one kept.
+    """
+
+    def __init__(self, vector_store: BasePydanticVectorStore, manifest: Optional[CorpusManifest] = None,
+                 max_workers: Optional[int] = None, embed_batch_size: int = EMBED_BATCH_SIZE,
+                 file_batch_size: int = FILE_BATCH_SIZE, checkpoint_path: Optional[Path] = None,
+                 dedup: Optional[NearDuplicateFilter] = None):
+        self.vector_store = vector_store
+        self.manifest = manifest
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size
+        self.file_batch_size = file_batch_size
+        self.checkpoint = BuildCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.dedup = dedup
+
+    def _file_batches(self, files: List[Path]) -> Iterator[List[Path]]:
+        """Yields fixed-size batches of the files that still need indexing."""
+        done = self.checkpoint.done if self.checkpoint else set()
+        remaining = [f for f in files if f.name not in done]
+        for i in range(0, len(remaining), self.file_batch_size):
+            yield remaining[i:i + self.file_batch_size]
+
+    def _parsed_nodes(self, files: List[Path], pool: Optional[ProcessPoolExecutor]) -> Iterator[List[BaseNode]]:
+        """Yields the nodes of each file in the batch as soon as a worker has parsed it."""
+        chunk_size, chunk_overlap = Settings.chunk_size, Settings.chunk_overlap
+        metadata = [extract_metadata_from_file(f, self.manifest) for f in files]
+        args = ([str(f) for f in files], metadata,
+                [chunk_size] * len(files), [chunk_overlap] * len(files))
+
+        if pool is None:
+            yield from map(_load_and_split, *args)
+        else:
+            yield from pool.map(_load_and_split, *args)
+
+    def _embed_and_store(self, nodes: List[BaseNode]) -> None:
+        """Embeds one batch of nodes in a single model call and upserts it into the vector store."""
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        embeddings = Settings.embed_model.get_text_embedding_batch(texts)
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        self.vector_store.add(nodes)
+
+    def build(self, files: Iterable[Path]) -> dict:
+        """
+        Indexes the given files and returns throughput stats.
+        Progress is logged after every upserted batch. If a checkpoint from an
+        interrupted build exists, files it recorded as done are skipped.
+        """
+        files = list(files)
+        if self.dedup is not None:
+            # Stable sort: wiki pages before Tinto Talks before manual pastes and transcripts
+            files.sort(key=lambda f: source_rank(f.name))
+        stats = {"files": 0, "nodes": 0, "skipped": 0, "duplicates": 0, "seconds": 0.0}
+        start = time.perf_counter()
+
+        if self.checkpoint:
+            stats["skipped"] = len(self.checkpoint.done)
+            if self.checkpoint.exists():
+                logger.info(f"Resuming index build: {stats['skipped']} files already indexed")
+            # Drop partial writes from the batch that was running when the build stopped
+            for name in self.checkpoint.in_progress:
+                self.vector_store.delete(ref_doc_id=name)
+
+        def flush(batch: List[BaseNode]) -> None:
+            self._embed_and_store(batch)
+            stats["nodes"] += len(batch)
+            elapsed = time.perf_counter() - start
+            logger.info(
+                f"Indexed {stats['skipped'] + stats['files']}/{len(files)} files, {stats['nodes']} nodes "
+                f"({stats['nodes'] / elapsed:.1f} nodes/s)"
+            )
+
+        pool = None
+        if self.max_workers > 1 and len(files) > 1:
+            # 'spawn' avoids forking a parent that already holds torch / tokenizer threads
+            ctx = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+
+        try:
+            for batch_files in self._file_batches(files):
+                if self.checkpoint:
+                    self.checkpoint.start_batch([f.name for f in batch_files])
+
+                pending: List[BaseNode] = []
+                for nodes in self._parsed_nodes(batch_files, pool):
+                    stats["files"] += 1
+                    if self.dedup is not None:
+                        kept = self.dedup.filter(nodes)
+                        stats["duplicates"] += len(nodes) - len(kept)
+                        nodes = kept
+                    pending.extend(nodes)
+                    while len(pending) >= self.embed_batch_size:
+                        flush(pending[:self.embed_batch_size])
+                        del pending[:self.embed_batch_size]
+                if pending:
+                    flush(pending)
+
+                if self.checkpoint:
+                    self.checkpoint.finish_batch()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if self.checkpoint:
+            self.checkpoint.clear()
+
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        logger.info(
+            f"Index build finished: {stats['files']} files, {stats['nodes']} nodes in {stats['seconds']}s "
+            f"using {self.max_workers} worker(s)"
+        )
+        if self.dedup is not None:
+            self.dedup.log_report()
+        return stats
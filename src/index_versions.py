@@ -0,0 +1,94 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from json_store import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Original unversioned collection; stays active until the first promotion
+BASE_COLLECTION = "eu5_docs"
+POINTER_FILENAME = "active_collection.json"
+
+
+class IndexVersions:
+    """
+    Blue/green bookkeeping for Chroma collections.
+    New versions are built as 'eu5_docs_v{n}' next to the live one and promoted by
+    atomically replacing a small pointer file, so readers never see a half-built index.
+    """
+
+    def __init__(self, chroma_dir: str, base_name: str = BASE_COLLECTION):
+        self.chroma_dir = Path(chroma_dir)
+        self.base_name = base_name
+        # Each collection family (e.g. the per-source shards, see shards.py) has its own pointer
+        pointer = POINTER_FILENAME if base_name == BASE_COLLECTION else f"active_{base_name}.json"
+        self.pointer_path = self.chroma_dir / pointer
+
+    def _read(self) -> dict:
+        return read_json(self.pointer_path, {})
+
+    def _write(self, state: dict) -> None:
+        self.chroma_dir.mkdir(parents=True, exist_ok=True)
+        # Atomic: a concurrent reader sees either the old or the new pointer
+        write_json(self.pointer_path, state, indent=1)
+
+    def active(self) -> str:
+        """Name of the collection queries should be served from."""
+        return self._read().get("active", self.base_name)
+
+    def version_name(self, n: int) -> str:
+        return f"{self.base_name}_v{n}"
+
+    def reserve_next(self) -> str:
+        """
+        Returns the collection name for the next build.
+        A reserved but never promoted version is reused so an interrupted build resumes.
+        """
+        state = self._read()
+        latest = state.get("latest", 0)
+        if latest == 0 or self.version_name(latest) == state.get("active"):
+            latest += 1
+            state["latest"] = latest
+            self._write(state)
+        return self.version_name(latest)
+
+    def promote(self, name: str) -> Optional[str]:
+        """Makes `name` the live collection. Returns the previously active one."""
+        state = self._read()
+        previous = state.get("active", self.base_name)
+        state["previous"] = previous
+        state["active"] = name
+        state["promoted_at"] = datetime.now().isoformat(timespec="seconds")
+        self._write(state)
+        logger.info(f"Promoted index {name} (was {previous})")
+        return previous
+
+    def retired(self, collection_names) -> list:
+        """Collections that are neither live, the rollback target, nor the version being built."""
+        state = self._read()
+        keep = {state.get("active", self.base_name), state.get("previous"),
+                self.version_name(state.get("latest", 0))}
+        return [name for name in collection_names
+                if name not in keep and (name == self.base_name or name.startswith(f"{self.base_name}_v"))]
+
+
+if __name__ == "__main__":
+    # Builds a fresh index version from data/ while the app keeps serving the current one,
+    # then promotes it. Running Streamlit sessions switch over on their next interaction.
+    import argparse
+    from rag_engine import RAGEngine
+    from shards import SHARDS
+
+    parser = argparse.ArgumentParser(description="Build and promote a new index version.")
+    parser.add_argument("--shards", nargs="+", choices=SHARDS,
+                        help="With EU5_SHARDED_INDEX=1, rebuild only these source shards")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    engine = RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db"))
+    print("🔄 Building new index version...")
+    name = engine.refresh_index(shards=args.shards)
+    print(f"✅ {name} is now live.")
@@ -1,12 +1,22 @@
 import requests
+import hashlib
 from bs4 import BeautifulSoup
 from pathlib import Path
 import logging
 import re
 from datetime import datetime
+from typing import List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import time
 from playwright.sync_api import sync_playwright
 from playwright_stealth import Stealth
+from manifest import CorpusManifest
+from json_store import read_json
+from url_health import load_dead_urls, REPORT_FILENAME
+from html_archive import HtmlArchive, ARCHIVE_DIRNAME
+from youtube_transcripts import (
+    YouTubeSource, TranscriptCache, CACHE_DIRNAME, UNDATED, merge_segments, video_id_from_url, video_url
+)
 
 # Setup basic logging
 logging.basicConfig(level=logging.INFO)
@@ -233,6 +243,15 @@ TINTO_TALKS_URLS = [
     "https://forum.paradoxplaza.com/forum/developer-diary/patch-1-0-10-is-live-now-tinto-talk-92.1889614/"
 ]
 
+# Written by tinto_poller.py. Threads listed there are followed through their RSS feeds,
+# so the scrapers leave them alone instead of indexing them a second time
+TINTO_STATE_FILENAME = ".tinto_state.json"
+
+# YouTube videos whose transcripts are ingested (IDs or URLs), or (ID or URL, "YYYY-MM-DD")
+# to give the upload date instead of reading it from the watch page.
+# Transcripts are cached in youtube_cache/, so only newly added videos hit the network.
+YOUTUBE_VIDEO_IDS = []
+
 class DataIngestor:
     """
     Handles data collection from web pages and manual files.
@@ -242,13 +261,34 @@ class DataIngestor:
     def __init__(self, data_dir: str):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = CorpusManifest(str(self.data_dir))
+        # URLs the last validate_urls.py run found to be gone (404/410)
+        self.dead_urls = load_dead_urls(self.data_dir.parent / REPORT_FILENAME)
+        # Raw responses, kept so data/ can be regenerated offline when cleaning rules change
+        self.archive = HtmlArchive(str(self.data_dir.parent / ARCHIVE_DIRNAME))
 
     def _sanitize_filename(self, name: str) -> str:
         """Removes illegal characters and trailing spaces from filenames."""
         return re.sub(r'[\\/*?:"<>|]', "", name).strip().replace(" ", "_")
 
-    def _extract_publish_date(self, html_content: str, url: str) -> str:
-        """Attempts to extract a publication date from HTML metadata."""
+    def polled_tinto_urls(self) -> Set[str]:
+        """Tinto Talks threads owned by the RSS poller (see TINTO_STATE_FILENAME)."""
+        return set(read_json(self.data_dir / TINTO_STATE_FILENAME, {}))
+
+    def filename_for_url(self, url: str, prefix: str = "") -> str:
+        """
+        Name of the data/ file a URL is saved to.
+        Pages whose URL ends in '/' (all Tinto Talks threads) are named after their title by
+        process_html, so the manifest is asked first; the slug only names never-scraped pages.
+        """
+        recorded = self.manifest.filename_for_url(url, prefix)
+        if recorded:
+            return recorded
+        slug = url.rstrip("/").split("/")[-1].split("?")[0] or "wiki_index"
+        return prefix + self._sanitize_filename(slug) + ".txt"
+
+    def _extract_publish_date(self, html_content: str, url: str, fallback_date: str = None) -> str:
+        """Attempts to extract a publication date from HTML metadata (falls back to fallback_date, then today)."""
         soup = BeautifulSoup(html_content, 'html.parser')
         meta_date = soup.find("meta", property="article:published_time") or \
                     soup.find("meta", {"name": "dcterms.created"}) or \
@@ -264,7 +304,7 @@ class DataIngestor:
                 try:
                     return datetime.strptime(match.group(1), "%d %B %Y").strftime("%Y-%m-%d")
                 except: pass
-        return datetime.now().strftime('%Y-%m-%d')
+        return fallback_date or datetime.now().strftime('%Y-%m-%d')
 
     def _scrape_with_playwright(self, url: str) -> str:
         """Fallback scraper using Playwright to bypass Cloudflare."""
@@ -305,12 +345,94 @@ class DataIngestor:
             logger.error(f"Playwright scraping failed: {e}")
             return ""
 
+    def _extract_text(self, soup: BeautifulSoup, url: str) -> str:
+        """Extracts the readable text of a page, dropping site-specific navigation noise."""
+        if "paradoxwikis.com" in url:
+            # Full pages wrap the article in #mw-content-text, API parse output only has .mw-parser-output
+            content_div = soup.find(id="mw-content-text") or soup.find(class_="mw-parser-output")
+            if content_div:
+                for noise in content_div.find_all(['table', 'div'], class_=['infobox', 'navbox', 'toc', 'mw-editsection']):
+                    noise.decompose()
+                text = content_div.get_text(separator='\n')
+            else: text = soup.get_text(separator='\n')
+        elif "forum.paradoxplaza.com" in url:
+            content_div = soup.find('div', class_='p-body-content') or soup.find('article', class_='message-body')
+            text = content_div.get_text(separator='\n') if content_div else soup.get_text(separator='\n')
+        else:
+            for script in soup(["script", "style"]): script.decompose()
+            text = soup.get_text(separator='\n')
+        
+        lines = (line.strip() for line in text.splitlines())
+        return '\n'.join(line for line in lines if line)
+
+    def _save_document(self, filename: str, url: str, pub_date: str, clean_text: str,
+                       prefix: str = "", exact_date: bool = False, **validators) -> bool:
+        """
+        Writes a scraped document and its manifest entry. Returns True if the content changed.
+        Extra keyword fields (HTTP validators, wiki revision ids) are kept in the manifest.
+        With exact_date, a changed pub_date alone also rewrites the file.
+        """
+        previous = self.manifest.get(filename)
+        # Body hash ignores the header, whose fallback date changes daily
+        validators["text_sha256"] = hashlib.sha256(clean_text.encode("utf-8")).hexdigest()
+        if previous and previous.get("text_sha256") == validators["text_sha256"] and \
+                (not exact_date or previous.get("date") == pub_date):
+            # Leave the file (and its mtime) alone so nothing downstream sees a change,
+            # but keep the fresh validators for the next conditional request
+            logger.info(f"Content unchanged for {url}")
+            self.manifest.update(filename, **validators)
+            self.manifest.save()
+            return False
+
+        content = f"Source URL: {url}\nSource Date: {pub_date}\n\n{clean_text}"
+        with open(self.data_dir / filename, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.manifest.record(filename, content, url=url, date=pub_date, prefix=prefix, **validators)
+        self.manifest.save()
+        logger.info(f"Successfully scraped {url} to {filename}")
+        return True
+
+    def process_html(self, html_content: str, url: str, prefix: str = "",
+                     fallback_date: str = None) -> Optional[Tuple[str, str, str]]:
+        """
+        Turns a raw page into (filename, pub_date, clean_text), or None if it is a challenge
+        page or too short. No network access, so it also serves offline re-extraction.
+        """
+        pub_date = self._extract_publish_date(html_content, url, fallback_date)
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Stricter validation: title check
+        if soup.title and soup.title.string and ("Client Challenge" in soup.title.string or "Just a moment..." in soup.title.string):
+            logger.error(f"Scraped content for {url} still identified as challenge page.")
+            return None
+
+        clean_text = self._extract_text(soup, url)
+        if len(clean_text) < 300: return None
+
+        slug = url.split("/")[-1].split("?")[0]
+        if not slug or slug == "index.php": slug = soup.title.string if soup.title else "scraped_content"
+
+        return prefix + self._sanitize_filename(slug) + ".txt", pub_date, clean_text
+
     def scrape_url(self, url: str, prefix: str = "") -> bool:
         """Scrapes a static webpage and saves content to a .txt file."""
+        if url in self.dead_urls:
+            logger.info(f"Skipping {url}: reported dead by the last URL health check")
+            return False
         try:
             headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.472.124 Safari/537.36'}
+            # Conditional GET: an unchanged page costs a 304 instead of a download
+            previous = self.manifest.get(self.filename_for_url(url, prefix))
+            if previous:
+                if previous.get("etag"):
+                    headers['If-None-Match'] = previous["etag"]
+                if previous.get("last_modified"):
+                    headers['If-Modified-Since'] = previous["last_modified"]
             response = requests.get(url, headers=headers, timeout=15)
             response.raise_for_status()
+            if response.status_code == 304:
+                logger.info(f"Unchanged since last scrape: {url}")
+                return True
             
             if "Just a moment..." in response.text or "Client Challenge" in response.text:
                 logger.warning(f"Cloudflare block detected for {url}. Attempting Playwright fallback...")
@@ -321,49 +443,84 @@ class DataIngestor:
             else:
                 html_content = response.text
                 
-            pub_date = self._extract_publish_date(html_content, url)
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Stricter validation: title check
-            if soup.title and ("Client Challenge" in soup.title.string or "Just a moment..." in soup.title.string):
-                logger.error(f"Scraped content for {url} still identified as challenge page.")
-                return False
-            
-            if "paradoxwikis.com" in url:
-                content_div = soup.find(id="mw-content-text")
-                if content_div:
-                    for noise in content_div.find_all(['table', 'div'], class_=['infobox', 'navbox', 'toc', 'mw-editsection']):
-                        noise.decompose()
-                    text = content_div.get_text(separator='\n')
-                else: text = soup.get_text(separator='\n')
-            elif "forum.paradoxplaza.com" in url:
-                content_div = soup.find('div', class_='p-body-content') or soup.find('article', class_='message-body')
-                text = content_div.get_text(separator='\n') if content_div else soup.get_text(separator='\n')
-            else:
-                for script in soup(["script", "style"]): script.decompose()
-                text = soup.get_text(separator='\n')
-            
-            lines = (line.strip() for line in text.splitlines())
-            clean_text = '\n'.join(line for line in lines if line)
-
-            if len(clean_text) < 300: return False
+            # Archive before extraction, so a page our rules reject today can still be re-extracted later
+            self.archive.put(url, html_content, prefix=prefix)
+            processed = self.process_html(html_content, url, prefix)
+            if processed is None: return False
 
-            slug = url.split("/")[-1].split("?")[0]
-            if not slug or slug == "index.php": slug = soup.title.string if soup.title else "scraped_content"
-            
-            filename = prefix + self._sanitize_filename(slug) + ".txt"
-            file_path = self.data_dir / filename
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(f"Source URL: {url}\nSource Date: {pub_date}\n\n{clean_text}")
-            
-            logger.info(f"Successfully scraped {url} to {filename}")
+            filename, pub_date, clean_text = processed
+            self._save_document(
+                filename, url, pub_date, clean_text, prefix=prefix,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
             return True
         except Exception as e:
             logger.error(f"Failed to scrape {url}: {e}")
             return False
 
+    def ingest_youtube(self, video_ids: List, source: Optional[YouTubeSource] = None,
+                       max_workers: int = 8) -> List[str]:
+        """
+        Ingests YouTube transcripts as 'youtube_<id>.txt' and returns the filenames that changed.
+        Uncached transcripts are fetched concurrently; files and the manifest are written
+        from this thread only. `source` can be replaced by a local stub for testing.
+        The Source Date is the video's upload date (see YOUTUBE_VIDEO_IDS), never the download date.
+        """
+        source = source or YouTubeSource()
+        cache = TranscriptCache(str(self.data_dir.parent / CACHE_DIRNAME))
+        given_dates = {}
+        for item in video_ids:
+            url_or_id, date = item if isinstance(item, (tuple, list)) else (item, None)
+            given_dates[video_id_from_url(url_or_id)] = date
+        video_ids = list(given_dates)
+
+        def fetch(video_id: str) -> Optional[dict]:
+            try:
+                return cache.put(video_id, source.title(video_id), source.transcript(video_id),
+                                 published=source.publish_date(video_id))
+            except Exception as e:
+                logger.error(f"Failed to fetch transcript for {video_id}: {e}")
+                return None
+
+        def fetch_date(entry: dict) -> dict:
+            # Cached before upload dates were stored
+            return cache.write({**entry, "published": source.publish_date(entry["video_id"])})
+
+        transcripts = {v: cache.get(v) for v in video_ids}
+        missing = [v for v, entry in transcripts.items() if entry is None]
+        undated = [v for v, entry in transcripts.items()
+                   if entry is not None and "published" not in entry and not given_dates[v]]
+        if missing or undated:
+            logger.info(f"Fetching {len(missing)} transcripts ({len(video_ids) - len(missing)} cached), "
+                        f"{len(undated)} upload dates")
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                transcripts.update(zip(missing, pool.map(fetch, missing)))
+                transcripts.update(zip(undated, pool.map(fetch_date, [transcripts[v] for v in undated])))
+
+        changed = []
+        for video_id, entry in transcripts.items():
+            if not entry or not entry["segments"]:
+                continue
+            paragraphs = merge_segments(entry["segments"])
+            if entry.get("title"):
+                paragraphs.insert(0, entry["title"])
+            filename = f"youtube_{self._sanitize_filename(video_id)}.txt"
+            date = given_dates[video_id] or entry.get("published")
+            if not date:
+                logger.warning(f"No upload date for {video_id}; add one to YOUTUBE_VIDEO_IDS")
+                date = UNDATED
+            # exact_date: a transcript first saved with its download date gets re-dated
+            if self._save_document(filename, video_url(video_id), date, "\n\n".join(paragraphs),
+                                   prefix="youtube_", exact_date=True, video_id=video_id):
+                changed.append(filename)
+        return changed
+
     def ingest_core_knowledge(self) -> None:
         """Ingests Wiki pages, Tinto Talks, and manual sources."""
+        # 0. Backfill manifest entries for files scraped before the manifest existed
+        self.manifest.sync()
+
         # 1. Manual Sources (Trust these, no length check)
         manual_dir = self.data_dir.parent / "manual_sources"
         if manual_dir.exists():
@@ -375,8 +532,11 @@ class DataIngestor:
                 if not dest_path.exists():
                     logger.info(f"Ingesting manual source: {txt_file.name}")
                     content = txt_file.read_text(encoding='utf-8')
-                    header = f"Source: Manual ({txt_file.name})\nSource Date: {datetime.now().strftime('%Y-%m-%d')}\nURL: local_file\n\n"
+                    ingest_date = datetime.now().strftime('%Y-%m-%d')
+                    header = f"Source: Manual ({txt_file.name})\nSource Date: {ingest_date}\nURL: local_file\n\n"
                     dest_path.write_text(header + content, encoding='utf-8')
+                    self.manifest.record(dest_path.name, header + content, date=ingest_date, prefix="manual_")
+            self.manifest.save()
 
         # 2. Wiki
         for url in CORE_WIKI_URLS:
@@ -385,13 +545,20 @@ class DataIngestor:
             if not (self.data_dir / filename).exists():
                 self.scrape_url(url)
 
-        # 3. Tinto Talks
+        # 3. Tinto Talks (threads followed by tinto_poller.py get their posts from RSS)
+        polled = self.polled_tinto_urls()
         for url in TINTO_TALKS_URLS:
+            if url in polled:
+                continue
             slug = url.split("/")[-1].split("?")[0] or "tinto_talk"
             filename = "tinto_" + self._sanitize_filename(slug) + ".txt"
             if not (self.data_dir / filename).exists():
                 self.scrape_url(url, prefix="tinto_")
 
+        # 4. YouTube transcripts
+        if YOUTUBE_VIDEO_IDS:
+            self.ingest_youtube(YOUTUBE_VIDEO_IDS)
+
 if __name__ == "__main__":
     import os
     data_dir = os.path.join(os.getcwd(), "data")
@@ -0,0 +1,40 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Any, Union
+
+
+def read_json(path: Union[str, Path], default: Any = None) -> Any:
+    """Parsed contents of a JSON file, or `default` if it is missing or corrupt (state files are never fatal)."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path: Union[str, Path], data: Any, **dumps_kwargs) -> None:
+    """
+    Writes JSON atomically: a tmp file, then os.replace, so a concurrent reader (or a
+    crash mid-write) sees either the old or the new file, never half of one.
+    Keyword arguments go to json.dumps (indent, sort_keys...).
+    """
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, **dumps_kwargs), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class JsonRequestHandler(BaseHTTPRequestHandler):
+    """Base handler for the small JSON status/API servers; request logging is left to the app's logger."""
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
@@ -1,8 +1,152 @@
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.groq import Groq
 from llama_index.core.llms import LLM
-from typing import Optional
+from ollama import Client
+from typing import Optional, Tuple
+import logging
 import os
+import socket
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long Ollama keeps the model (and its prompt cache) loaded after a request.
+# The default 5m unloads it between questions; a reload costs seconds on CPU.
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Prompt window (Ollama's num_ctx) for both backends. LlamaIndex defaults to 3900, which
+# leaves room for only two ~1000-token chunks next to the system prompt; the strategy plan
+# keeps six (see query_router.QUERY_PLANS). Larger windows cost Ollama KV-cache memory.
+LLM_CONTEXT_WINDOW = int(os.getenv("EU5_CONTEXT_WINDOW", "8192"))
+
+OLLAMA_PORT = 11434
+OLLAMA_URL = f"http://localhost:{OLLAMA_PORT}"
+
+
+class PromptEvalStats:
+    """
+    Accumulates Ollama's own timing fields across requests.
+    Ollama only evaluates prompt tokens that are not already in its cache, so the gap
+    between the prompt's size and prompt_eval_count estimates what prefix reuse saved.
+    That estimate (est_*) is a rough upper bound: the prompt size is guessed from its
+    characters, and tokens Ollama truncated to fit num_ctx count as reused too.
+    Only the measured fields are shown to users.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens_evaluated = 0
+        self.prompt_tokens_reused = 0
+        self.prompt_eval_seconds = 0.0
+        self.load_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def record(self, response: dict, prompt_chars: int) -> None:
+        evaluated = response.get("prompt_eval_count") or 0
+        eval_seconds = (response.get("prompt_eval_duration") or 0) / 1e9
+        # ~4 characters per token for English text; only used for the estimate
+        reused = max(0, prompt_chars // 4 - evaluated)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens_evaluated += evaluated
+            self.prompt_tokens_reused += reused
+            self.prompt_eval_seconds += eval_seconds
+            self.load_seconds += (response.get("load_duration") or 0) / 1e9
+            if evaluated:
+                self.saved_seconds += reused * eval_seconds / evaluated
+        logger.debug(f"Ollama prompt eval: {evaluated} tokens in {eval_seconds:.2f}s, ~{reused} reused")
+
+    def summary(self) -> dict:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "avg_prompt_eval_ms": round(self.prompt_eval_seconds / calls * 1000),
+            "avg_prompt_tokens_evaluated": round(self.prompt_tokens_evaluated / calls),
+            "est_prompt_tokens_reused": self.prompt_tokens_reused,
+            "est_seconds_saved": round(self.saved_seconds, 1),
+            "load_seconds": round(self.load_seconds, 1),
+        }
+
+
+OLLAMA_STATS = PromptEvalStats()
+
+
+class KeepAliveClient:
+    """
+    Wraps ollama.Client so every chat request carries keep_alive and reports its timings.
+    The LlamaIndex Ollama integration does not expose keep_alive, but accepts a client.
+    """
+
+    def __init__(self, client: Client, keep_alive: str = OLLAMA_KEEP_ALIVE, stats: PromptEvalStats = OLLAMA_STATS):
+        self._client = client
+        self.keep_alive = keep_alive
+        self.stats = stats
+
+    def chat(self, messages=None, stream: bool = False, **kwargs):
+        prompt_chars = sum(len(m.get("content") or "") for m in messages or [])
+        response = self._client.chat(messages=messages, stream=stream, keep_alive=self.keep_alive, **kwargs)
+        if not stream:
+            self.stats.record(response, prompt_chars)
+            return response
+
+        def gen():
+            for chunk in response:
+                # Timings arrive with the final chunk
+                if chunk.get("done"):
+                    self.stats.record(chunk, prompt_chars)
+                yield chunk
+        return gen()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def ollama_is_running() -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(1)
+        return s.connect_ex(("localhost", OLLAMA_PORT)) == 0
+
+def start_ollama_server() -> Tuple[bool, str]:
+    """
+    Starts `ollama serve` in the background unless it is already running.
+    Returns (running, message). Used by the UI and by the startup warm-up.
+    """
+    if ollama_is_running():
+        return True, "Ollama is already running."
+
+    # Attempts to start Ollama
+    try:
+        # Run in background, suppress output
+        # Server-wide keep-alive, so the model is not unloaded between questions
+        env = {**os.environ, "OLLAMA_KEEP_ALIVE": OLLAMA_KEEP_ALIVE}
+        subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+
+        # Wait for it to spin up (max 10s)
+        for _ in range(20):
+            if ollama_is_running():
+                return True, "Ollama auto-started successfully 🦙"
+            time.sleep(0.5)
+
+        return False, "Ollama command ran but server didn't respond (Timeout)."
+    except FileNotFoundError:
+        return False, "Ollama not found! Please download it from ollama.com"
+    except Exception as e:
+        return False, f"Failed to start Ollama: {e}"
+
+def preload_ollama_model(model_name: str, system_prompt: Optional[str] = None) -> None:
+    """
+    Loads a model into Ollama without answering anything, so the first question does not
+    pay the load. With the system prompt, its evaluation is cached too (see rag_engine.SYSTEM_PROMPT).
+    """
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    response = Client(host=OLLAMA_URL, timeout=300.0).chat(
+        model=model_name, messages=messages, keep_alive=OLLAMA_KEEP_ALIVE,
+        # Same num_ctx as get_llm(), or Ollama reloads the model for the first question
+        options={"num_predict": 1, "num_ctx": LLM_CONTEXT_WINDOW})
+    logger.info(f"Preloaded {model_name} in Ollama ({(response.get('load_duration') or 0) / 1e9:.1f}s load)")
 
 def get_llm(provider: str, model_name: str, api_key: Optional[str] = None) -> LLM:
     """
@@ -14,13 +158,16 @@ def get_llm(provider: str, model_name: str, api_key: Optional[str] = None) -> LL
         api_key: Groq API key (optional if set in environment).
     """
     if provider == "Local (Ollama)":
-        return Ollama(model=model_name, base_url="http://localhost:11434", request_timeout=300.0)
+        base_url = OLLAMA_URL
+        client = KeepAliveClient(Client(host=base_url, timeout=300.0))
+        return Ollama(model=model_name, base_url=base_url, request_timeout=300.0, client=client,
+                      context_window=LLM_CONTEXT_WINDOW)
     
     if provider == "Groq":
         # Prioritize passed key, then env var
         g_key = api_key or os.getenv("GROQ_API_KEY")
         if not g_key:
             raise ValueError("Groq API Key not found in environment or arguments.")
-        return Groq(model=model_name, api_key=g_key)
+        return Groq(model=model_name, api_key=g_key, context_window=LLM_CONTEXT_WINDOW)
     
     raise ValueError(f"Oracle does not support: {provider}. Use 'Local (Ollama)' or 'Groq'.")
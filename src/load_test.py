@@ -0,0 +1,177 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from benchmarking import DEFAULT_QUESTIONS, TimedRetriever, collect_stages, percentile, record_stage, stage
+
+logger = logging.getLogger(__name__)
+
+
+class FakeLLM(CustomLLM):
+    """
+    Stand-in for Ollama with configurable latencies: prompt evaluation per prompt token,
+    time to first token and per generated token. `slots` caps concurrent generations like
+    a single Ollama server does (OLLAMA_NUM_PARALLEL), so queueing shows up in the results.
+    """
+
+    prompt_token_latency: float = 0.002
+    first_token_latency: float = 0.3
+    token_latency: float = 0.03
+    output_tokens: int = 200
+    slots: int = 1
+
+    _slots: threading.BoundedSemaphore = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._slots = threading.BoundedSemaphore(self.slots)
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="fake-llm", num_output=self.output_tokens)
+
+    def _tokens(self, prompt: str):
+        with stage("llm_queue"):
+            self._slots.acquire()
+        try:
+            start = time.perf_counter()
+            # ~4 characters per token
+            time.sleep(len(prompt) / 4 * self.prompt_token_latency + self.first_token_latency)
+            record_stage("llm_first_token", time.perf_counter() - start)
+            for i in range(self.output_tokens):
+                if i:
+                    time.sleep(self.token_latency)
+                yield "word "
+            record_stage("llm", time.perf_counter() - start)
+        finally:
+            self._slots.release()
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text="".join(self._tokens(prompt)))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for token in self._tokens(prompt):
+                text += token
+                yield CompletionResponse(text=text, delta=token)
+        return gen()
+
+
+def run_load_test(make_engine: Callable[[], Any], questions: List[str], users: int,
+                  requests_per_user: int, think_time: float = 0.0, seed: int = 0) -> dict:
+    """
+    Runs `users` simulated users concurrently, each with its own chat engine (and so its own
+    conversation memory), asking `requests_per_user` questions. Returns throughput and
+    p50/p95/p99 latency per stage.
+    """
+    samples: List[Dict[str, float]] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def user(user_id: int) -> None:
+        rng = random.Random(seed + user_id)
+        engine = make_engine()
+        for _ in range(requests_per_user):
+            start = time.perf_counter()
+            with collect_stages() as stages:
+                try:
+                    engine.chat(rng.choice(questions))
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+            stages["total"] = time.perf_counter() - start
+            with lock:
+                samples.append(stages)
+            if think_time:
+                time.sleep(rng.uniform(0, 2 * think_time))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    elapsed = time.perf_counter() - start
+
+    stage_names = sorted({name for s in samples for name in s}, key=lambda n: (n == "total", n))
+    report = {
+        "users": users,
+        "requests": len(samples),
+        "errors": len(errors),
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "stages": {},
+    }
+    for name in stage_names:
+        values = [s.get(name, 0.0) * 1000 for s in samples]
+        report["stages"][name] = {
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "mean_ms": round(sum(values) / len(values), 1),
+        }
+    if errors:
+        report["first_error"] = errors[0]
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"\n👥 {report['users']} users · {report['requests']} requests · {report['errors']} errors "
+          f"· {report['seconds']}s · {report['throughput_rps']} req/s")
+    print(f"{'stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, s in report["stages"].items():
+        print(f"{name:<18}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['mean_ms']:>10}")
+
+
+if __name__ == "__main__":
+    from rag_engine import RAGEngine
+    from query_cache import QUERY_EMBEDDINGS, RETRIEVALS
+
+    parser = argparse.ArgumentParser(description="Load-test the Oracle query path with a fake LLM.")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5, help="Questions per user")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between questions (s)")
+    parser.add_argument("--llm-slots", type=int, default=1, help="Concurrent generations the backend allows")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.002)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.03)
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--cold", action="store_true", help="Disable the query caches")
+    parser.add_argument("--multi-query", action="store_true", help="Split compound questions into parallel sub-queries")
+    parser.add_argument("--sources", nargs="+", help="Search only these shards (needs EU5_SHARDED_INDEX=1)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    root_dir = Path(__file__).parent.parent
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        questions = [q.strip() for q in Path(args.questions).read_text(encoding="utf-8").splitlines() if q.strip()]
+    if args.cold:
+        QUERY_EMBEDDINGS.maxsize = RETRIEVALS.maxsize = 0
+
+    rag_engine = RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db"))
+    llm = FakeLLM(prompt_token_latency=args.prompt_token_latency, first_token_latency=args.ttft,
+                  token_latency=args.token_latency, output_tokens=args.output_tokens, slots=args.llm_slots)
+
+    def make_engine():
+        engine = rag_engine.get_chat_engine(llm, multi_query=args.multi_query, sources=args.sources)
+        engine._retriever = TimedRetriever(engine._retriever)
+        return engine
+
+    report = run_load_test(make_engine, questions, args.users, args.requests, args.think_time)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=1), encoding="utf-8")
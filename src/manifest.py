@@ -0,0 +1,150 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from json_store import write_json
+
+# Hidden so the "no .txt files" fallback in RAGEngine never indexes it
+MANIFEST_FILENAME = ".manifest.json"
+
+# Header keys written by DataIngestor at the top of every data/ file
+HEADER_KEYS = {"Source URL": "url", "URL": "url", "Source Date": "date"}
+
+# Filename prefixes DataIngestor uses to tag the source of a document
+SOURCE_PREFIXES = ("tinto_", "manual_", "youtube_")
+
+
+def read_header(file_path: Path) -> dict:
+    """
+    Reads the 'Key: value' header block at the top of a data file.
+    Stops at the first blank line so the body is never scanned.
+    """
+    header = {}
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    break
+                key, sep, value = line.partition(":")
+                if sep and key in HEADER_KEYS:
+                    field = HEADER_KEYS[key]
+                    value = value.strip()
+                    # 'URL: local_file' marks manual sources, not a real URL
+                    if field == "url" and not value.startswith("http"):
+                        continue
+                    header.setdefault(field, value)
+    except Exception:
+        pass
+    return header
+
+
+class CorpusManifest:
+    """
+    Single JSON record of every document in data/.
+    Written by DataIngestor at scrape time so the index builder and reports
+    can look up URL, date, hash, size and prefix without reopening files.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+        self.path = self.data_dir / MANIFEST_FILENAME
+        self._entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8")).get("files", {})
+        except Exception:
+            # A corrupt manifest is rebuilt by sync(), never fatal
+            return {}
+
+    def save(self) -> None:
+        """Writes the manifest atomically (tmp file + rename)."""
+        write_json(self.path, {"version": 1, "files": self._entries}, indent=1, sort_keys=True)
+
+    def record(self, filename: str, content: str, url: Optional[str] = None,
+               date: Optional[str] = None, prefix: str = "", **extra) -> dict:
+        """
+        Records a file that was just written to data/.
+        The hash is computed from the in-memory content, size and mtime from a single stat().
+        Extra keyword fields (e.g. HTTP validators) are stored alongside when not None.
+        """
+        stat = (self.data_dir / filename).stat()
+        entry = {
+            "url": url,
+            "date": date,
+            "sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            "size": stat.st_size,
+            "prefix": prefix,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        entry.update({key: value for key, value in extra.items() if value is not None})
+        self._entries[filename] = entry
+        return entry
+
+    def update(self, filename: str, **fields) -> None:
+        """Updates bookkeeping fields of an existing entry without touching the file."""
+        if filename in self._entries:
+            self._entries[filename].update({key: value for key, value in fields.items() if value is not None})
+
+    def get(self, filename: str) -> Optional[dict]:
+        """Returns the entry for a file, or None if it is unknown or was edited since recording."""
+        entry = self._entries.get(filename)
+        if entry is None:
+            return None
+        try:
+            stat = (self.data_dir / filename).stat()
+        except OSError:
+            return None
+        # size + mtime is a cheap staleness check that never reads the file
+        if stat.st_size != entry.get("size") or stat.st_mtime_ns != entry.get("mtime_ns"):
+            return None
+        return entry
+
+    def filename_for_url(self, url: str, prefix: str = "") -> Optional[str]:
+        """Name of the file last recorded for a URL, or None if it was never scraped."""
+        for filename, entry in self._entries.items():
+            if entry.get("url") == url and entry.get("prefix", "") == prefix:
+                return filename
+        return None
+
+    def remove(self, filename: str) -> None:
+        self._entries.pop(filename, None)
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        return iter(self._entries.items())
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sync(self) -> int:
+        """
+        Backfills entries for files that predate the manifest (or were edited by hand)
+        and drops entries whose file is gone. Returns the number of entries changed.
+        """
+        changed = 0
+        on_disk = {p.name: p for p in self.data_dir.glob("*.txt")}
+
+        for name in list(self._entries):
+            if name not in on_disk:
+                del self._entries[name]
+                changed += 1
+
+        for name, file_path in on_disk.items():
+            if self.get(name) is not None:
+                continue
+            header = read_header(file_path)
+            content = file_path.read_text(encoding="utf-8")
+            prefix = next((p for p in SOURCE_PREFIXES if name.startswith(p)), "")
+            self.record(name, content, url=header.get("url"), date=header.get("date"), prefix=prefix)
+            changed += 1
+
+        if changed:
+            self.save()
+        return changed
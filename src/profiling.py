@@ -0,0 +1,98 @@
+import cProfile
+import json
+import pstats
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# Query stages, recognised by the outermost library function that implements them.
+# (path fragment, function names); the largest cumulative time among matches wins,
+# so wrappers and the functions they wrap are not counted twice.
+STAGE_FUNCTIONS = {
+    "embedding": ("embeddings", ("get_query_embedding",)),
+    "vector_search": ("vector_stores", ("query",)),
+    "postprocess": ("postprocessor", ("postprocess_nodes",)),
+    "llm": ("llms", ("chat", "stream_chat", "complete", "stream_complete")),
+}
+
+HOT_FUNCTION_COUNT = 15
+
+
+def _short_name(key: Tuple[str, int, str]) -> str:
+    filename, lineno, funcname = key
+    if filename == "~":
+        return funcname  # builtins
+    return f"{'/'.join(Path(filename).parts[-2:])}:{lineno}({funcname})"
+
+
+class QueryProfile:
+    """cProfile capture of a single query, with a per-stage breakdown and the hottest functions."""
+
+    def __init__(self, query: str, profiler: cProfile.Profile, total_seconds: float):
+        self.query = query
+        self.profiler = profiler
+        self.total_seconds = total_seconds
+        self.created_at = datetime.now()
+        stats = pstats.Stats(profiler).stats
+        self.stages = self._stage_times(stats)
+        self.hot_functions = self._hot_functions(stats)
+
+    def _stage_times(self, stats: dict) -> Dict[str, float]:
+        stages = {}
+        for stage, (path_part, names) in STAGE_FUNCTIONS.items():
+            times = [ct for (filename, _, funcname), (_, _, _, ct, _) in stats.items()
+                     if funcname in names and path_part in Path(filename).parts]
+            stages[stage] = max(times, default=0.0)
+        stages["other"] = max(0.0, self.total_seconds - sum(stages.values()))
+        return stages
+
+    def _hot_functions(self, stats: dict) -> List[dict]:
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:HOT_FUNCTION_COUNT]
+        return [{"function": _short_name(key), "calls": nc,
+                 "own_ms": round(tt * 1000, 1), "cumulative_ms": round(ct * 1000, 1)}
+                for key, (_, nc, tt, ct, _) in rows]
+
+    def set_stage(self, stage: str, seconds: float) -> None:
+        """Records a stage timed outside the profiled thread, e.g. tokens streamed by another thread."""
+        self.stages[stage] = seconds
+        measured = sum(t for name, t in self.stages.items() if name != "other")
+        self.stages["other"] = max(0.0, self.total_seconds - measured)
+
+    def to_dict(self) -> dict:
+        return {
+            "query": self.query,
+            "created_at": self.created_at.isoformat(timespec="seconds"),
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+            "hot_functions": self.hot_functions,
+        }
+
+    def dump(self, directory: Path) -> Path:
+        """
+        Writes the raw profile (.prof, readable with pstats or snakeviz) and a JSON summary.
+        Returns the .prof path.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"query_{self.created_at.strftime('%Y%m%d_%H%M%S')}"
+        self.profiler.dump_stats(str(directory / f"{stem}.prof"))
+        (directory / f"{stem}.json").write_text(json.dumps(self.to_dict(), indent=1), encoding="utf-8")
+        return directory / f"{stem}.prof"
+
+
+def profile_call(query: str, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, QueryProfile]:
+    """
+    Runs fn under cProfile and returns its result with the profile.
+    cProfile only sees the calling thread. The chat engine retrieves there, but a streamed
+    answer is generated on LlamaIndex's stream thread; time it with QueryProfile.set_stage.
+    Timings include the profiler's own overhead, so compare stages rather than absolute numbers.
+    """
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    return result, QueryProfile(query, profiler, time.perf_counter() - start)
@@ -0,0 +1,109 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import MetadataFilters
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with hit/miss counters (Streamlit serves sessions from threads)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# Shared by every session in the process. Query embeddings do not depend on the index,
+# so they survive index refreshes; retrieval results are keyed by index version.
+QUERY_EMBEDDINGS = LRUCache(maxsize=2048)
+RETRIEVALS = LRUCache(maxsize=512)
+
+
+def normalize_query(query: str) -> str:
+    """Collapses whitespace so Streamlit reruns and trivially re-typed questions share an entry."""
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def cached_query_embedding(query: str, embed_model=None, cache: LRUCache = QUERY_EMBEDDINGS) -> List[float]:
+    """Query embedding through the shared cache; the query should already be normalized."""
+    embed_model = embed_model or Settings.embed_model
+    key = (embed_model.model_name, query)
+    embedding = cache.get(key)
+    if embedding is None:
+        embedding = embed_model.get_query_embedding(query)
+        cache.put(key, embedding)
+    return embedding
+
+
+def cache_stats() -> dict:
+    return {"embeddings": QUERY_EMBEDDINGS.stats(), "retrievals": RETRIEVALS.stats()}
+
+
+class CachingRetriever(BaseRetriever):
+    """
+    Vector retriever with two caches in front of it:
+    query text -> embedding (skips the bge-small forward pass) and
+    (query, top_k, filters, index version) -> retrieved nodes (skips the Chroma search).
+    Every content change is promoted as a new collection (see index_versions.py), so the
+    collection name is the index version and a refresh invalidates old results on its own.
+    """
+
+    def __init__(self, index: VectorStoreIndex, index_version: str, similarity_top_k: int,
+                 filters: Optional[MetadataFilters] = None,
+                 embeddings: LRUCache = QUERY_EMBEDDINGS, retrievals: LRUCache = RETRIEVALS):
+        self._inner = index.as_retriever(similarity_top_k=similarity_top_k, filters=filters)
+        self._embed_model = Settings.embed_model
+        self._key_suffix = (similarity_top_k, repr(filters), index_version)
+        self._embeddings = embeddings
+        self._retrievals = retrievals
+        # Whether the latest retrieval came from the cache, for the query log
+        self.last_hit: Optional[bool] = None
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        query = normalize_query(query_bundle.query_str)
+        key = (query,) + self._key_suffix
+        nodes = self._retrievals.get(key)
+        self.last_hit = nodes is not None
+        if nodes is None:
+            if query_bundle.embedding is None:
+                query_bundle.embedding = cached_query_embedding(query, self._embed_model, self._embeddings)
+            nodes = self._inner.retrieve(query_bundle)
+            self._retrievals.put(key, nodes)
+        # Postprocessors build new lists, but never hand out the cached one itself
+        return list(nodes)
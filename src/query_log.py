@@ -0,0 +1,186 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from benchmarking import percentile
+from query_cache import normalize_query
+
+# App processes on one VM share query_logs/; without fcntl (Windows) only threads are serialized
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOG_DIRNAME = "query_logs"
+CURRENT_FILENAME = "queries.jsonl"
+LOCK_FILENAME = ".lock"
+
+# Rotate the live file at this size; rotated files are gzipped (~10x smaller)
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 20
+
+
+def query_hash(question: str) -> str:
+    """Groups repeats of a question regardless of case and spacing."""
+    return hashlib.sha1(normalize_query(question).lower().encode("utf-8")).hexdigest()[:16]
+
+
+class QueryLog:
+    """
+    Append-only log of answered questions, one compact JSON object per line:
+    t (unix time), h (question hash), q (text), m (model), v (index version),
+    n (retrieved node ids), s (stage timings in ms), c (cache hits: retrieval, faq),
+    p (retrieval plan chosen by query_router, when known).
+    The live file is rotated into numbered .jsonl.gz files; the oldest beyond
+    backup_count are deleted. Writes and rotation hold a file lock, so several app
+    processes can share one directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT):
+        self.dir = Path(directory)
+        self.path = self.dir / CURRENT_FILENAME
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def record(self, question: str, model: Optional[str], index_version: Optional[str],
+               node_ids: List[str], timings: Dict[str, float], cache: Dict[str, Optional[bool]],
+               plan: Optional[str] = None) -> None:
+        entry = {"t": round(time.time(), 1), "h": query_hash(question), "q": question, "m": model,
+                 "v": index_version, "n": node_ids,
+                 "s": {k: v for k, v in timings.items() if v is not None},
+                 "c": {k: v for k, v in cache.items() if v is not None}}
+        if plan:
+            entry["p"] = plan
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self._locked():
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                if self.path.stat().st_size >= self.max_bytes:
+                    self._rotate()
+        except OSError as e:
+            # Logging must never break answering
+            logger.error(f"Could not write query log: {e}")
+
+    @contextmanager
+    def _locked(self):
+        """Serializes writers across threads (the lock) and processes (flock on LOCK_FILENAME)."""
+        with self._lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.dir / LOCK_FILENAME, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rotated_path(self, n: int) -> Path:
+        return self.dir / f"queries.{n}.jsonl.gz"
+
+    def _rotate(self) -> None:
+        oldest = self._rotated_path(self.backup_count)
+        if oldest.exists():
+            oldest.unlink()
+        for n in range(self.backup_count - 1, 0, -1):
+            if self._rotated_path(n).exists():
+                self._rotated_path(n).rename(self._rotated_path(n + 1))
+        with open(self.path, "rb") as src, gzip.open(self._rotated_path(1), "wb") as dst:
+            dst.write(src.read())
+        self.path.unlink()
+
+    def records(self) -> Iterator[dict]:
+        """Every logged entry, oldest first, including rotated files."""
+        for n in range(self.backup_count, 0, -1):
+            if self._rotated_path(n).exists():
+                with gzip.open(self._rotated_path(n), "rt", encoding="utf-8") as f:
+                    yield from _parse_lines(f)
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                yield from _parse_lines(f)
+
+
+def _parse_lines(lines) -> Iterator[dict]:
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+def _hit_rate(records: List[dict], key: str) -> Optional[float]:
+    seen = [r["c"][key] for r in records if key in r.get("c", {})]
+    return round(sum(seen) / len(seen), 3) if seen else None
+
+
+def build_report(records: List[dict], top: int = 10) -> dict:
+    """Top and slowest questions, cache hit rates and per-stage latency from logged entries."""
+    counts = Counter(r["h"] for r in records)
+    texts = {}
+    for r in records:
+        texts.setdefault(r["h"], r["q"])
+    slowest = sorted(records, key=lambda r: r.get("s", {}).get("total_ms", 0.0), reverse=True)[:top]
+
+    stages = {}
+    for name in sorted({name for r in records for name in r.get("s", {})}):
+        values = [r["s"][name] for r in records if name in r.get("s", {})]
+        stages[name] = {"p50_ms": round(percentile(values, 50), 1), "p95_ms": round(percentile(values, 95), 1)}
+
+    return {
+        "queries": len(records),
+        "distinct": len(counts),
+        "top_queries": [{"question": texts[h], "count": c} for h, c in counts.most_common(top)],
+        "slowest": [{"question": r["q"], "total_ms": r["s"].get("total_ms"), "model": r.get("m")} for r in slowest],
+        "hit_rates": {"retrieval": _hit_rate(records, "retrieval"), "faq": _hit_rate(records, "faq")},
+        "plans": dict(Counter(r["p"] for r in records if r.get("p"))),
+        "stages": stages,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n📒 {report['queries']} queries · {report['distinct']} distinct")
+    rates = report["hit_rates"]
+    print("Hit rates: " + " · ".join(f"{k} {v:.0%}" if v is not None else f"{k} n/a" for k, v in rates.items()))
+    if report["plans"]:
+        print("Plans: " + " · ".join(f"{name} {count}" for name, count in report["plans"].items()))
+    print("\nTop queries:")
+    for q in report["top_queries"]:
+        print(f"  {q['count']:>5}  {q['question'][:80]}")
+    print("\nSlowest queries:")
+    for q in report["slowest"]:
+        print(f"  {q['total_ms'] or 0:>8.0f} ms  {q['question'][:70]}")
+    print(f"\n{'stage':<18}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, s in report["stages"].items():
+        print(f"{name:<18}{s['p50_ms']:>10}{s['p95_ms']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query log analytics.")
+    parser.add_argument("command", choices=["report", "top-questions"],
+                        help="'top-questions' prints the most asked questions, one per line (input for faq_store.py)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    log = QueryLog(str(Path(__file__).parent.parent / LOG_DIRNAME))
+    report = build_report(list(log.records()), top=args.top)
+    if args.command == "top-questions":
+        for q in report["top_queries"]:
+            print(q["question"])
+    else:
+        print_report(report)
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, indent=1), encoding="utf-8")
@@ -0,0 +1,208 @@
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.chat_engine.context import DEFAULT_CONTEXT_TEMPLATE
+from llama_index.core.postprocessor import FixedRecencyPostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.utils import get_tokenizer
+
+from query_cache import CachingRetriever, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Chunks searched (top_k), chunks handed to the LLM (keep) and whether the newest of
+# them win (recency) per query type. "general" is the fixed 7 -> 3 setup used before.
+# Chunks run up to ~1000 tokens, so the kept ones are also trimmed to the LLM's context
+# window (see context_token_budget).
+QUERY_PLANS: Dict[str, dict] = {
+    "lookup": {"top_k": 3, "keep": 2, "recency": False},
+    "general": {"top_k": 7, "keep": 3, "recency": True},
+    "recent": {"top_k": 10, "keep": 4, "recency": True},
+    "strategy": {"top_k": 12, "keep": 6, "recency": True},
+}
+
+_RECENT_RE = re.compile(r"\b(patch(es)?|update[sd]?|hotfix|changelog|latest|recent(ly)?|new in|changed"
+                        r"|dev diar(y|ies)|tinto|\d+\.\d+(\.\d+)?)\b")
+_STRATEGY_RE = re.compile(r"\b(how should|should i|best|strateg\w*|guide|tips?|optimal|optimi[sz]e|compare"
+                          r"|comparison|versus|vs|differences?|why|explain|approach|opening|early game|late game)\b")
+_LOOKUP_RE = re.compile(r"\b(console|command|cheat|hotkey|shortcut|keybind|called|name of|id of)\b")
+_LOOKUP_START_RE = re.compile(r"^(what is|what's|what are|who (is|was)|when (is|was|did|does)|where is"
+                              r"|how many|how much|which)\b")
+
+# Strategy questions tend to be long; short "what is X" questions are lookups
+LONG_QUERY_WORDS = 20
+SHORT_QUERY_WORDS = 8
+
+# Window tokens never given to retrieved context: ContextChatEngine's reserve for the answer
+# (its memory limit is context_window - 256) plus room for the question and recent history
+ANSWER_RESERVE_TOKENS = 256
+HISTORY_RESERVE_TOKENS = 512
+
+# Split compound questions into sub-queries retrieved in parallel (see split_compound_query)
+MULTI_QUERY = os.getenv("EU5_MULTI_QUERY", "0") == "1"
+MAX_SUBQUERIES = 4
+
+# A new clause starts at '?', ';' or an 'and' followed by a question word
+_CLAUSE_RE = re.compile(r"[?;]\s+|,?\s+and\s+(?=(how|what|why|which|when|where|who|does|do|is|are|can|should|will)\b)",
+                        re.IGNORECASE)
+_COMPARE_RE = re.compile(r"^(?:compare|comparing|differences? between)\s+(.+?)\s+(?:and|with|to|vs\.?|versus)\s+(.+)$",
+                         re.IGNORECASE)
+_VERSUS_RE = re.compile(r"^(.+?)\s+(?:vs\.?|versus)\s+(.+)$", re.IGNORECASE)
+
+# Sub-query searches of all sessions share one pool instead of starting threads per question
+_SUBQUERY_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="subquery")
+
+
+def split_compound_query(query: str) -> List[str]:
+    """
+    'compare estates and parliament and how they affect control' ->
+    [<the full question>, 'estates', 'parliament', 'how they affect control'].
+    The full question always comes first, so the merged context is never worse than a
+    single retrieval; a question with one clause is returned as is.
+    """
+    query = normalize_query(query)
+    parts = []
+    for clause in _CLAUSE_RE.split(query)[::2]:
+        clause = clause.strip(" ?.,")
+        if not clause:
+            continue
+        match = _COMPARE_RE.match(clause) or _VERSUS_RE.match(clause)
+        if match:
+            parts.extend(part.strip(" ?.,") for part in match.groups())
+        else:
+            parts.append(clause)
+    if len(parts) < 2:
+        return [query]
+    return list(dict.fromkeys([query] + parts))[:MAX_SUBQUERIES + 1]
+
+
+def merge_results(results: List[List[NodeWithScore]]) -> List[NodeWithScore]:
+    """Interleaves ranked lists (each sub-query's best chunk first), dropping chunks already taken."""
+    merged, seen = [], set()
+    for rank in range(max((len(r) for r in results), default=0)):
+        for nodes in results:
+            if rank < len(nodes) and nodes[rank].node.node_id not in seen:
+                seen.add(nodes[rank].node.node_id)
+                merged.append(nodes[rank])
+    return merged
+
+
+def count_tokens(text: str) -> int:
+    """Tokens as ContextChatEngine's memory counts them."""
+    return len(get_tokenizer()(text))
+
+
+def context_token_budget(context_window: int, system_prompt: str) -> int:
+    """
+    Tokens of retrieved context that fit next to the system prompt. ContextChatEngine raises
+    'Initial token count exceeds token limit' when system prompt plus context are over its limit.
+    """
+    overhead = count_tokens(system_prompt + "\n" + DEFAULT_CONTEXT_TEMPLATE)
+    return context_window - ANSWER_RESERVE_TOKENS - HISTORY_RESERVE_TOKENS - overhead
+
+
+def fit_to_budget(nodes: List[NodeWithScore], max_tokens: Optional[int]) -> List[NodeWithScore]:
+    """Keeps nodes in order, skipping any that would push the context text past max_tokens."""
+    if max_tokens is None:
+        return nodes
+    kept, used = [], 0
+    for node in nodes:
+        # As ContextChatEngine renders it: text with metadata, chunks joined by a blank line
+        tokens = count_tokens(node.node.get_content(metadata_mode=MetadataMode.LLM)) + 2
+        if used + tokens <= max_tokens:
+            kept.append(node)
+            used += tokens
+    if len(kept) < len(nodes):
+        logger.info(f"Context budget: kept {len(kept)}/{len(nodes)} chunks ({used}/{max_tokens} tokens)")
+    return kept
+
+
+def classify_query(query: str) -> str:
+    """
+    Picks a QUERY_PLANS key from surface features of the question (a few regexes, microseconds).
+    Patch and dev-diary questions want the newest sources, strategy questions broad context,
+    and name/command lookups a couple of exact matches.
+    """
+    q = normalize_query(query).lower()
+    words = len(q.split())
+    if _RECENT_RE.search(q):
+        return "recent"
+    if _STRATEGY_RE.search(q) or words > LONG_QUERY_WORDS:
+        return "strategy"
+    if _LOOKUP_RE.search(q) or (words <= SHORT_QUERY_WORDS and _LOOKUP_START_RE.search(q)):
+        return "lookup"
+    return "general"
+
+
+class AdaptiveRetriever(BaseRetriever):
+    """
+    Chooses retrieval depth and context budget per question (see QUERY_PLANS).
+    Each plan has its own CachingRetriever, so cached results never mix depths.
+    The recency reranking that used to be a chat-engine postprocessor is applied here,
+    with the plan's budget. With max_context_tokens (see context_token_budget) the kept
+    chunks are also trimmed to what fits the LLM's context window.
+    With multi_query, compound questions are split into sub-queries whose embeddings and
+    vector searches run concurrently; the merged chunks share the question's token budget
+    (without one, they get one extra slot per sub-query).
+    """
+
+    def __init__(self, index: VectorStoreIndex, index_version: str, plans: Dict[str, dict] = QUERY_PLANS,
+                 multi_query: bool = MULTI_QUERY, max_context_tokens: Optional[int] = None):
+        self._plans = plans
+        self.max_context_tokens = max_context_tokens
+        self.multi_query = multi_query
+        self._retrievers = {name: CachingRetriever(index, index_version=index_version,
+                                                   similarity_top_k=plan["top_k"])
+                            for name, plan in plans.items()}
+        self._recency = {name: FixedRecencyPostprocessor(top_k=plan["keep"], date_key="date")
+                         for name, plan in plans.items() if plan["recency"]}
+        self._last_retriever: Optional[CachingRetriever] = None
+        # Plan chosen for the latest question and how long choosing took, for the query log
+        self.last_plan: Optional[dict] = None
+        super().__init__()
+
+    @property
+    def last_hit(self) -> Optional[bool]:
+        return self._last_retriever.last_hit if self._last_retriever is not None else None
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        start = time.perf_counter()
+        name = classify_query(query_bundle.query_str)
+        classify_ms = (time.perf_counter() - start) * 1000
+        self.last_plan = {"type": name, "classify_ms": round(classify_ms, 3)}
+        logger.info(f"Query plan '{name}' ({classify_ms:.2f} ms): {query_bundle.query_str[:60]!r}")
+
+        self._last_retriever = self._retrievers[name]
+        subqueries = split_compound_query(query_bundle.query_str) if self.multi_query else []
+        if len(subqueries) > 1:
+            return self._retrieve_subqueries(name, subqueries, query_bundle)
+        nodes = self._last_retriever.retrieve(query_bundle)
+        if name in self._recency:
+            nodes = self._recency[name].postprocess_nodes(nodes, query_bundle=query_bundle)
+        return fit_to_budget(nodes[:self._plans[name]["keep"]], self.max_context_tokens)
+
+    def _retrieve_subqueries(self, name: str, subqueries: List[str], query_bundle: QueryBundle) -> List[NodeWithScore]:
+        start = time.perf_counter()
+        retriever = self._last_retriever
+        results = list(_SUBQUERY_POOL.map(lambda q: retriever.retrieve(QueryBundle(q)), subqueries))
+        nodes = merge_results(results)
+        # Sub-queries finish in any order, so a single cache-hit flag would be meaningless
+        self._last_retriever = None
+        self.last_plan["subqueries"] = len(subqueries)
+        logger.info(f"Retrieved {len(subqueries)} sub-queries in {(time.perf_counter() - start) * 1000:.0f} ms, "
+                    f"{len(nodes)} distinct chunks")
+        if self.max_context_tokens is None:
+            nodes = nodes[:self._plans[name]["keep"] + len(subqueries) - 1]
+        else:
+            # Every sub-query's chunk costs context tokens: the merge order decides what fits
+            nodes = fit_to_budget(nodes, self.max_context_tokens)
+        if name in self._recency:
+            recency = FixedRecencyPostprocessor(top_k=len(nodes), date_key="date")
+            return recency.postprocess_nodes(nodes, query_bundle=query_bundle)
+        return nodes
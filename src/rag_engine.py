@@ -1,140 +1,340 @@
 import chromadb
+import logging
 from pathlib import Path
 from llama_index.core import (
     VectorStoreIndex,
     StorageContext,
-    SimpleDirectoryReader,
     Settings
 )
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core.postprocessor import FixedRecencyPostprocessor
 from llama_index.core.llms import LLM
-from datetime import datetime
 import streamlit as st
+from manifest import CorpusManifest
+from json_store import read_json, write_json
+from index_builder import IndexBuilder, BuildCheckpoint, copy_collection, register_collection
+from dedup import NearDuplicateFilter
+from query_cache import CachingRetriever
+from query_router import AdaptiveRetriever, MULTI_QUERY, context_token_budget
+from generation import CancellableChatEngine
+from index_versions import IndexVersions
+from shards import SHARDED_INDEX, SHARDS, ShardedIndex, active_version, shard_collections, shard_for, shard_versions
+from typing import Dict, List, Optional, Set, Union
 
-def extract_metadata_from_file(file_path: Path) -> dict:
-    """
-    Helper function to extract the 'date' from the file content.
-    Expects a line 'Ingestion Date: YYYY-MM-DD'
-    """
-    metadata = {}
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if "Source Date:" in line:
-                    date_str = line.split("Source Date:")[1].strip()
-                    # Ensure it's stored as an ISO string for LlamaIndex to parse
-                    metadata["date"] = date_str
-                    break
-    except Exception:
-        pass
-    
-    # Fallback to file creation time if no date found
-    if "date" not in metadata:
-        metadata["date"] = datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d')
-        
-    return metadata
+from embedding_server import create_embed_model
 
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+logger = logging.getLogger(__name__)
+
+# Kept byte-identical across turns and sessions, and sent first: ContextChatEngine puts the
+# system prompt ahead of the retrieved context and chat history, so Ollama can reuse its
+# cached evaluation of this prefix instead of re-processing it on every answer.
+SYSTEM_PROMPT = (
+    "You are the EU5 Oracle - an expert strategic advisor for Europa Universalis 5 (Project Caesar). "
+    "Your role is to provide actionable, strategic gameplay advice based on the provided context.\n\n"
+    
+    "## Core Principles:\n"
+    "1. STRATEGY FRAMEWORK: When giving advice, always consider:\n"
+    "   - Short-term tactical goals (this war, this economy cycle)\n"
+    "   - Long-term empire building (next 50 years of gameplay)\n"
+    "   - Risk vs Reward (opportunity cost of decisions)\n"
+    "2. EXPLAIN THE WHY: Don't just tell players what to do - explain the strategic reasoning\n"
+    "3. TIERED ADVICE: Provide both beginner-friendly basics AND advanced tactics when relevant\n"
+    "4. CONCRETE EXAMPLES: Use specific countries, mechanics, or scenarios to illustrate points\n\n"
+    
+    "## Answer Structure:\n"
+    "- Start with a direct answer to the question\n"
+    "- Follow with strategic context (why this matters in the bigger picture)\n"
+    "- Provide actionable steps when applicable\n"
+    "- Mention related mechanics or pitfalls to avoid\n\n"
+    
+    "## Knowledge Boundaries:\n"
+    "- Base answers STRICTLY on the provided context (wiki docs, dev diaries, tutorials)\n"
+    "- Prioritize the MOST RECENT information (EU5 is in active development - patch notes matter!)\n"
+    "- If context doesn't contain the answer, admit 'I don't have information about X in my knowledge base' "
+    "rather than hallucinating mechanics\n"
+    "- Never confuse EU4 mechanics with EU5 - they are different games\n\n"
+    
+    "Remember: You're not just a documentation lookup tool - you're a strategic advisor helping players "
+    "make better decisions and understand the deeper systems of EU5. Think like a grand strategy coach."
+)
 
 class RAGEngine:
     """
     Manages the RAG pipeline using LlamaIndex and ChromaDB.
     Handles data indexing, persistence, and querying.
+    With EU5_SHARDED_INDEX=1 every source type (see shards.py) lives in its own versioned
+    collection: shards are rebuilt independently and searched concurrently.
     """
 
-    def __init__(self, data_dir: str, chroma_dir: str):
+    def __init__(self, data_dir: str, chroma_dir: str, collection_name: Optional[str] = None):
         """
         Initializes the RAG Engine paths.
+        Serves the currently promoted index version unless a collection name is given
+        (for the sharded layout, a version as returned by shards.active_version()).
         """
-        # Enforce local embedding model to avoid OpenAI dependency
-        Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
+        # Enforce local embedding model to avoid OpenAI dependency.
+        # With EU5_EMBED_SERVER_URL set, workers share one model via embedding_server.py.
+        Settings.embed_model = create_embed_model()
         
         self.data_dir = Path(data_dir)
         self.chroma_dir = Path(chroma_dir)
+        self.versions = IndexVersions(str(self.chroma_dir))
+        self.sharded = SHARDED_INDEX
+        self.shard_versions = shard_versions(str(self.chroma_dir)) if self.sharded else {}
+        self.collection_name = collection_name or active_version(str(self.chroma_dir))
         self._db = chromadb.PersistentClient(path=str(self.chroma_dir))
-        self._chroma_collection = self._db.get_or_create_collection("eu5_docs")
+        # Sharded versions name one collection per shard, opened in load_index()
+        self._chroma_collection = None if self.sharded else self._db.get_or_create_collection(self.collection_name)
+
+    def _checkpoint_path(self, collection_name: str) -> Path:
+        # Present only while a build is running or was interrupted
+        return self.chroma_dir / f"build_checkpoint_{collection_name}.json"
+
+    def _duplicates_path(self, collection_name: str) -> Path:
+        # Which files had chunks dropped as near-copies of which, for the chunks in this collection
+        return self.chroma_dir / f"dedup_{collection_name}.json"
+
+    def _load_duplicates(self, collection_name: str) -> Dict[str, List[str]]:
+        return read_json(self._duplicates_path(collection_name), {})
 
-    def load_index(self) -> VectorStoreIndex:
+    def _save_duplicates(self, collection_name: str, dedup: NearDuplicateFilter,
+                         carried: Optional[Dict[str, List[str]]] = None) -> None:
+        """Records the dedup matches of a build, plus those still valid from the version it updated."""
+        duplicates = {winner: set(copies) for winner, copies in (carried or {}).items()}
+        for winner, copies in dedup.duplicates_of.items():
+            duplicates.setdefault(winner, set()).update(copies)
+        write_json(self._duplicates_path(collection_name),
+                   {winner: sorted(copies) for winner, copies in sorted(duplicates.items()) if copies})
+
+    def _copies_of(self, collection_name: str, filenames: List[str]) -> Set[str]:
+        """Files in a collection that had chunks dropped as near-copies of chunks of the given files."""
+        duplicates = self._load_duplicates(collection_name)
+        return {copy for f in filenames for copy in duplicates.get(f, ())} - set(filenames)
+
+    def _data_files(self, shard: Optional[str] = None) -> List[Path]:
+        txt_files = list(self.data_dir.glob("*.txt"))
+        if not txt_files:
+            txt_files = [p for p in self.data_dir.iterdir() if p.is_file() and not p.name.startswith(".")]
+        if shard is not None:
+            txt_files = [p for p in txt_files if shard_for(p.name) == shard]
+        return txt_files
+
+    def _dedup_filter(self, shard: Optional[str] = None, collections: Optional[Dict[str, str]] = None) -> NearDuplicateFilter:
         """
-        Loads the index from ChromaDB.
-        OPTIMIZATION: Prioritizes speed. Only reads from disk if DB is empty.
-        To force a refresh, the user should clear the DB or we can add a specific sync button later.
+        Duplicate filter for a build. A shard's filter is seeded with the chunks of the shards
+        ahead of it in source priority, so a Tinto Talks post quoted on the wiki stays dropped
+        even though the two are built separately.
         """
+        dedup = NearDuplicateFilter()
+        if shard is None:
+            return dedup
+        collections = collections or {s: versions.active() for s, versions in self.shard_versions.items()}
+        existing = {c.name for c in self._db.list_collections()}
+        for earlier in SHARDS[:SHARDS.index(shard)]:
+            if collections.get(earlier) in existing:
+                register_collection(self._db.get_collection(collections[earlier]), dedup)
+        return dedup
+
+    def _build_into(self, vector_store: ChromaVectorStore, collection_name: str, shard: Optional[str] = None,
+                    collections: Optional[Dict[str, str]] = None) -> dict:
+        files = self._data_files(shard)
+        if not files:
+            # Nothing to index (e.g. no YouTube transcripts yet): skip seeding the dedup filter
+            BuildCheckpoint(self._checkpoint_path(collection_name)).clear()
+            return {"files": 0, "nodes": 0}
+        # Files are read and split across cores, nodes are embedded and upserted in
+        # checkpointed batches so memory stays bounded and a restart resumes the build
+        dedup = self._dedup_filter(shard, collections)
+        builder = IndexBuilder(
+            vector_store,
+            manifest=CorpusManifest(str(self.data_dir)),
+            checkpoint_path=self._checkpoint_path(collection_name),
+            dedup=dedup
+        )
+        stats = builder.build(files)
+        self._save_duplicates(collection_name, dedup)
+        return stats
+
+    def _load_collection(self, collection, collection_name: str, shard: Optional[str] = None,
+                         collections: Optional[Dict[str, str]] = None) -> VectorStoreIndex:
         # 1. Setup Storage Context (Points to existing ChromaDB)
-        vector_store = ChromaVectorStore(chroma_collection=self._chroma_collection)
+        vector_store = ChromaVectorStore(chroma_collection=collection)
         storage_context = StorageContext.from_defaults(vector_store=vector_store)
         
-        # 2. Fast Path: If DB has data, load it directly without reading files
-        if self._chroma_collection.count() > 0:
+        # 2. Fast Path: If DB has data (and no build was interrupted), load it directly without reading files
+        checkpoint = BuildCheckpoint(self._checkpoint_path(collection_name))
+        if collection.count() > 0 and not checkpoint.exists():
             return VectorStoreIndex.from_vector_store(
                 vector_store, storage_context=storage_context
             )
 
-        # 3. Slow Path: First time setup or empty DB
-        txt_files = list(self.data_dir.glob("*.txt"))
-        if not txt_files:
-            txt_files = [p for p in self.data_dir.iterdir() if p.is_file() and not p.name.startswith(".")]
-
-        documents = SimpleDirectoryReader(
-            input_files=txt_files,
-            file_metadata=extract_metadata_from_file
-        ).load_data()
+        # 3. Slow Path: First time setup, empty DB or resuming an interrupted build
+        self._build_into(vector_store, collection_name, shard, collections)
         
-        return VectorStoreIndex.from_documents(
-            documents, storage_context=storage_context
+        return VectorStoreIndex.from_vector_store(
+            vector_store, storage_context=storage_context
         )
 
-    def get_chat_engine(self, llm: LLM) -> any:
+    def load_index(self) -> Union[VectorStoreIndex, ShardedIndex]:
+        """
+        Loads the index from ChromaDB.
+        OPTIMIZATION: Prioritizes speed. Only reads from disk if DB is empty.
+        To refresh without downtime, build and promote a new version with refresh_index().
+        In the sharded layout each shard is loaded (or built) on its own; empty ones are skipped.
+        """
+        if not self.sharded:
+            return self._load_collection(self._chroma_collection, self.collection_name)
+
+        collections = shard_collections(self.collection_name)
+        indexes = {}
+        for shard, name in collections.items():
+            collection = self._db.get_or_create_collection(name)
+            if collection.count() == 0 and not self._data_files(shard):
+                # Empty and nothing to build it from; checked on every load, so keep it cheap
+                continue
+            index = self._load_collection(collection, name, shard, collections)
+            if collection.count() > 0:
+                indexes[shard] = index
+        return ShardedIndex(indexes)
+
+    def refresh_index(self, shards: Optional[List[str]] = None) -> str:
+        """
+        Builds a new index version from data/ next to the live one, then promotes it.
+        Readers keep using the current version until the pointer swap; the previous
+        version is kept for rollback and older ones are dropped.
+        In the sharded layout only the given shards (default: all) are rebuilt.
+        Returns the new index version.
+        """
+        if not self.sharded:
+            if shards:
+                raise ValueError("Rebuilding single shards needs the sharded index (EU5_SHARDED_INDEX=1)")
+            return self._rebuild()
+        for shard in shards or SHARDS:
+            self._rebuild(shard)
+        return active_version(str(self.chroma_dir))
+
+    def _rebuild(self, shard: Optional[str] = None) -> str:
+        versions = self.shard_versions[shard] if shard else self.versions
+        name = versions.reserve_next()
+        # Resume a checkpointed build; anything else left in the slot is discarded
+        if not BuildCheckpoint(self._checkpoint_path(name)).exists() and \
+                name in [c.name for c in self._db.list_collections()]:
+            self._db.delete_collection(name)
+        collection = self._db.get_or_create_collection(name)
+        self._build_into(ChromaVectorStore(chroma_collection=collection), name, shard)
+        versions.promote(name)
+        self._drop_retired_versions(versions)
+        return name
+
+    def update_documents(self, filenames: List[str]) -> str:
+        """
+        Applies changed (or deleted) data/ files to a new index version and promotes it.
+        Nodes of all other files are copied with their stored embeddings, so only the
+        changed files are re-embedded. Files that had chunks dropped as near-copies of a
+        changed file are re-embedded too, so those chunks come back if the original is gone.
+        Returns the promoted index version.
+        In the sharded layout only the shards holding the changed files (or copies of them)
+        get a new version.
+        """
+        if not self.sharded:
+            return self._update(filenames)
+        for shard, versions in self.shard_versions.items():
+            changed = [f for f in filenames if shard_for(f) == shard]
+            # A changed wiki page can hold the kept copy of chunks dropped from a Tinto Talks file
+            if changed or self._copies_of(versions.active(), filenames):
+                self._update(filenames, shard)
+        return active_version(str(self.chroma_dir))
+
+    def _update(self, filenames: List[str], shard: Optional[str] = None) -> str:
+        versions = self.shard_versions[shard] if shard else self.versions
+        active = versions.active()
+        if active == versions.base_name:
+            # The original collection was built with random document ids, so its
+            # nodes can't be matched to files; replace it with a full build once.
+            # (A shard never promoted yet has nothing to carry over either.)
+            return self._rebuild(shard)
+
+        name = versions.reserve_next()
+        # A half-finished update can't be resumed safely, start the version from scratch
+        if name in [c.name for c in self._db.list_collections()]:
+            self._db.delete_collection(name)
+        target = self._db.create_collection(name)
+
+        changed = {f for f in filenames if shard is None or shard_for(f) == shard}
+        # Chunks dropped as copies of a changed file may have lost their kept copy: re-check those files
+        restored = self._copies_of(active, filenames)
+        reembed = changed | restored
+
+        # Carried-over chunks seed the dedup filter, so changed files are checked against them too
+        dedup = self._dedup_filter(shard)
+        copied = copy_collection(self._db.get_collection(active), target, exclude_doc_ids=reembed, dedup=dedup)
+        changed_files = [self.data_dir / f for f in sorted(reembed) if (self.data_dir / f).exists()]
+        builder = IndexBuilder(ChromaVectorStore(chroma_collection=target), manifest=CorpusManifest(str(self.data_dir)),
+                               dedup=dedup)
+        stats = builder.build(changed_files)
+        # Matches of files that were not re-checked still hold
+        carried = {winner: [f for f in copies if f not in reembed]
+                   for winner, copies in self._load_duplicates(active).items()}
+        self._save_duplicates(name, dedup, carried)
+        logger.info(f"Incremental update {name}: {copied} nodes carried over, {stats['nodes']} re-embedded"
+                    + (f" ({len(restored)} files restored from dedup)" if restored else ""))
+
+        versions.promote(name)
+        self._drop_retired_versions(versions)
+        return name
+
+    def _drop_retired_versions(self, versions: IndexVersions) -> None:
+        for old_name in versions.retired(c.name for c in self._db.list_collections()):
+            self._db.delete_collection(old_name)
+            self._duplicates_path(old_name).unlink(missing_ok=True)
+
+    def get_chat_engine(self, llm: LLM, adaptive: bool = True,
+                        multi_query: bool = MULTI_QUERY, sources: Optional[List[str]] = None) -> any:
         """
         Returns a chat engine powered by the loaded/built index.
         Uses optimized retrieval settings for better accuracy.
         Includes a Recency Postprocessor to prioritize newer information.
+        With adaptive=True retrieval depth and context size follow the question type
+        (see query_router.py); otherwise every question retrieves 7 chunks and keeps 3.
+        multi_query (adaptive only, EU5_MULTI_QUERY=1) splits compound questions into
+        sub-queries that are searched in parallel and merged before one generation.
+        sources (sharded index only) limits retrieval to those shards, e.g. ["tinto"].
         """
         Settings.llm = llm
         index = self.load_index()
+        index_version = self.collection_name
+        if sources:
+            if not self.sharded:
+                raise ValueError("Scoping to sources needs the sharded index (EU5_SHARDED_INDEX=1)")
+            index = index.subset(sources)
+            # Scoped results must not be served to unscoped questions from the cache
+            index_version = f"{self.collection_name}@{','.join(sorted(sources))}"
         
-        # Recency postprocessor to prioritize recent information
-        recency_postprocessor = FixedRecencyPostprocessor(
-            top_k=3, 
-            date_key="date"
-        )
+        if adaptive:
+            # Plans carry their own recency reranking and context budget, capped to the LLM's window
+            retriever = AdaptiveRetriever(index, index_version=index_version, multi_query=multi_query,
+                                          max_context_tokens=context_token_budget(llm.metadata.context_window,
+                                                                                  SYSTEM_PROMPT))
+            node_postprocessors = []
+        else:
+            # Repeated questions (and Streamlit reruns) skip both the query embedding and the Chroma search
+            retriever = CachingRetriever(
+                index,
+                index_version=index_version,
+                similarity_top_k=7  # Increased from 5 for better context coverage
+            )
+            # Recency postprocessor to prioritize recent information
+            node_postprocessors = [FixedRecencyPostprocessor(top_k=3, date_key="date")]
 
-        return index.as_chat_engine(
-            chat_mode="context",
-            similarity_top_k=7,  # Increased from 5 for better context coverage
-            node_postprocessors=[recency_postprocessor],
-            system_prompt=(
-                "You are the EU5 Oracle - an expert strategic advisor for Europa Universalis 5 (Project Caesar). "
-                "Your role is to provide actionable, strategic gameplay advice based on the provided context.\n\n"
-                
-                "## Core Principles:\n"
-                "1. STRATEGY FRAMEWORK: When giving advice, always consider:\n"
-                "   - Short-term tactical goals (this war, this economy cycle)\n"
-                "   - Long-term empire building (next 50 years of gameplay)\n"
-                "   - Risk vs Reward (opportunity cost of decisions)\n"
-                "2. EXPLAIN THE WHY: Don't just tell players what to do - explain the strategic reasoning\n"
-                "3. TIERED ADVICE: Provide both beginner-friendly basics AND advanced tactics when relevant\n"
-                "4. CONCRETE EXAMPLES: Use specific countries, mechanics, or scenarios to illustrate points\n\n"
-                
-                "## Answer Structure:\n"
-                "- Start with a direct answer to the question\n"
-                "- Follow with strategic context (why this matters in the bigger picture)\n"
-                "- Provide actionable steps when applicable\n"
-                "- Mention related mechanics or pitfalls to avoid\n\n"
-                
-                "## Knowledge Boundaries:\n"
-                "- Base answers STRICTLY on the provided context (wiki docs, dev diaries, tutorials)\n"
-                "- Prioritize the MOST RECENT information (EU5 is in active development - patch notes matter!)\n"
-                "- If context doesn't contain the answer, admit 'I don't have information about X in my knowledge base' "
-                "rather than hallucinating mechanics\n"
-                "- Never confuse EU4 mechanics with EU5 - they are different games\n\n"
-                
-                "Remember: You're not just a documentation lookup tool - you're a strategic advisor helping players "
-                "make better decisions and understand the deeper systems of EU5. Think like a grand strategy coach."
-            ),
+        # Streamed answers can be cancelled mid-generation (see generation.py)
+        chat_engine = CancellableChatEngine.from_defaults(
+            retriever=retriever,
+            llm=llm,
+            node_postprocessors=node_postprocessors,
+            system_prompt=SYSTEM_PROMPT,
             verbose=False
         )
+        return chat_engine
 
 @st.cache_resource(show_spinner="Waking up the Oracle...")
 def get_cached_chat_engine(data_dir: str, chroma_dir: str, _llm: LLM, model_name: str) -> any:
@@ -0,0 +1,154 @@
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ingestion import CORE_WIKI_URLS, TINTO_TALKS_URLS, DataIngestor
+from json_store import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+# Seconds between re-checks per priority. Dev diaries and patch notes change often,
+# the bulk of the wiki rarely does.
+CHECK_INTERVALS = {
+    "hot": 6 * HOUR,
+    "stable": 7 * 24 * HOUR,
+}
+
+# Wiki pages that track the live game and are re-checked as often as Tinto Talks
+HOT_WIKI_PAGES = ("Patches", "Developer_diaries", "Downloadable_content")
+
+# Politeness delay between two requests to the same sites
+REQUEST_DELAY = 1.0
+
+STATE_FILENAME = ".schedule_state.json"
+
+
+def default_sources(include_wiki: bool = True, include_tinto: bool = True) -> List[Tuple[str, str, str]]:
+    """(url, prefix, priority) for every automatically scraped source."""
+    sources = []
+    for url in CORE_WIKI_URLS if include_wiki else []:
+        slug = url.rstrip("/").split("/")[-1]
+        sources.append((url, "", "hot" if slug in HOT_WIKI_PAGES else "stable"))
+    for url in TINTO_TALKS_URLS if include_tinto else []:
+        sources.append((url, "tinto_", "hot"))
+    return sources
+
+
+class IngestionScheduler:
+    """
+    Long-running re-ingestion loop.
+    Re-checks each source once its priority interval has passed, lets DataIngestor
+    skip unchanged pages (conditional GET + body hash), and hands the files that
+    actually changed to an incremental index update.
+    """
+
+    def __init__(self, ingestor: DataIngestor, on_change: Callable[[List[str]], object],
+                 sources: Optional[List[Tuple[str, str, str]]] = None,
+                 intervals: Optional[Dict[str, int]] = None, wiki_sync=None, tinto_poller=None):
+        """
+        Args:
+            ingestor: DataIngestor writing to the data/ directory.
+            on_change: Called with the changed filenames after each cycle (e.g. RAGEngine.update_documents).
+            sources: (url, prefix, priority) tuples; defaults to the core wiki and Tinto Talks lists.
+            intervals: Seconds between checks per priority.
+            wiki_sync: Optional WikiApiSync. When given, wiki pages are tracked through the
+                MediaWiki change feed every cycle instead of being re-scraped on an interval.
+            tinto_poller: Optional TintoPoller. When given, Tinto Talks threads are followed
+                through their RSS feeds every cycle, appending only new posts.
+        """
+        self.ingestor = ingestor
+        self.on_change = on_change
+        self.wiki_sync = wiki_sync
+        self.tinto_poller = tinto_poller
+        # Sources followed through the API or RSS are not scraped too, or they would be indexed twice
+        if sources is None:
+            polled = ingestor.polled_tinto_urls()
+            sources = [source for source in default_sources(include_wiki=wiki_sync is None,
+                                                            include_tinto=tinto_poller is None)
+                       if source[0] not in polled]
+        self.sources = sources
+        self.intervals = intervals or CHECK_INTERVALS
+        self.state_path = ingestor.data_dir / STATE_FILENAME
+        self._last_checked: Dict[str, float] = self._load_state()
+        # Files scraped before the manifest existed need entries to diff against
+        self.ingestor.manifest.sync()
+
+    def _load_state(self) -> Dict[str, float]:
+        return read_json(self.state_path, {})
+
+    def _save_state(self) -> None:
+        write_json(self.state_path, self._last_checked)
+
+    def due_sources(self, now: float) -> List[Tuple[str, str, str]]:
+        """Sources whose interval has elapsed, hot ones first, most overdue first within a priority."""
+        due = [s for s in self.sources
+               if now - self._last_checked.get(s[0], 0) >= self.intervals[s[2]]]
+        priority_order = list(self.intervals)
+        return sorted(due, key=lambda s: (priority_order.index(s[2]), self._last_checked.get(s[0], 0)))
+
+    def run_once(self, now: Optional[float] = None) -> List[str]:
+        """Checks every due source once and returns the data/ files that changed."""
+        now = now if now is not None else time.time()
+        changed = []
+        if self.wiki_sync is not None:
+            # Polling the change feed is a single request when nothing was edited
+            changed.extend(self.wiki_sync.sync())
+        if self.tinto_poller is not None:
+            # Unchanged feeds answer 304, threads with new replies only append those posts
+            changed.extend(self.tinto_poller.poll())
+
+        for url, prefix, priority in self.due_sources(now):
+            filename = self.ingestor.filename_for_url(url, prefix)
+            before = self.ingestor.manifest.get(filename)
+            if self.ingestor.scrape_url(url, prefix=prefix):
+                after = self.ingestor.manifest.get(filename)
+                if after and (before is None or before["sha256"] != after["sha256"]):
+                    changed.append(filename)
+                self._last_checked[url] = now
+            self._save_state()
+            time.sleep(REQUEST_DELAY)
+
+        if changed:
+            logger.info(f"{len(changed)} documents changed, updating index: {changed[:5]}")
+            self.on_change(changed)
+        return changed
+
+    def run_forever(self, poll_seconds: int = 300) -> None:
+        """Runs check cycles until interrupted, sleeping between cycles."""
+        logger.info(f"Scheduler started for {len(self.sources)} sources")
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                # A failed cycle (network, index) must not kill the daemon
+                logger.error(f"Re-ingestion cycle failed: {e}")
+            time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    import sys
+    from rag_engine import RAGEngine
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    ingestor = DataIngestor(str(root_dir / "data"))
+    engine = RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db"))
+    wiki_sync = None
+    if "--wiki-api" in sys.argv:
+        from wiki_api import WikiApiSync
+        wiki_sync = WikiApiSync(ingestor)
+    tinto_poller = None
+    if "--tinto-rss" in sys.argv:
+        from tinto_poller import TintoPoller
+        tinto_poller = TintoPoller(ingestor)
+    scheduler = IngestionScheduler(ingestor, on_change=engine.update_documents,
+                                   wiki_sync=wiki_sync, tinto_poller=tinto_poller)
+
+    print("🌍 Starting re-ingestion scheduler...")
+    if "--once" in sys.argv:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
@@ -0,0 +1,118 @@
+import heapq
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import MetadataFilters
+
+from index_versions import BASE_COLLECTION, IndexVersions
+from query_cache import cached_query_embedding, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Serve the index as one collection per source type instead of a single eu5_docs collection
+SHARDED_INDEX = os.getenv("EU5_SHARDED_INDEX", "0") == "1"
+
+# Shard per data/ filename prefix (see manifest.SOURCE_PREFIXES); unprefixed files are wiki pages.
+# Listed in dedup.SOURCE_PRIORITY order: a shard's chunks win over copies in later shards.
+SHARD_PREFIXES = {"tinto": "tinto_", "manual": "manual_", "youtube": "youtube_"}
+SHARDS = ("wiki",) + tuple(SHARD_PREFIXES)
+
+# A sharded index version names the live collection of every shard, joined by this
+VERSION_SEPARATOR = "+"
+
+# Shard searches of all sessions share one pool instead of starting threads per question
+_SHARD_POOL = ThreadPoolExecutor(max_workers=2 * len(SHARDS), thread_name_prefix="shard")
+
+
+def shard_for(filename: str) -> str:
+    """Shard a data/ file is indexed into."""
+    for shard, prefix in SHARD_PREFIXES.items():
+        if filename.startswith(prefix):
+            return shard
+    return "wiki"
+
+
+def shard_versions(chroma_dir: str) -> Dict[str, IndexVersions]:
+    """Blue/green bookkeeping per shard: 'eu5_docs_tinto_v{n}' etc., each with its own pointer file."""
+    return {shard: IndexVersions(chroma_dir, base_name=f"{BASE_COLLECTION}_{shard}") for shard in SHARDS}
+
+
+def active_version(chroma_dir: str) -> str:
+    """
+    Index version queries should be served from. For the sharded layout this joins the live
+    collection of every shard, so rebuilding any one shard yields a new version and the
+    caches and FAQ store keyed by it move on with it.
+    """
+    if not SHARDED_INDEX:
+        return IndexVersions(chroma_dir).active()
+    return VERSION_SEPARATOR.join(versions.active() for versions in shard_versions(chroma_dir).values())
+
+
+def shard_collections(index_version: str) -> Dict[str, str]:
+    """Splits a sharded index version back into {shard: collection name}."""
+    names = index_version.split(VERSION_SEPARATOR)
+    collections = {}
+    for shard in SHARDS:
+        base_name = f"{BASE_COLLECTION}_{shard}"
+        for name in names:
+            if name == base_name or name.startswith(f"{base_name}_v"):
+                collections[shard] = name
+    return collections
+
+
+class ShardedIndex:
+    """
+    One VectorStoreIndex per source shard behind the as_retriever() call CachingRetriever
+    makes, so the query cache, the router and the chat engine work on it unchanged.
+    """
+
+    def __init__(self, indexes: Dict[str, VectorStoreIndex]):
+        self.indexes = indexes
+
+    def subset(self, sources: Iterable[str]) -> "ShardedIndex":
+        """The same index scoped to some shards; a question about Tinto Talks searches only those."""
+        sources = set(sources)
+        unknown = sources - set(SHARDS)
+        if unknown:
+            raise ValueError(f"Unknown sources {sorted(unknown)}, expected some of {SHARDS}")
+        return ShardedIndex({shard: index for shard, index in self.indexes.items() if shard in sources})
+
+    def as_retriever(self, similarity_top_k: int, filters: Optional[MetadataFilters] = None,
+                     **kwargs) -> "ShardedRetriever":
+        return ShardedRetriever(
+            {shard: index.as_retriever(similarity_top_k=similarity_top_k, filters=filters, **kwargs)
+             for shard, index in self.indexes.items()},
+            similarity_top_k,
+        )
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Searches every shard concurrently with one query embedding and keeps the overall
+    top_k by score. All shards share the embedding model and distance metric, so their
+    scores rank against each other directly.
+    """
+
+    def __init__(self, retrievers: Dict[str, BaseRetriever], similarity_top_k: int):
+        self._retrievers = retrievers
+        self._top_k = similarity_top_k
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if not self._retrievers:
+            return []
+        if query_bundle.embedding is None:
+            # Embedded once here rather than once per shard
+            query_bundle.embedding = cached_query_embedding(normalize_query(query_bundle.query_str))
+        start = time.perf_counter()
+        results = list(_SHARD_POOL.map(lambda retriever: retriever.retrieve(query_bundle),
+                                       self._retrievers.values()))
+        logger.debug(f"Searched {len(results)} shards in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return heapq.nlargest(self._top_k, chain.from_iterable(results), key=lambda n: n.score or 0.0)
@@ -0,0 +1,173 @@
+import logging
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+from ingestion import TINTO_STATE_FILENAME, TINTO_TALKS_URLS, DataIngestor
+from json_store import read_json, write_json
+from url_health import HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Also tells the scrapers which threads this poller owns
+STATE_FILENAME = TINTO_STATE_FILENAME
+
+_POST_ID_RE = re.compile(r"post-(\d+)")
+_TRAILING_ID_RE = re.compile(r"(\d+)/?$")
+
+
+def rss_url_for_thread(url: str) -> str:
+    """'.../developer-diary/tinto-talks-5-march-27th-2024.1647775/' -> '.../threads/tinto-talks-5-...1647775/index.rss'"""
+    thread_slug_id = url.rstrip("/").split("/")[-1]
+    return f"https://forum.paradoxplaza.com/forum/threads/{thread_slug_id}/index.rss"
+
+
+def parse_feed(xml: bytes) -> List[dict]:
+    """
+    Post id, date and raw HTML of every <item> in a thread feed, oldest post first.
+    Only the XML is parsed here; post HTML is converted to text later, for new posts only.
+    """
+    posts = []
+    for item in ET.fromstring(xml).iter("item"):
+        ref = (item.findtext("link") or "") + " " + (item.findtext("guid") or "")
+        match = _POST_ID_RE.search(ref) or _TRAILING_ID_RE.search(ref.strip())
+        if not match:
+            continue
+        pub_date = item.findtext("pubDate")
+        try:
+            date = parsedate_to_datetime(pub_date).strftime('%Y-%m-%d') if pub_date else None
+        except (TypeError, ValueError):
+            date = None
+        posts.append({"id": int(match.group(1)), "date": date,
+                      "author": item.findtext("{http://purl.org/dc/elements/1.1/}creator"),
+                      "html": item.findtext("description") or ""})
+    return sorted(posts, key=lambda p: p["id"])
+
+
+def post_text(post: dict) -> str:
+    text = BeautifulSoup(post["html"], "html.parser").get_text(separator="\n", strip=True)
+    author = f" ({post['author']})" if post.get("author") else ""
+    return f"=== Post {post['id']}{author} ===\n{text}"
+
+
+class TintoPoller:
+    """
+    Incremental Tinto Talks poller.
+    Remembers the newest post id seen per thread and only converts and appends posts
+    after it, so a dev-diary thread with hundreds of replies costs one feed download
+    (or a 304) per poll. Feeds are fetched concurrently; files are written by the caller's thread.
+    """
+
+    def __init__(self, ingestor: DataIngestor, urls: Optional[List[str]] = None, max_workers: int = 8,
+                 per_host_interval: float = 0.5, session: Optional[requests.Session] = None,
+                 rss_url: Callable[[str], str] = rss_url_for_thread):
+        self.ingestor = ingestor
+        self.urls = urls or TINTO_TALKS_URLS
+        self.max_workers = max_workers
+        self.limiter = HostRateLimiter(per_host_interval)
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "EU5-Oracle/1.0 (tinto poller)")
+        self.rss_url = rss_url
+        self.state_path = ingestor.data_dir / STATE_FILENAME
+
+    def _load_state(self) -> Dict[str, dict]:
+        return read_json(self.state_path, {})
+
+    def _save_state(self, state: Dict[str, dict]) -> None:
+        write_json(self.state_path, state, indent=1)
+
+    def filename_for_thread(self, url: str) -> str:
+        return "tinto_rss_" + self.ingestor._sanitize_filename(url.rstrip("/").split("/")[-1]) + ".txt"
+
+    def _retire_scraped_copies(self, url: str, filename: str) -> List[str]:
+        """
+        Deletes files the scrapers wrote for a thread before the poller took it over, so it
+        is indexed once. Returns their names; the index update then drops their chunks.
+        """
+        manifest = self.ingestor.manifest
+        retired = [other for other, entry in manifest.items() if other != filename and entry.get("url") == url]
+        for other in retired:
+            (self.ingestor.data_dir / other).unlink(missing_ok=True)
+            manifest.remove(other)
+            logger.info(f"{other}: replaced by {filename}, now followed via RSS")
+        if retired:
+            manifest.save()
+        return retired
+
+    def _fetch(self, url: str, thread_state: dict) -> Optional[dict]:
+        """Worker task: conditional feed download. Returns None if the feed is unchanged or failed."""
+        rss_url = self.rss_url(url)
+        headers = {}
+        if thread_state.get("etag"):
+            headers["If-None-Match"] = thread_state["etag"]
+        if thread_state.get("last_modified"):
+            headers["If-Modified-Since"] = thread_state["last_modified"]
+        try:
+            self.limiter.wait(rss_url)
+            response = self.session.get(rss_url, headers=headers, timeout=15)
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            last_seen = thread_state.get("last_post_id", 0)
+            new_posts = [p for p in parse_feed(response.content) if p["id"] > last_seen]
+        except Exception as e:
+            logger.error(f"Failed to poll {rss_url}: {e}")
+            return None
+        return {"posts": new_posts, "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")}
+
+    def poll(self) -> List[str]:
+        """
+        Appends new posts of every thread to its data/ file and returns the filenames that
+        changed, including scraped copies of the threads that were deleted.
+        """
+        state = self._load_state()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda url: self._fetch(url, state.get(url, {})), self.urls))
+
+        changed = []
+        for url, result in zip(self.urls, results):
+            if result is None:
+                continue
+            thread_state = state.setdefault(url, {})
+            thread_state.update({k: result[k] for k in ("etag", "last_modified") if result[k]})
+            if not result["posts"]:
+                continue
+
+            filename = self.filename_for_thread(url)
+            path = self.ingestor.data_dir / filename
+            # Keep the body written so far; only the new posts are converted from HTML
+            body = path.read_text(encoding="utf-8").split("\n\n", 1)[1] if path.exists() else ""
+            new_text = "\n\n".join(post_text(p) for p in result["posts"])
+            # The thread's date is its opening post (the diary), not the latest reply
+            entry = self.ingestor.manifest.get(filename)
+            date = (entry or {}).get("date") or result["posts"][0]["date"] or datetime.now().strftime('%Y-%m-%d')
+            if self.ingestor._save_document(filename, url, date, f"{body}\n\n{new_text}".strip(),
+                                            prefix="tinto_"):
+                changed.append(filename)
+            changed.extend(self._retire_scraped_copies(url, filename))
+            thread_state["last_post_id"] = result["posts"][-1]["id"]
+            thread_state["posts"] = thread_state.get("posts", 0) + len(result["posts"])
+            logger.info(f"{filename}: {len(result['posts'])} new posts")
+
+        self._save_state(state)
+        return changed
+
+
+if __name__ == "__main__":
+    from rag_engine import RAGEngine
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    changed = TintoPoller(DataIngestor(str(root_dir / "data"))).poll()
+    print(f"✅ {len(changed)} Tinto Talks threads have new posts.")
+    if changed:
+        RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db")).update_documents(changed)
+        print("🔄 Index updated.")
@@ -1,8 +1,6 @@
 import streamlit as st
 import warnings
 import importlib.metadata
-import socket
-import subprocess
 import time
 import os
 from pathlib import Path
@@ -21,8 +19,14 @@ warnings.filterwarnings("ignore", module="pydantic")
 warnings.filterwarnings("ignore", module="llama_index")
 
 # Direct imports to avoid "core_engine" singleton issues
-from llm_factory import get_llm
-from rag_engine import RAGEngine
+from llm_factory import get_llm, start_ollama_server, OLLAMA_STATS
+from shards import active_version
+from query_cache import cache_stats
+from admission import backend_queue, QueueFull, DIVERT_PROVIDER, DIVERT_MODEL
+from generation import BackgroundGeneration
+from faq_store import FaqStore
+from query_log import QueryLog, LOG_DIRNAME
+import warmup
 
 # Load environment variables
 load_dotenv()
@@ -56,47 +60,61 @@ if "chat_engine" not in st.session_state:
 if "llm_config" not in st.session_state:
     st.session_state.llm_config = {"provider": None, "model": None}
 
+if "index_version" not in st.session_state:
+    st.session_state.index_version = None
+
+if "profile_queries" not in st.session_state:
+    st.session_state.profile_queries = False
+
+if "last_profile" not in st.session_state:
+    st.session_state.last_profile = None
+
+if "generation" not in st.session_state:
+    st.session_state.generation = None
+
+# --- Warm-up ---
+# Loads the index, embedding model and Ollama model in the background (see warmup.py).
+# A no-op after the first run in this process, or when launched through warmup.py.
+warmup.start(DATA_DIR, CHROMA_DIR, log_dir=str(ROOT_DIR / LOG_DIRNAME),
+             ready_port=int(os.getenv(warmup.READY_PORT_ENV, "0")) or None)
+
 # --- Helper Functions ---
 
-@st.cache_resource(show_spinner="Loading Knowledge Base...")
-def get_global_index():
+# Keeps the live version plus the one it replaced, for sessions that have not switched yet
+@st.cache_resource(show_spinner="Loading Knowledge Base...", max_entries=2)
+def get_global_index(collection_name: str):
     """
-    Loads the RAG index FROM DISK only once.
+    Loads the RAG index FROM DISK only once per index version.
     This object is shared across all sessions but is read-only safe.
     Does NOT trigger ingestion.
     """
-    engine = RAGEngine(DATA_DIR, CHROMA_DIR)
-    # This force-loads the index into memory/cache
-    index = engine.load_index()
-    return engine, index
+    # Shared with the startup warm-up, so a version it already loaded is returned at once
+    return warmup.load_engine(DATA_DIR, CHROMA_DIR, collection_name)
+
+def get_active_index():
+    """
+    Returns the cached index for the currently promoted version.
+    Reading the pointer file is cheap, so every rerun checks it; a promoted
+    refresh (see index_versions.py) is picked up without restarting the app.
+    """
+    active = active_version(CHROMA_DIR)
+    return active, get_global_index(active)
+
+@st.cache_resource(max_entries=2)
+def get_faq_store(collection_name: str) -> FaqStore:
+    """Precomputed answers for an index version (see faq_store.py); picks up the job's output when it lands."""
+    return FaqStore(CHROMA_DIR, collection_name)
+
+@st.cache_resource
+def get_query_log() -> QueryLog:
+    """One log writer per process, shared by all sessions (see query_log.py for the report)."""
+    return QueryLog(str(ROOT_DIR / LOG_DIRNAME))
 
 @st.cache_resource
 def ensure_ollama_server():
     """Checks if Ollama is running locally, and auto-starts it if dead."""
-    def is_port_open(port):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(1)
-            return s.connect_ex(('localhost', port)) == 0
-
-    if is_port_open(11434):
-        return True, "Ollama is already running."
-
-    # Attempts to start Ollama
-    try:
-        # Run in background, suppress output
-        subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        
-        # Wait for it to spin up (max 10s)
-        for _ in range(20): 
-            if is_port_open(11434):
-                return True, "Ollama auto-started successfully 🦙"
-            time.sleep(0.5)
-        
-        return False, "Ollama command ran but server didn't respond (Timeout)."
-    except FileNotFoundError:
-        return False, "Ollama not found! Please download it from ollama.com"
-    except Exception as e:
-        return False, f"Failed to start Ollama: {e}"
+    # Under start.sh the warm-up has usually started it already
+    return start_ollama_server()
 
 def initialize_chat_session(provider: str, model_name: str, api_key: str = None):
     """
@@ -107,7 +125,7 @@ def initialize_chat_session(provider: str, model_name: str, api_key: str = None)
         llm = get_llm(provider, model_name, api_key)
         
         # 2. Get the Cached Index (Instant)
-        rag_engine, index = get_global_index()
+        index_version, (rag_engine, index) = get_active_index()
         
         # 3. Create the Chat Engine (Lightweight)
         # We manually recreate the get_chat_engine logic here or use a helper,
@@ -118,12 +136,44 @@ def initialize_chat_session(provider: str, model_name: str, api_key: str = None)
         # Since load_index check DB count, it should be fast.
         
         st.session_state.chat_engine = rag_engine.get_chat_engine(llm)
-        st.session_state.llm_config = {"provider": provider, "model": model_name}
+        # The key is kept with the session's LLM, which may differ from the sidebar's selection later
+        st.session_state.llm_config = {"provider": provider, "model": model_name, "api_key": api_key}
+        st.session_state.index_version = index_version
         
         return True, f"Brain activated: {provider} / {model_name}"
     except Exception as e:
         return False, f"Failed to initialize: {e}"
 
+def get_groq_key():
+    """Groq key from Streamlit Secrets or the environment, for diverting overflow from Ollama."""
+    if "GROQ_API_KEY" in st.secrets:
+        return st.secrets["GROQ_API_KEY"]
+    return os.getenv("GROQ_API_KEY")
+
+def start_generation(prompt: str):
+    """
+    Starts answering on a worker thread, queued behind the backend's admission control.
+    Returns the job and the model that answers.
+    When Ollama already has a queue and a Groq key is available, the question is diverted
+    to Groq with this session's chat history instead of waiting.
+    """
+    provider = st.session_state.llm_config["provider"]
+    gate = backend_queue(provider)
+    engine, history = st.session_state.chat_engine, None
+    model = st.session_state.llm_config["model"]
+    groq_key = get_groq_key() if provider == "Local (Ollama)" else None
+    if groq_key and gate.should_divert():
+        gate.record_divert()
+        _, (rag_engine, _) = get_active_index()
+        history = engine.chat_history
+        engine = rag_engine.get_chat_engine(get_llm(DIVERT_PROVIDER, DIVERT_MODEL, groq_key))
+        gate = backend_queue(DIVERT_PROVIDER)
+        model = DIVERT_MODEL
+        st.caption(f"⚡ Local model is busy, answering with {DIVERT_MODEL} on Groq")
+    job = BackgroundGeneration(engine, prompt, chat_history=history, gate=gate,
+                               profile=st.session_state.profile_queries)
+    return job, model
+
 # --- Sidebar ---
 server_running, status_msg = ensure_ollama_server()
 
@@ -166,9 +216,28 @@ with st.sidebar:
 
     # 4. Status and Re-initialization
     st.divider()
+    readiness = warmup.READINESS.snapshot()
+    if readiness["status"] == "failed":
+        st.warning(f"Warm-up failed: {readiness['error']}")
+    elif readiness["status"] != "ready":
+        st.caption(f"⏳ Warming up{': ' + readiness['step'] if readiness['step'] else ''}...")
     if st.session_state.chat_engine:
         st.success(f"🟢 Oracle Online")
         st.caption(f"Brain: {st.session_state.llm_config['model']}")
+        stats = cache_stats()
+        st.caption(f"Cache hits: embeddings {stats['embeddings']['hit_rate']:.0%} · "
+                   f"retrieval {stats['retrievals']['hit_rate']:.0%}")
+        faq = get_faq_store(st.session_state.index_version).stats()
+        if faq["entries"]:
+            st.caption(f"FAQ: {faq['entries']} precomputed answers · {faq['hit_rate']:.0%} hit rate")
+        queue = backend_queue(st.session_state.llm_config["provider"]).stats()
+        st.caption(f"Queue: {queue['active']} answering · {queue['waiting']} waiting · "
+                   f"p95 wait {queue['wait_p95_ms'] / 1000:.1f}s")
+        if OLLAMA_STATS.calls:
+            prompt_stats = OLLAMA_STATS.summary()
+            # Measured by Ollama; the est_* reuse figures are too rough to show here
+            st.caption(f"Prompt eval: {prompt_stats['avg_prompt_eval_ms']} ms/answer · "
+                       f"{prompt_stats['avg_prompt_tokens_evaluated']} tokens/answer")
     else:
         st.error("🔴 Oracle Offline")
         if not server_running and selected_provider == "Local (Ollama)":
@@ -186,6 +255,20 @@ with st.sidebar:
                 else:
                     st.error(msg)
 
+    # 5. Debug Mode
+    with st.expander("🔬 Debug"):
+        st.checkbox("Profile queries", key="profile_queries",
+                    help="Runs each question under cProfile and shows where the time went (adds some overhead).")
+
+# --- INDEX VERSION SWITCH ---
+# A refreshed knowledge base was promoted: rebuild this session's engine on the new version
+if st.session_state.chat_engine is not None and \
+        st.session_state.index_version != active_version(CHROMA_DIR):
+    config = st.session_state.llm_config
+    success, msg = initialize_chat_session(config["provider"], config["model"], config.get("api_key"))
+    if not success:
+        st.error(f"Could not switch to the refreshed knowledge base. {msg}")
+
 # --- AUTO-INITIALIZATION ---
 # Automatically try to start if we are "offline" but have valid defaults
 if st.session_state.chat_engine is None:
@@ -203,6 +286,11 @@ if st.session_state.chat_engine is None:
         initialize_chat_session(selected_provider, selected_model, api_key)
         st.rerun()
 
+# --- ABANDONED GENERATION ---
+# Normally cancelled by the interrupted run itself; this catches anything still running
+if st.session_state.generation is not None and not st.session_state.generation.done:
+    st.session_state.generation.cancel()
+
 # --- Main Interface ---
 st.title("🌍 EU5 Oracle")
 st.markdown("*Your strategic advisor for Project Caesar.*")
@@ -222,14 +310,79 @@ if prompt := st.chat_input("Ask about estates, production, or control..."):
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            with st.spinner("Consulting the archives..."):
-                try:
-                    # Stream response if possible (ChatEngine usually supports stream_chat)
-                    # For simplicity/safety with current engine, we use .chat()
-                    response = st.session_state.chat_engine.chat(prompt)
-                    response_text = str(response)
-                    
-                    st.markdown(response_text)
-                    st.session_state.messages.append({"role": "assistant", "content": response_text})
-                except Exception as e:
-                    st.error(f"Error analyzing query: {e}")
+            answer = st.empty()
+            stop = st.empty()
+            try:
+                # Frequent questions are answered from the FAQ store without touching the LLM
+                faq = get_faq_store(st.session_state.index_version)
+                lookup_start = time.perf_counter()
+                faq_hit = faq.lookup(prompt)
+                faq_ms = round((time.perf_counter() - lookup_start) * 1000, 1)
+                if faq_hit is not None:
+                    answer.markdown(faq_hit["answer"])
+                    st.caption("⚡ Precomputed answer")
+                    st.session_state.chat_engine.record_turn(prompt, faq_hit["answer"])
+                    st.session_state.messages.append({"role": "assistant", "content": faq_hit["answer"]})
+                    get_query_log().record(prompt, "faq", st.session_state.index_version, [],
+                                           {"faq_ms": faq_ms, "total_ms": faq_ms}, {"faq": True})
+                else:
+                    job, model = start_generation(prompt)
+                    st.session_state.generation = job
+                    # Any rerun cancels the answer, so the button needs no handler
+                    stop.button("⏹ Stop", key="stop_generation")
+                    with st.spinner("Consulting the archives..."):
+                        while not job.wait(0.1):
+                            if job.queue_position:
+                                answer.caption(f"⏳ Waiting for {job.gate.name}: position {job.queue_position} in queue")
+                            elif job.text:
+                                answer.markdown(job.text + "▌")
+                            else:
+                                # Still retrieving or evaluating the prompt; every iteration has to
+                                # touch Streamlit, or Stop and new questions wait for the first token
+                                answer.caption("Consulting the archives…")
+                    stop.empty()
+                    if job.error is not None:
+                        raise job.error
+                    if job.profile is not None:
+                        st.session_state.last_profile = job.profile
+
+                    answer.markdown(job.text)
+                    if job.engine is not st.session_state.chat_engine:
+                        # Diverted to a one-off Groq engine: keep the turn in this session's memory
+                        st.session_state.chat_engine.record_turn(prompt, job.text)
+                    st.session_state.messages.append({"role": "assistant", "content": job.text})
+                    plan = job.plan or {}
+                    get_query_log().record(prompt, model, st.session_state.index_version, job.node_ids,
+                                           {"faq_ms": faq_ms, "classify_ms": plan.get("classify_ms"), **job.timings},
+                                           {"retrieval": job.cache_hit, "faq": False if len(faq) else None},
+                                           plan=plan.get("type"))
+            except QueueFull as e:
+                st.warning(f"The Oracle is busy right now, please ask again in a minute. ({e})")
+            except Exception as e:
+                st.error(f"Error analyzing query: {e}")
+            finally:
+                job = st.session_state.generation
+                if job is not None and not job.done:
+                    # Stop, a new question or a closed tab interrupted this run: free the model
+                    job.cancel()
+                    if job.text:
+                        st.session_state.messages.append(
+                            {"role": "assistant", "content": job.text + "\n\n*(stopped)*"})
+                        if job.engine is not st.session_state.chat_engine:
+                            # The session's own engine stores its partial answers itself; a diverted one doesn't
+                            st.session_state.chat_engine.record_turn(job.prompt, job.text)
+
+# --- PROFILE PANEL ---
+# Rendered last so it shows the question that was just answered
+if st.session_state.profile_queries and st.session_state.last_profile:
+    profile = st.session_state.last_profile
+    with st.sidebar:
+        st.subheader("⏱️ Last Query Profile")
+        st.caption(f"{profile.query[:60]} · {profile.total_seconds * 1000:.0f} ms total")
+        st.table({"stage": list(profile.stages),
+                  "ms": [round(seconds * 1000, 1) for seconds in profile.stages.values()]})
+        st.caption("Hottest functions (own time)")
+        st.dataframe(profile.hot_functions, hide_index=True)
+        if st.button("💾 Dump profile"):
+            path = profile.dump(ROOT_DIR / "profiles")
+            st.caption(f"Saved to {path}")
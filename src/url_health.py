@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from json_store import read_json, write_json
+
+REPORT_FILENAME = "url_report.json"
+
+# Statuses that mean the page is gone, not that the server is having a bad moment
+DEAD_STATUSES = (404, 410)
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host; different hosts never wait on each other."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class UrlHealthChecker:
+    """
+    Concurrent URL validator.
+    One pooled session is shared by all worker threads, requests are rate limited per
+    host, and every result records the redirect chain so moved pages are easy to fix.
+    """
+
+    def __init__(self, max_workers: int = 16, per_host_interval: float = 0.25, timeout: float = 10.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.limiter = HostRateLimiter(per_host_interval)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = "EU5-Oracle/1.0 (link checker)"
+
+    def _request(self, method: str, url: str) -> requests.Response:
+        self.limiter.wait(url)
+        return self.session.request(method, url, timeout=self.timeout, allow_redirects=True)
+
+    def check(self, url: str) -> dict:
+        """Checks one URL. HEAD first, GET if the server rejects or mishandles HEAD."""
+        result = {"url": url, "ok": False, "dead": False, "status": None, "method": "HEAD",
+                  "final_url": url, "redirects": [], "elapsed_ms": None, "error": None}
+        start = time.perf_counter()
+        try:
+            response = self._request("HEAD", url)
+            if response.status_code != 200:
+                # Some servers don't support HEAD
+                result["method"] = "GET"
+                response = self._request("GET", url)
+            result["status"] = response.status_code
+            result["ok"] = response.status_code == 200
+            result["dead"] = response.status_code in DEAD_STATUSES
+            result["final_url"] = response.url
+            result["redirects"] = [{"url": r.url, "status": r.status_code} for r in response.history]
+        except requests.RequestException as e:
+            result["error"] = str(e)
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+        return result
+
+    def check_all(self, urls: Iterable[str], on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """Checks all URLs concurrently. Results come back in input order."""
+        urls = list(urls)
+        results: Dict[str, dict] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.check, url): url for url in urls}
+            for future in as_completed(futures):
+                result = future.result()
+                results[result["url"]] = result
+                if on_result:
+                    on_result(result)
+        return [results[url] for url in urls]
+
+
+def write_report(results: List[dict], path: Path) -> None:
+    """Writes the machine-readable JSON report (atomically, it may be read by a running ingest)."""
+    report = {
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+        "summary": {
+            "total": len(results),
+            "ok": sum(r["ok"] for r in results),
+            "dead": sum(r["dead"] for r in results),
+            "redirected": sum(bool(r["redirects"]) for r in results),
+        },
+        "results": results,
+    }
+    write_json(path, report, indent=1)
+
+
+def load_dead_urls(path: Path) -> Set[str]:
+    """URLs a previous check found to be gone. A missing or unreadable report means none."""
+    report = read_json(path, {})
+    return {r["url"] for r in report.get("results", []) if r.get("dead")}
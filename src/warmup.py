@@ -0,0 +1,241 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from llama_index.core import Settings
+from llama_index.core.schema import QueryBundle
+
+from json_store import JsonRequestHandler
+from query_log import LOG_DIRNAME, QueryLog, build_report
+from query_router import AdaptiveRetriever
+from rag_engine import RAGEngine, SYSTEM_PROMPT
+from shards import active_version
+
+logger = logging.getLogger(__name__)
+
+# Most asked questions from the query log whose retrievals are replayed into the caches
+REPLAY_QUERIES = int(os.getenv("EU5_WARMUP_QUERIES", "20"))
+
+# Ollama model loaded during warm-up; empty to skip (e.g. Groq-only deployments)
+WARMUP_MODEL = os.getenv("EU5_WARMUP_MODEL", "llama3.1:8b")
+
+# GET /ready answers 200 once warm-up has finished, 503 before (Streamlit itself uses 8501)
+READY_PORT_ENV = "EU5_READY_PORT"
+DEFAULT_READY_PORT = 8502
+
+# Used for the embedding and retrieval warm-up; never cached
+WARMUP_QUERY = "How do estates work?"
+
+# Loaded index versions kept per process: the live one plus the one it replaced
+MAX_LOADED_VERSIONS = 2
+
+
+class Readiness:
+    """
+    Warm-up progress shared by the UI sidebar and the /ready endpoint.
+    status is 'starting', 'warming', 'ready' or 'failed'; steps holds the milliseconds
+    each finished warm-up step took.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "starting"
+        self.current_step: Optional[str] = None
+        self.steps = {}
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    @contextmanager
+    def step(self, name: str):
+        with self._lock:
+            self.status = "warming"
+            self.current_step = name
+        start = time.perf_counter()
+        try:
+            yield
+            with self._lock:
+                self.steps[name] = round((time.perf_counter() - start) * 1000, 1)
+        finally:
+            with self._lock:
+                self.current_step = None
+
+    def mark_ready(self) -> None:
+        with self._lock:
+            self.status = "ready"
+            self.ready_at = time.time()
+
+    def mark_failed(self, error: str) -> None:
+        with self._lock:
+            self.status = "failed"
+            self.error = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "step": self.current_step,
+                "steps_ms": dict(self.steps),
+                "error": self.error,
+                "warmup_seconds": round(self.ready_at - self.started_at, 1) if self.ready_at else None,
+            }
+
+
+# One per process: the UI and the readiness server report the same warm-up
+READINESS = Readiness()
+
+_engines: "OrderedDict[str, Tuple[RAGEngine, object]]" = OrderedDict()
+_engines_lock = threading.Lock()
+_started = False
+_start_lock = threading.Lock()
+
+
+def load_engine(data_dir: str, chroma_dir: str, collection_name: str) -> Tuple[RAGEngine, object]:
+    """
+    RAGEngine and loaded index for an index version, loaded once per process.
+    Warm-up and the UI go through here, so a session arriving mid warm-up waits for
+    the load already in progress instead of starting a second one.
+    """
+    with _engines_lock:
+        if collection_name not in _engines:
+            engine = RAGEngine(data_dir, chroma_dir, collection_name=collection_name)
+            _engines[collection_name] = (engine, engine.load_index())
+            while len(_engines) > MAX_LOADED_VERSIONS:
+                _engines.popitem(last=False)
+        _engines.move_to_end(collection_name)
+        return _engines[collection_name]
+
+
+def top_logged_questions(log_dir: str, top: int = REPLAY_QUERIES) -> List[str]:
+    """The most asked questions in the query log (see query_log.py), most frequent first."""
+    if top <= 0:
+        return []
+    records = list(QueryLog(log_dir).records())
+    return [q["question"] for q in build_report(records, top=top)["top_queries"]]
+
+
+def warm_up(data_dir: str, chroma_dir: str, questions: List[str] = (), model: Optional[str] = WARMUP_MODEL,
+            readiness: Readiness = READINESS, log_dir: Optional[str] = None) -> Readiness:
+    """
+    Pays the cold-start costs before the first user does: loads the index, runs the
+    embedding model once, searches the vector store once (pages the HNSW index in),
+    replays frequent questions' retrievals (given, or read from the query log in log_dir)
+    into the query caches, starts Ollama if it is
+    not running yet and loads the model. Only a failure to load the index marks the process
+    as failed; the LLM step is best effort, since Groq-only deployments have no Ollama.
+    """
+    try:
+        version = active_version(chroma_dir)
+        with readiness.step("load_index"):
+            _, index = load_engine(data_dir, chroma_dir, version)
+        with readiness.step("embedding"):
+            embedding = Settings.embed_model.get_query_embedding(WARMUP_QUERY)
+        with readiness.step("retrieval"):
+            index.as_retriever(similarity_top_k=1).retrieve(QueryBundle(WARMUP_QUERY, embedding=embedding))
+        if log_dir:
+            # Decompressing rotated logs takes a while, so it happens here rather than in start()
+            try:
+                questions = list(questions) + top_logged_questions(log_dir)
+            except Exception as e:
+                logger.warning(f"Could not read the query log for warm-up: {e}")
+        if questions:
+            with readiness.step("replay"):
+                # Same retriever and cache keys the chat engines use (see rag_engine.get_chat_engine)
+                retriever = AdaptiveRetriever(index, index_version=version)
+                for question in questions:
+                    retriever.retrieve(question)
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        readiness.mark_failed(str(e))
+        return readiness
+
+    if model:
+        try:
+            from llm_factory import preload_ollama_model, start_ollama_server
+            with readiness.step("llm"):
+                # Nothing else starts Ollama before the first visitor's page load
+                running, status = start_ollama_server()
+                if not running:
+                    raise RuntimeError(status)
+                preload_ollama_model(model, system_prompt=SYSTEM_PROMPT)
+        except Exception as e:
+            logger.warning(f"Could not preload {model} in Ollama: {e}")
+
+    readiness.mark_ready()
+    logger.info(f"Warm-up finished: {readiness.snapshot()['steps_ms']}")
+    return readiness
+
+
+def make_ready_server(readiness: Readiness = READINESS, host: str = "0.0.0.0",
+                      port: int = DEFAULT_READY_PORT) -> ThreadingHTTPServer:
+    """
+    GET /ready -> 200 once warm-up has finished, 503 while warming or after a failure,
+    with the warm-up snapshot as JSON. GET /health -> 200 while the process is up.
+    """
+
+    class Handler(JsonRequestHandler):
+        def do_GET(self):
+            if self.path == "/ready":
+                self._send(200 if readiness.ready else 503, readiness.snapshot())
+            elif self.path == "/health":
+                self._send(200, {"status": "alive"})
+            else:
+                self._send(404, {"error": "not found"})
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def start(data_dir: str, chroma_dir: str, log_dir: Optional[str] = None, ready_port: Optional[int] = None) -> bool:
+    """
+    Starts warm-up on a background thread and, with a port, the readiness server.
+    Safe to call from every Streamlit rerun: only the first call per process does anything.
+    Returns True if this call started it.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return False
+        _started = True
+
+    if ready_port:
+        try:
+            server = make_ready_server(port=ready_port)
+            threading.Thread(target=server.serve_forever, daemon=True, name="ready-server").start()
+            logger.info(f"Readiness endpoint on http://0.0.0.0:{ready_port}/ready")
+        except OSError as e:
+            logger.error(f"Could not start readiness endpoint on port {ready_port}: {e}")
+
+    threading.Thread(target=warm_up, args=(data_dir, chroma_dir), kwargs={"log_dir": log_dir},
+                     daemon=True, name="warm-up").start()
+    return True
+
+
+if __name__ == "__main__":
+    # Launches the app with warm-up running from process start, so the first visitor after a
+    # deploy finds the index loaded. Deploy checks can poll GET :8502/ready.
+    import sys
+    from streamlit.web import cli as stcli
+    # Through the module, not __main__: ui.py imports warmup and must see the same state
+    import warmup
+
+    parser = argparse.ArgumentParser(description="Start the EU5 Oracle UI with startup warm-up.")
+    parser.add_argument("--ready-port", type=int, default=int(os.getenv(READY_PORT_ENV, DEFAULT_READY_PORT)))
+    args, streamlit_args = parser.parse_known_args()
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    warmup.start(str(root_dir / "data"), str(root_dir / "chroma_db"), log_dir=str(root_dir / LOG_DIRNAME),
+                 ready_port=args.ready_port)
+    sys.argv = ["streamlit", "run", str(Path(__file__).parent / "ui.py")] + streamlit_args
+    sys.exit(stcli.main())
@@ -0,0 +1,185 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
+
+import requests
+from bs4 import BeautifulSoup
+
+from ingestion import CORE_WIKI_URLS, DataIngestor
+from json_store import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+WIKI_API_URL = "https://eu5.paradoxwikis.com/api.php"
+
+# MediaWiki's limit for titles per query request (anonymous clients)
+TITLES_PER_REQUEST = 50
+
+STATE_FILENAME = ".wiki_state.json"
+
+
+def title_for_url(url: str) -> str:
+    """'https://.../Beginner%27s_guide' -> "Beginner's guide" (the title MediaWiki reports back)."""
+    return unquote(url.rstrip("/").split("/")[-1]).replace("_", " ")
+
+
+class MediaWikiClient:
+    """
+    Thin client for the MediaWiki action API.
+    Revision ids for many pages come back from one request and the recent-changes
+    feed tells us which pages were edited, so full page content is only requested
+    for pages that actually changed.
+    """
+
+    def __init__(self, api_url: str = WIKI_API_URL, session: Optional[requests.Session] = None):
+        self.api_url = api_url
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "EU5-Oracle/1.0 (wiki sync)")
+        self.requests_made = 0
+
+    def _get(self, **params) -> dict:
+        params.update({"format": "json", "formatversion": "2"})
+        response = self.session.get(self.api_url, params=params, timeout=30)
+        response.raise_for_status()
+        self.requests_made += 1
+        data = response.json()
+        if "error" in data:
+            raise RuntimeError(f"MediaWiki API error: {data['error'].get('info', data['error'])}")
+        return data
+
+    def revisions(self, titles: Iterable[str]) -> Dict[str, dict]:
+        """Latest revision id and timestamp per title, TITLES_PER_REQUEST titles per request."""
+        titles = list(titles)
+        result = {}
+        for i in range(0, len(titles), TITLES_PER_REQUEST):
+            batch = titles[i:i + TITLES_PER_REQUEST]
+            data = self._get(action="query", prop="revisions", rvprop="ids|timestamp", titles="|".join(batch))
+            query = data.get("query", {})
+            # Map the API's normalized titles back to the ones we asked for
+            aliases = {n["to"]: n["from"] for n in query.get("normalized", [])}
+            for page in query.get("pages", []):
+                if page.get("missing") or not page.get("revisions"):
+                    continue
+                revision = page["revisions"][0]
+                result[aliases.get(page["title"], page["title"])] = {
+                    "revid": revision["revid"],
+                    "timestamp": revision["timestamp"],
+                }
+        return result
+
+    def recent_changes(self, since: str) -> Tuple[Dict[str, str], str]:
+        """
+        Titles edited since the given ISO timestamp (with their latest edit time),
+        plus the server time to resume from.
+        Follows API continuation so a busy patch day is not truncated.
+        """
+        titles = {}
+        params = {"action": "query", "list": "recentchanges", "rcprop": "title|timestamp",
+                  "rcdir": "newer", "rcstart": since, "rclimit": "500", "curtimestamp": "1"}
+        server_time = since
+        while True:
+            data = self._get(**params)
+            server_time = data.get("curtimestamp", server_time)
+            # rcdir=newer lists oldest first, so later edits overwrite earlier ones
+            titles.update((c["title"], c["timestamp"]) for c in data.get("query", {}).get("recentchanges", []))
+            if "continue" not in data:
+                break
+            params.update(data["continue"])
+        return titles, server_time
+
+    def server_time(self) -> str:
+        return self._get(action="query", curtimestamp="1")["curtimestamp"]
+
+    def parse(self, title: str) -> Tuple[str, int]:
+        """Rendered HTML and revision id of one page."""
+        data = self._get(action="parse", page=title, prop="text|revid", disableeditsection="1", redirects="1")
+        return data["parse"]["text"], data["parse"]["revid"]
+
+
+class WikiApiSync:
+    """
+    Wiki ingestion mode that goes through the MediaWiki API instead of scraping rendered pages.
+    The first run compares revision ids in bulk; later runs poll recent changes, so a sync
+    with no edits costs a single request.
+    """
+
+    def __init__(self, ingestor: DataIngestor, client: Optional[MediaWikiClient] = None,
+                 urls: Optional[List[str]] = None):
+        self.ingestor = ingestor
+        self.client = client or MediaWikiClient()
+        self.urls = {title_for_url(url): url for url in (urls or CORE_WIKI_URLS)}
+        self.state_path = ingestor.data_dir / STATE_FILENAME
+
+    def _load_state(self) -> dict:
+        return read_json(self.state_path, {})
+
+    def _save_state(self, state: dict) -> None:
+        write_json(self.state_path, state)
+
+    def _stored_revid(self, title: str) -> Optional[int]:
+        entry = self.ingestor.manifest.get(self.ingestor.filename_for_url(self.urls[title]))
+        return entry.get("revid") if entry else None
+
+    def changed_titles(self) -> Tuple[Dict[str, Optional[str]], str]:
+        """
+        Titles whose stored revision is missing or outdated (mapped to their last edit
+        time when known), and the cursor for the next poll.
+        Titles whose fetch failed last time are included again, since the cursor moved past their edit.
+        """
+        state = self._load_state()
+
+        if state.get("rc_since"):
+            edited, cursor = self.client.recent_changes(state["rc_since"])
+            # URLs added to CORE_WIKI_URLS since the last sync have never been fetched
+            new_pages = {t: None for t in self.urls
+                         if self.ingestor.filename_for_url(self.urls[t]) not in self.ingestor.manifest}
+            retry = {t: None for t in state.get("retry", []) if t in self.urls}
+            return {**retry, **new_pages, **{t: ts for t, ts in edited.items() if t in self.urls}}, cursor
+
+        # No cursor yet: one bulk revision check establishes the baseline
+        cursor = self.client.server_time()
+        revisions = self.client.revisions(self.urls)
+        stale = {t: rev["timestamp"] for t, rev in revisions.items() if rev["revid"] != self._stored_revid(t)}
+        return stale, cursor
+
+    def sync(self) -> List[str]:
+        """Fetches only edited pages into data/ and returns the filenames whose content changed."""
+        titles, cursor = self.changed_titles()
+        undated = [t for t, timestamp in titles.items() if not timestamp]
+        if undated:
+            titles.update({t: rev["timestamp"] for t, rev in self.client.revisions(undated).items()})
+
+        changed, failed = [], []
+        for title, timestamp in sorted(titles.items()):
+            url = self.urls[title]
+            try:
+                html, revid = self.client.parse(title)
+            except Exception as e:
+                logger.error(f"Failed to fetch {title} via API: {e}")
+                failed.append(title)
+                continue
+            pub_date = timestamp[:10] if timestamp else datetime.now().strftime('%Y-%m-%d')
+            self.ingestor.archive.put(url, html, date=pub_date)
+            clean_text = self.ingestor._extract_text(BeautifulSoup(html, "html.parser"), url)
+            if len(clean_text) < 300:
+                logger.warning(f"{title}: only {len(clean_text)} characters extracted, retrying next sync")
+                failed.append(title)
+                continue
+            filename = self.ingestor.filename_for_url(url)
+            if self.ingestor._save_document(filename, url, pub_date, clean_text, revid=revid):
+                changed.append(filename)
+
+        # The cursor moves past every edit seen; failed titles are kept to be fetched again
+        self._save_state({"rc_since": cursor, "retry": failed})
+        logger.info(f"Wiki API sync: {len(titles)} pages fetched, {len(changed)} changed, "
+                    f"{self.client.requests_made} API requests")
+        return changed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    data_dir = Path(__file__).parent.parent / "data"
+    changed = WikiApiSync(DataIngestor(str(data_dir))).sync()
+    print(f"✅ {len(changed)} wiki pages updated.")
@@ -0,0 +1,139 @@
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from json_store import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = "youtube_cache"
+
+# Caption fragments further apart than this (seconds) start a new paragraph
+PARAGRAPH_GAP = 2.5
+
+# Paragraph length to aim for; auto-captions have no punctuation, so this is also the hard cap
+PARAGRAPH_CHARS = 700
+
+# Source Date of a video whose upload date is unknown: sorts last in recency reranking,
+# so an old video never passes for the newest source
+UNDATED = "1970-01-01"
+
+_NOISE_RE = re.compile(r"\[(music|applause|laughter|inaudible)\]", re.IGNORECASE)
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|/embed/|/shorts/)([\w-]{11})")
+_PUBLISH_DATE_RE = re.compile(r'(?:itemprop="(?:datePublished|uploadDate)" content="|"(?:publishDate|uploadDate)":")'
+                              r'(\d{4}-\d{2}-\d{2})')
+
+
+def video_id_from_url(url_or_id: str) -> str:
+    """Accepts a bare video ID or any common YouTube URL form."""
+    match = _VIDEO_ID_RE.search(url_or_id)
+    return match.group(1) if match else url_or_id.strip()
+
+
+def video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def merge_segments(segments: List[dict], gap: float = PARAGRAPH_GAP, max_chars: int = PARAGRAPH_CHARS) -> List[str]:
+    """
+    Joins caption fragments ({"text", "start", "duration"}) into paragraphs.
+    A paragraph ends at a pause in speech, or once it is long enough and a sentence
+    ends (or at twice the length, for captions without punctuation).
+    """
+    paragraphs, current, length, last_end = [], [], 0, None
+    for segment in segments:
+        text = _NOISE_RE.sub("", segment.get("text", "")).replace("\n", " ").strip()
+        if not text:
+            continue
+        start = segment.get("start", 0.0)
+        pause = last_end is not None and start - last_end > gap
+        sentence_done = current and current[-1].endswith((".", "!", "?")) and length >= max_chars
+        if current and (pause or sentence_done or length >= 2 * max_chars):
+            paragraphs.append(" ".join(current))
+            current, length = [], 0
+        current.append(text)
+        length += len(text) + 1
+        last_end = start + segment.get("duration", 0.0)
+    if current:
+        paragraphs.append(" ".join(current))
+    return paragraphs
+
+
+class YouTubeSource:
+    """Fetches transcripts (youtube-transcript-api), titles (oEmbed) and upload dates from YouTube."""
+
+    def __init__(self, languages: List[str] = None, timeout: float = 15.0):
+        self.languages = languages or ["en", "en-US", "en-GB"]
+        self.timeout = timeout
+
+    def transcript(self, video_id: str) -> List[dict]:
+        api = YouTubeTranscriptApi()
+        if hasattr(api, "fetch"):
+            # youtube-transcript-api >= 1.0
+            return api.fetch(video_id, languages=self.languages).to_raw_data()
+        return YouTubeTranscriptApi.get_transcript(video_id, languages=self.languages)
+
+    def title(self, video_id: str) -> Optional[str]:
+        try:
+            response = requests.get("https://www.youtube.com/oembed",
+                                    params={"url": video_url(video_id), "format": "json"}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get("title")
+        except (requests.RequestException, ValueError):
+            return None
+
+    def publish_date(self, video_id: str) -> Optional[str]:
+        """Upload date ('2024-03-27') from the watch page's metadata, or None."""
+        try:
+            response = requests.get(video_url(video_id), headers={"Accept-Language": "en"}, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        match = _PUBLISH_DATE_RE.search(response.text)
+        return match.group(1) if match else None
+
+
+class TranscriptCache:
+    """Raw transcripts on disk, one JSON file per video ID. Transcripts of a published video do not change."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, video_id: str) -> Path:
+        return self.cache_dir / f"{video_id}.json"
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        return read_json(self._path(video_id))
+
+    def put(self, video_id: str, title: Optional[str], segments: List[dict], published: Optional[str] = None) -> Dict:
+        """Stores a transcript; `published` is the video's upload date, `fetched_at` only records the download."""
+        entry = {"video_id": video_id, "title": title, "segments": segments, "published": published,
+                 "fetched_at": datetime.now().strftime('%Y-%m-%d')}
+        return self.write(entry)
+
+    def write(self, entry: Dict) -> Dict:
+        video_id = entry["video_id"]
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        write_json(self._path(video_id), entry)
+        return entry
+
+
+if __name__ == "__main__":
+    import sys
+    from ingestion import DataIngestor, YOUTUBE_VIDEO_IDS
+    from rag_engine import RAGEngine
+
+    logging.basicConfig(level=logging.INFO)
+    root_dir = Path(__file__).parent.parent
+    video_ids = [video_id_from_url(arg) for arg in sys.argv[1:]] or YOUTUBE_VIDEO_IDS
+    print(f"📺 Ingesting {len(video_ids)} YouTube transcripts...")
+    changed = DataIngestor(str(root_dir / "data")).ingest_youtube(video_ids)
+    print(f"✅ {len(changed)} transcripts new or changed.")
+    if changed:
+        RAGEngine(str(root_dir / "data"), str(root_dir / "chroma_db")).update_documents(changed)
+        print("🔄 Index updated.")
@@ -1,6 +1,8 @@
 import sys
 import os
+import threading
 import pytest
+from http.server import ThreadingHTTPServer
 from pathlib import Path
 
 # Add src to python path for imports
@@ -19,3 +21,24 @@ def temp_chroma_dir(tmp_path):
     d = tmp_path / "chroma_db"
     d.mkdir()
     return d
+
+@pytest.fixture
+def http_server():
+    """
+    Factory fixture: serves a request handler class (on a free local port) or an already
+    bound server on a background thread and returns its base URL. Shut down after the test.
+    """
+    servers = []
+
+    def serve(handler_or_server):
+        server = handler_or_server
+        if not isinstance(server, ThreadingHTTPServer):
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler_or_server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
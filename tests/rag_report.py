@@ -8,6 +8,7 @@ import re
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from ingestion import CORE_WIKI_URLS, TINTO_TALKS_URLS, DataIngestor
+from manifest import CorpusManifest
 
 def get_file_report():
     root_dir = Path(__file__).parent.parent
@@ -24,18 +25,10 @@ def get_file_report():
     
     found_files = set()
 
-    # Create a mapping of found URLs from content of files in data_dir
-    url_to_file = {}
-    for f in data_dir.glob("*.txt"):
-        try:
-            with open(f, "r", encoding="utf-8") as file:
-                content = file.read(1000) # Read first 1000 chars
-                match = re.search(r"Source URL: (https?://\S+)", content)
-                if match:
-                    url = match.group(1).strip()
-                    url_to_file[url] = f.name
-        except Exception:
-            continue
+    # Map source URLs to files via the corpus manifest (only files missing from it are read)
+    manifest = CorpusManifest(str(data_dir))
+    manifest.sync()
+    url_to_file = {entry["url"].strip(): name for name, entry in manifest.items() if entry.get("url")}
 
     # 1. Wiki Check
     for url in CORE_WIKI_URLS:
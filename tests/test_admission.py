@@ -0,0 +1,118 @@
+import threading
+import time
+import pytest
+from admission import AdmissionQueue, QueueFull, backend_queue
+
+
+def hold(queue, started, release, positions=None):
+    on_wait = positions.append if positions is not None else None
+    with queue.admit(on_wait=on_wait, poll=0.01):
+        started.set()
+        release.wait(5)
+
+
+def test_one_at_a_time_in_arrival_order():
+    queue = AdmissionQueue("ollama", max_concurrent=1, max_queue=4)
+    release, first_started = threading.Event(), threading.Event()
+    first = threading.Thread(target=hold, args=(queue, first_started, release))
+    first.start()
+    first_started.wait(5)
+
+    order, positions = [], []
+
+    def waiter(name):
+        with queue.admit(on_wait=positions.append if name == "b" else None, poll=0.01):
+            order.append(name)
+
+    a = threading.Thread(target=waiter, args=("a",))
+    a.start()
+    while queue.waiting < 1:
+        time.sleep(0.005)
+    b = threading.Thread(target=waiter, args=("b",))
+    b.start()
+    while queue.waiting < 2:
+        time.sleep(0.005)
+
+    assert queue.active == 1
+    time.sleep(0.02)
+    release.set()
+    for t in (first, a, b):
+        t.join(5)
+
+    assert order == ["a", "b"]
+    assert positions[0] == 2
+    stats = queue.stats()
+    assert stats["admitted"] == 3 and stats["active"] == 0 and stats["waiting"] == 0
+    assert stats["wait_p95_ms"] > 0
+
+
+def test_rejects_past_max_queue_and_times_out():
+    queue = AdmissionQueue("ollama", max_concurrent=1, max_queue=1, max_wait=0.05)
+    release, started = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold, args=(queue, started, release))
+    holder.start()
+    started.wait(5)
+
+    # The single queue slot times out; a second waiter meanwhile is rejected outright
+    timed_out = []
+
+    def waiter():
+        try:
+            with queue.admit(poll=0.01):
+                pass
+        except QueueFull:
+            timed_out.append(True)
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    while queue.waiting < 1:
+        time.sleep(0.005)
+    with pytest.raises(QueueFull):
+        with queue.admit():
+            pass
+    t.join(5)
+    release.set()
+    holder.join(5)
+
+    assert timed_out == [True]
+    stats = queue.stats()
+    assert stats["rejected"] == 1 and stats["timed_out"] == 1 and stats["waiting"] == 0
+
+
+def test_abandoned_waiter_leaves_the_queue():
+    queue = AdmissionQueue("ollama", max_concurrent=1)
+    release, started = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold, args=(queue, started, release))
+    holder.start()
+    started.wait(5)
+
+    def stop(position):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        with queue.admit(on_wait=stop):
+            pass
+    assert queue.waiting == 0
+    release.set()
+    holder.join(5)
+
+    with queue.admit() as waited:
+        assert waited < 1
+
+
+def test_divert_only_when_busy_and_queued():
+    queue = AdmissionQueue("ollama", max_concurrent=1)
+    assert not queue.should_divert(queue_length=0)
+    release, started = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold, args=(queue, started, release))
+    holder.start()
+    started.wait(5)
+    assert queue.should_divert(queue_length=0)
+    assert not queue.should_divert(queue_length=1)
+    release.set()
+    holder.join(5)
+
+
+def test_backend_queues_are_shared_per_provider():
+    assert backend_queue("Local (Ollama)") is backend_queue("Local (Ollama)")
+    assert backend_queue("Groq").max_concurrent > backend_queue("Local (Ollama)").max_concurrent
@@ -0,0 +1,89 @@
+import json
+import threading
+import pytest
+from batch_qa import BatchRunner, completed_ids, read_questions
+from benchmarking import record_stage
+
+
+class StubEngine:
+    """Answers by echoing the question; fails the first `failures` calls overall."""
+
+    def __init__(self, state):
+        self.state = state
+        self.history = []
+
+    def reset(self):
+        self.history = []
+
+    def chat(self, question):
+        self.history.append(question)
+        with self.state["lock"]:
+            self.state["calls"] += 1
+            if self.state["calls"] <= self.state["failures"]:
+                raise ConnectionError("Ollama not reachable")
+        record_stage("retrieve", 0.002)
+        return f"Answer to {question} ({len(self.history)} in memory)"
+
+
+@pytest.fixture
+def questions_file(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text("\n".join(json.dumps(q) for q in [
+        {"id": "estates", "question": "How do estates work?"},
+        {"question": "How does control work?", "topic": "provinces"},
+        {"question": "What is crown power?"},
+    ]) + "\n", encoding="utf-8")
+    return path
+
+
+def make_runner(failures=0, **kwargs):
+    state = {"calls": 0, "failures": failures, "lock": threading.Lock()}
+    return BatchRunner(lambda: StubEngine(state), backoff=0.0, **kwargs), state
+
+
+class TestBatchQA:
+
+    def test_answers_every_question_with_timings(self, questions_file, tmp_path):
+        output = tmp_path / "answers.jsonl"
+        runner, _ = make_runner(workers=2, extra={"model": "stub"})
+
+        summary = runner.run(read_questions(questions_file), output)
+
+        records = {r["id"]: r for r in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+        assert summary["answered"] == 3 and summary["failed"] == 0
+        assert set(records) == {"estates", "2", "3"}
+        # Memory is reset per question, so earlier questions never leak into later answers
+        assert records["2"]["answer"] == "Answer to How does control work? (1 in memory)"
+        assert records["2"]["topic"] == "provinces"
+        assert records["2"]["model"] == "stub"
+        assert records["2"]["timings"]["retrieve_ms"] == pytest.approx(2.0)
+        assert records["2"]["sources"] == []
+
+    def test_failures_are_retried(self, questions_file, tmp_path):
+        output = tmp_path / "answers.jsonl"
+        runner, _ = make_runner(failures=2, retries=2)
+
+        summary = runner.run(read_questions(questions_file)[:1], output)
+
+        record = json.loads(output.read_text(encoding="utf-8"))
+        assert summary["answered"] == 1
+        assert record["attempts"] == 3
+
+    def test_resume_skips_answered_and_retries_failed(self, questions_file, tmp_path):
+        output = tmp_path / "answers.jsonl"
+        runner, _ = make_runner(failures=1, retries=0)
+        runner.run(read_questions(questions_file)[:1], output)
+        assert completed_ids(output) == set()
+
+        # A crash can leave a truncated last line behind
+        with open(output, "a", encoding="utf-8") as f:
+            f.write('{"id": "2", "answ')
+
+        runner, state = make_runner()
+        summary = runner.run(read_questions(questions_file), output)
+        assert summary == {**summary, "skipped": 0, "answered": 3}
+        assert completed_ids(output) == {"estates", "2", "3"}
+
+        summary = runner.run(read_questions(questions_file), output)
+        assert summary["skipped"] == 3 and summary["answered"] == 0
+        assert state["calls"] == 3
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+from dedup import NearDuplicateFilter, source_rank
+
+PARAGRAPH = ("The burgher estate gains power from trade income and controls most of the "
+             "cities in your country. Keeping them satisfied unlocks privileges that boost "
+             "production, while angering them can lead to a disaster that cripples the economy.")
+
+
+def make_node(node_id, text, doc_id):
+    return SimpleNamespace(node_id=node_id, ref_doc_id=doc_id, get_content=lambda: text)
+
+
+class TestNearDuplicateFilter:
+
+    def test_near_copy_is_detected(self):
+        """Test that a reformatted copy with a small edit is matched to the original."""
+        dedup = NearDuplicateFilter()
+        assert dedup.add("wiki-1", PARAGRAPH) is None
+        pasted = "  " + PARAGRAPH.upper().replace("economy.", "economy!!") + "\n"
+        assert dedup.add("manual-1", pasted) == "wiki-1"
+
+    def test_distinct_text_is_kept(self):
+        """Test that unrelated chunks are not flagged."""
+        dedup = NearDuplicateFilter()
+        dedup.add("a", PARAGRAPH)
+        other = ("Naval combat is resolved in rounds where galleys fight best in inland seas "
+                 "and heavy ships dominate the open ocean, so fleet composition matters.")
+        assert dedup.add("b", other) is None
+
+    def test_filter_reports_savings(self):
+        """Test that filter drops the copies and counts what was saved."""
+        dedup = NearDuplicateFilter()
+        nodes = [make_node("1", PARAGRAPH, "Estates.txt"),
+                 make_node("2", PARAGRAPH, "manual_tinto_talks_3.txt"),
+                 make_node("3", "Short unique chunk.", "Estates.txt")]
+        kept = dedup.filter(nodes)
+        assert [n.node_id for n in kept] == ["1", "3"]
+        assert dedup.stats["duplicates"] == 1
+        assert dedup.stats["duplicate_chars"] == len(PARAGRAPH)
+        assert dedup.dropped_by_doc["manual_tinto_talks_3.txt"] == 1
+        assert dedup.duplicates_of == {"Estates.txt": {"manual_tinto_talks_3.txt"}}
+
+    def test_source_rank_prefers_wiki_then_tinto(self):
+        names = ["youtube_abc.txt", "manual_tinto_talks_1.txt", "tinto_talk_1.txt", "Estates.txt"]
+        assert sorted(names, key=source_rank) == ["Estates.txt", "tinto_talk_1.txt",
+                                                  "manual_tinto_talks_1.txt", "youtube_abc.txt"]
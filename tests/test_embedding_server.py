@@ -0,0 +1,79 @@
+import json
+import time
+import urllib.error
+import urllib.request
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from embedding_server import DynamicBatcher, RemoteEmbedding, make_server
+
+
+def fake_embed(calls):
+    def embed(texts, kind):
+        calls.append((kind, list(texts)))
+        time.sleep(0.01)
+        return [[float(len(t)), 1.0 if kind == "query" else 0.0] for t in texts]
+    return embed
+
+
+def test_concurrent_requests_are_batched_and_split_back():
+    calls = []
+    batcher = DynamicBatcher(fake_embed(calls), max_batch_size=64, max_wait=0.05)
+    texts = ["a" * i for i in range(1, 17)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda t: batcher.submit([t], "query"), texts))
+
+    # Each caller gets its own embedding back, and far fewer model calls than callers were made
+    assert results == [[[float(len(t)), 1.0]] for t in texts]
+    assert len(calls) < len(texts)
+    assert batcher.stats["requests"] == 16
+
+
+def test_query_and_text_kinds_are_never_mixed():
+    calls = []
+    batcher = DynamicBatcher(fake_embed(calls), max_wait=0.05)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(batcher.submit, ["q"], "query"), pool.submit(batcher.submit, ["doc"], "text")]
+        assert futures[0].result() == [[1.0, 1.0]]
+        assert futures[1].result() == [[3.0, 0.0]]
+
+    assert sorted(calls) == [("query", ["q"]), ("text", ["doc"])]
+    with pytest.raises(ValueError):
+        batcher.submit(["x"], "passage")
+
+
+def test_model_errors_reach_the_caller():
+    def broken(texts, kind):
+        raise RuntimeError("CUDA out of memory")
+
+    with pytest.raises(RuntimeError):
+        DynamicBatcher(broken).submit(["q"], "query")
+
+
+@pytest.fixture
+def server_url(http_server):
+    batcher = DynamicBatcher(fake_embed([]))
+    return http_server(make_server(batcher, port=0, model_name="fake-bge"))
+
+
+def test_remote_embedding_round_trip(server_url):
+    model = RemoteEmbedding(server_url=server_url + "/")
+
+    assert model.get_query_embedding("hello") == [5.0, 1.0]
+    assert model.get_text_embedding_batch(["ab", "abc"]) == [[2.0, 0.0], [3.0, 0.0]]
+    assert model.model_name == "BAAI/bge-small-en-v1.5"
+
+    health = model._session.get(f"{server_url}/health").json()
+    assert health["model"] == "fake-bge"
+    assert health["texts"] == 3
+
+
+@pytest.mark.parametrize("payload", [{"texts": ["ok", 42]}, {"texts": "not a list"}, {"texts": ["ok"], "kind": "image"}])
+def test_bad_requests_are_rejected_before_batching(server_url, payload):
+    request = urllib.request.Request(f"{server_url}/embed", data=json.dumps(payload).encode("utf-8"), method="POST")
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request, timeout=5)
+
+    assert error.value.code == 400
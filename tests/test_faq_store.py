@@ -0,0 +1,67 @@
+import pytest
+from faq_store import FaqStore, build_entries, read_question_list
+
+VECTORS = {
+    "How do estates work?": [1.0, 0.0, 0.0],
+    "How do the estates function?": [0.96, 0.28, 0.0],
+    "How does naval combat work?": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbedModel:
+    model_name = "fake-faq-embedder"
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_query_embedding(self, query):
+        self.calls += 1
+        return VECTORS.get(query, [0.0, 1.0, 0.0])
+
+
+@pytest.fixture
+def store(tmp_path):
+    faq = FaqStore(str(tmp_path), "eu5_docs_v2", threshold=0.9)
+    answers = [
+        {"id": "1", "question": "How do estates work?", "answer": "Estates are...", "sources": [{"file": "Estates.txt"}]},
+        {"id": "2", "question": "How does naval combat work?", "error": "timeout"},
+    ]
+    faq.save(build_entries(answers, FakeEmbedModel()))
+    return faq
+
+
+class TestFaqStore:
+
+    def test_failed_answers_are_not_stored(self, store):
+        assert len(store) == 1
+        assert store.entries[0]["sources"] == [{"file": "Estates.txt"}]
+
+    def test_lookup_matches_rephrasings_above_threshold(self, store):
+        embed_model = FakeEmbedModel()
+
+        assert store.lookup("How do the estates function?", embed_model)["answer"] == "Estates are..."
+        assert store.lookup("How does naval combat work?", embed_model) is None
+        assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+    def test_store_is_per_index_version(self, store, tmp_path):
+        assert len(FaqStore(str(tmp_path), "eu5_docs_v2")) == 1
+        assert len(FaqStore(str(tmp_path), "eu5_docs_v3")) == 0
+        assert FaqStore(str(tmp_path), "eu5_docs_v3").lookup("How do estates work?", FakeEmbedModel()) is None
+
+    def test_question_list_from_text_file(self, tmp_path):
+        path = tmp_path / "faq.txt"
+        path.write_text("How do estates work?\n\nWhat is crown power?\n", encoding="utf-8")
+
+        questions = read_question_list(path)
+        assert [q["question"] for q in questions] == ["How do estates work?", "What is crown power?"]
+
+    def test_answers_written_by_another_process_are_picked_up(self, tmp_path):
+        serving = FaqStore(str(tmp_path), "eu5_docs_v3", threshold=0.9)
+        assert serving.lookup("How do estates work?", FakeEmbedModel()) is None
+
+        # The FAQ job saves through its own store instance
+        answers = [{"id": "1", "question": "How do estates work?", "answer": "Estates are..."}]
+        FaqStore(str(tmp_path), "eu5_docs_v3").save(build_entries(answers, FakeEmbedModel()))
+
+        assert serving.lookup("How do estates work?", FakeEmbedModel())["answer"] == "Estates are..."
+        assert serving.stats()["entries"] == 1
@@ -0,0 +1,77 @@
+import threading
+import time
+import pytest
+from llama_index.core.base.base_retriever import BaseRetriever
+from admission import AdmissionQueue, QueueFull
+from generation import BackgroundGeneration, CancellableChatEngine
+from load_test import FakeLLM
+
+
+class EmptyRetriever(BaseRetriever):
+    def _retrieve(self, query_bundle):
+        return []
+
+
+def make_engine(**llm_kwargs):
+    llm = FakeLLM(prompt_token_latency=0.0, first_token_latency=0.0, **llm_kwargs)
+    return CancellableChatEngine.from_defaults(retriever=EmptyRetriever(), llm=llm, system_prompt="Be brief."), llm
+
+
+class TestBackgroundGeneration:
+
+    def test_streams_the_full_answer(self):
+        engine, _ = make_engine(token_latency=0.0, output_tokens=5)
+        job = BackgroundGeneration(engine, "How do estates work?")
+
+        assert job.wait(5)
+        assert job.error is None
+        assert job.text.split() == ["word"] * 5
+
+    @pytest.mark.parametrize("profile", [False, True])
+    def test_cancel_stops_generation_and_frees_the_model(self, profile):
+        """Test that a cancelled answer stops early and releases the LLM's slot, profiled or not."""
+        engine, llm = make_engine(token_latency=0.02, output_tokens=500)
+        job = BackgroundGeneration(engine, "q", profile=profile)
+        while not job.text:
+            time.sleep(0.01)
+
+        start = time.perf_counter()
+        job.cancel()
+        assert job.wait(2)
+        assert time.perf_counter() - start < 1
+        assert 0 < len(job.text.split()) < 500
+        # The stream was closed, so the next question gets the single slot right away
+        assert llm._slots.acquire(timeout=1)
+        assert (job.profile is not None) == profile
+
+    def test_cancel_while_queued_leaves_the_queue(self):
+        engine, _ = make_engine(token_latency=0.0, output_tokens=1)
+        gate = AdmissionQueue("ollama", max_concurrent=1)
+        release = threading.Event()
+
+        def hold():
+            with gate.admit():
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        while gate.active < 1:
+            time.sleep(0.01)
+
+        job = BackgroundGeneration(engine, "q", gate=gate)
+        while job.queue_position != 1:
+            time.sleep(0.01)
+        job.cancel()
+
+        assert job.wait(2)
+        assert job.text == "" and job.error is None
+        assert gate.waiting == 0
+        release.set()
+        holder.join(5)
+
+    def test_queue_errors_are_reported(self):
+        engine, _ = make_engine(token_latency=0.0, output_tokens=1)
+        job = BackgroundGeneration(engine, "q", gate=AdmissionQueue("ollama", max_queue=0))
+
+        assert job.wait(2)
+        assert isinstance(job.error, QueueFull)
@@ -0,0 +1,42 @@
+import pytest
+from html_archive import HtmlArchive
+
+PAGE = "<html><head><title>Estates</title></head><body><p>" + "Estates hold power. " * 30 + "</p></body></html>"
+
+
+class TestHtmlArchive:
+
+    def test_round_trip_and_dedup(self, tmp_path):
+        """Test that identical responses share one compressed object."""
+        archive = HtmlArchive(str(tmp_path / "raw_archive"))
+        digest = archive.put("https://example.com/a", PAGE)
+        assert archive.put("https://example.com/b", PAGE, prefix="tinto_") == digest
+
+        objects = list((tmp_path / "raw_archive" / "objects").rglob(f"{digest}.*"))
+        assert len(objects) == 1
+        assert objects[0].stat().st_size < len(PAGE)
+
+        reopened = HtmlArchive(str(tmp_path / "raw_archive"))
+        assert reopened.get("https://example.com/a") == PAGE
+        assert reopened.entries()["https://example.com/b"]["prefix"] == "tinto_"
+        assert reopened.get("https://example.com/missing") is None
+
+    def test_reextract_regenerates_data_offline(self, tmp_path, temp_data_dir):
+        """Test that deleted data/ files come back from the archive alone."""
+        pytest.importorskip("bs4")
+        from ingestion import DataIngestor
+        from html_archive import reextract
+
+        archive_root = tmp_path / "raw_archive"
+        HtmlArchive(str(archive_root)).put("https://example.com/Estates", PAGE, date="2025-11-04")
+        HtmlArchive(str(archive_root)).put("https://example.com/Stub", "<p>too short</p>")
+
+        changed = reextract(str(temp_data_dir), str(archive_root), max_workers=2)
+
+        assert changed == ["Estates.txt"]
+        content = (temp_data_dir / "Estates.txt").read_text(encoding="utf-8")
+        assert content.startswith("Source URL: https://example.com/Estates\nSource Date: 2025-11-04")
+        assert DataIngestor(str(temp_data_dir)).manifest.get("Estates.txt")["url"] == "https://example.com/Estates"
+
+        # Re-running with unchanged rules touches nothing
+        assert reextract(str(temp_data_dir), str(archive_root), max_workers=2) == []
@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from index_builder import IndexBuilder, BuildCheckpoint, extract_metadata_from_file, _load_and_split
+from dedup import NearDuplicateFilter
+
+class TestIndexBuilder:
+
+    @pytest.fixture
+    def mock_embed_model(self):
+        with patch('index_builder.Settings') as mock_settings:
+            mock_settings.chunk_size = 1024
+            mock_settings.chunk_overlap = 200
+            mock_settings.embed_model.get_text_embedding_batch.side_effect = lambda texts: [[0.1, 0.2]] * len(texts)
+            yield mock_settings.embed_model
+
+    def test_extract_metadata_reads_header(self, temp_data_dir):
+        """Test that the date is read from the file header when no manifest is given."""
+        path = temp_data_dir / "Estate.txt"
+        path.write_text("Source URL: https://wiki/Estate\nSource Date: 2025-02-03\n\nBody", encoding="utf-8")
+        assert extract_metadata_from_file(path) == {"date": "2025-02-03"}
+
+    def test_load_and_split_uses_filename_as_doc_id(self, temp_data_dir):
+        """Test that worker output can later be replaced per file."""
+        path = temp_data_dir / "Laws.txt"
+        path.write_text("Source Date: 2025-02-03\n\n\n\nLaws are passed in parliament.", encoding="utf-8")
+        nodes = _load_and_split(str(path), {"date": "2025-02-03"}, 1024, 200)
+        assert len(nodes) == 1
+        assert nodes[0].ref_doc_id == "Laws.txt"
+        assert nodes[0].metadata["date"] == "2025-02-03"
+
+    def test_build_batches_embeddings_and_upserts(self, mock_embed_model, temp_data_dir):
+        """Test that nodes are embedded and upserted in fixed-size batches."""
+        files = []
+        for i in range(5):
+            path = temp_data_dir / f"doc_{i}.txt"
+            path.write_text(f"Source Date: 2025-01-0{i + 1}\n\nDocument number {i}.", encoding="utf-8")
+            files.append(path)
+
+        vector_store = MagicMock()
+        builder = IndexBuilder(vector_store, max_workers=1, embed_batch_size=2)
+        stats = builder.build(files)
+
+        assert stats["files"] == 5
+        assert stats["nodes"] == 5
+        # 5 nodes with batch size 2 -> 3 embedding calls and 3 upserts
+        assert mock_embed_model.get_text_embedding_batch.call_count == 3
+        assert vector_store.add.call_count == 3
+        assert all(n.embedding == [0.1, 0.2] for call in vector_store.add.call_args_list for n in call.args[0])
+
+    def test_build_resumes_from_checkpoint(self, mock_embed_model, temp_data_dir, tmp_path):
+        """Test that an interrupted build skips finished files and clears the partial batch."""
+        files = []
+        for i in range(4):
+            path = temp_data_dir / f"doc_{i}.txt"
+            path.write_text(f"Document number {i}.", encoding="utf-8")
+            files.append(path)
+
+        checkpoint_path = tmp_path / "build_checkpoint.json"
+        checkpoint = BuildCheckpoint(checkpoint_path)
+        checkpoint.done = {"doc_0.txt", "doc_1.txt"}
+        checkpoint.start_batch(["doc_2.txt"])
+
+        vector_store = MagicMock()
+        builder = IndexBuilder(vector_store, max_workers=1, file_batch_size=1, checkpoint_path=checkpoint_path)
+        stats = builder.build(files)
+
+        assert stats["files"] == 2
+        assert stats["skipped"] == 2
+        vector_store.delete.assert_called_once_with(ref_doc_id="doc_2.txt")
+        upserted = [n.ref_doc_id for call in vector_store.add.call_args_list for n in call.args[0]]
+        assert upserted == ["doc_2.txt", "doc_3.txt"]
+        # A finished build leaves no checkpoint behind, so the next start takes the fast path
+        assert not checkpoint_path.exists()
+
+    def test_build_drops_duplicate_chunks_before_embedding(self, mock_embed_model, temp_data_dir):
+        """Test that a pasted copy of a wiki page is not embedded twice, and the wiki copy wins."""
+        body = "The burgher estate gains power from trade income and controls most cities. " * 5
+        (temp_data_dir / "manual_tinto_talks_1.txt").write_text(body, encoding="utf-8")
+        (temp_data_dir / "Estates.txt").write_text(body, encoding="utf-8")
+
+        vector_store = MagicMock()
+        builder = IndexBuilder(vector_store, max_workers=1, dedup=NearDuplicateFilter())
+        stats = builder.build([temp_data_dir / "manual_tinto_talks_1.txt", temp_data_dir / "Estates.txt"])
+
+        assert stats["duplicates"] == 1
+        upserted = [n.ref_doc_id for call in vector_store.add.call_args_list for n in call.args[0]]
+        assert upserted == ["Estates.txt"]
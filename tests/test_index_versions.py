@@ -0,0 +1,42 @@
+import pytest
+from index_versions import IndexVersions, BASE_COLLECTION
+
+class TestIndexVersions:
+
+    def test_defaults_to_unversioned_collection(self, temp_chroma_dir):
+        """Test that an index without a pointer file keeps serving the original collection."""
+        assert IndexVersions(str(temp_chroma_dir)).active() == BASE_COLLECTION
+
+    def test_promote_swaps_active_version(self, temp_chroma_dir):
+        """Test that a reserved version only goes live once promoted."""
+        versions = IndexVersions(str(temp_chroma_dir))
+        name = versions.reserve_next()
+        assert name == "eu5_docs_v1"
+        assert versions.active() == BASE_COLLECTION
+
+        assert versions.promote(name) == BASE_COLLECTION
+        assert IndexVersions(str(temp_chroma_dir)).active() == "eu5_docs_v1"
+        assert versions.reserve_next() == "eu5_docs_v2"
+
+    def test_interrupted_build_reuses_reserved_version(self, temp_chroma_dir):
+        """Test that an unpromoted version is resumed rather than skipped."""
+        versions = IndexVersions(str(temp_chroma_dir))
+        assert versions.reserve_next() == "eu5_docs_v1"
+        assert versions.reserve_next() == "eu5_docs_v1"
+
+    def test_retired_keeps_live_and_rollback(self, temp_chroma_dir):
+        """Test that only versions older than the rollback target are retired."""
+        versions = IndexVersions(str(temp_chroma_dir))
+        for _ in range(3):
+            versions.promote(versions.reserve_next())
+
+        existing = ["eu5_docs", "eu5_docs_v1", "eu5_docs_v2", "eu5_docs_v3", "unrelated"]
+        assert sorted(versions.retired(existing)) == ["eu5_docs", "eu5_docs_v1"]
+
+    def test_collection_families_have_separate_pointers(self, temp_chroma_dir):
+        """Test that promoting a shard version does not move the main pointer."""
+        shard = IndexVersions(str(temp_chroma_dir), base_name="eu5_docs_tinto")
+        shard.promote(shard.reserve_next())
+
+        assert shard.active() == "eu5_docs_tinto_v1"
+        assert IndexVersions(str(temp_chroma_dir)).active() == BASE_COLLECTION
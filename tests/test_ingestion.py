@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from ingestion import DataIngestor
+from manifest import CorpusManifest
 import requests
 
 class TestDataIngestor:
@@ -73,3 +74,61 @@ class TestDataIngestor:
         
         success = ingestor.scrape_url("http://bad-url.com")
         assert success is False
+
+    @patch('requests.get')
+    def test_scrape_url_records_manifest(self, mock_get, temp_data_dir):
+        """Test that a scraped page is recorded in the corpus manifest."""
+        ingestor = DataIngestor(str(temp_data_dir))
+        
+        mock_response = MagicMock()
+        mock_response.headers = {}
+        mock_response.text = "<html><title>Estate</title><body><p>" + "Estates matter. " * 30 + "</p></body></html>"
+        mock_get.return_value = mock_response
+        
+        assert ingestor.scrape_url("http://example.com/Estate", prefix="tinto_") is True
+        
+        entry = CorpusManifest(str(temp_data_dir)).get("tinto_Estate.txt")
+        assert entry["url"] == "http://example.com/Estate"
+        assert entry["prefix"] == "tinto_"
+
+    @patch('requests.get')
+    def test_scrape_url_skips_dead_urls(self, mock_get, temp_data_dir):
+        """Test that URLs reported dead by the health check are not requested."""
+        ingestor = DataIngestor(str(temp_data_dir))
+        ingestor.dead_urls = {"http://example.com/Removed_Page"}
+        
+        assert ingestor.scrape_url("http://example.com/Removed_Page") is False
+        mock_get.assert_not_called()
+
+    def test_ingest_youtube_uses_cache(self, temp_data_dir):
+        """Test that transcripts are fetched once, cached by video ID and saved as youtube_ files."""
+        class StubYouTube:
+            def __init__(self):
+                self.fetched = []
+            def title(self, video_id):
+                return f"Video {video_id}"
+            def publish_date(self, video_id):
+                return "2023-06-01"
+            def transcript(self, video_id):
+                self.fetched.append(video_id)
+                return [{"text": "estates hold power", "start": 0.0, "duration": 2.0},
+                        {"text": "over your country", "start": 2.0, "duration": 2.0}]
+
+        ingestor = DataIngestor(str(temp_data_dir))
+        stub = StubYouTube()
+        changed = ingestor.ingest_youtube(["https://youtu.be/aaaaaaaaaaa", "bbbbbbbbbbb"], source=stub)
+
+        assert sorted(changed) == ["youtube_aaaaaaaaaaa.txt", "youtube_bbbbbbbbbbb.txt"]
+        content = (temp_data_dir / "youtube_aaaaaaaaaaa.txt").read_text(encoding="utf-8")
+        assert content.startswith("Source URL: https://www.youtube.com/watch?v=aaaaaaaaaaa")
+        assert "Video aaaaaaaaaaa\n\nestates hold power over your country" in content
+        # The upload date, not the day the transcript was downloaded
+        assert "Source Date: 2023-06-01\n" in content
+
+        # Second run: served from the cache, nothing changed
+        assert ingestor.ingest_youtube(["aaaaaaaaaaa", "bbbbbbbbbbb"], source=stub) == []
+        assert sorted(stub.fetched) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+
+        # A date given with the ID wins and re-dates the unchanged transcript
+        assert ingestor.ingest_youtube([("bbbbbbbbbbb", "2022-01-15")], source=stub) == ["youtube_bbbbbbbbbbb.txt"]
+        assert "Source Date: 2022-01-15\n" in (temp_data_dir / "youtube_bbbbbbbbbbb.txt").read_text(encoding="utf-8")
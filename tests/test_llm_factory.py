@@ -1,16 +1,44 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from llm_factory import get_llm_model
+from llm_factory import get_llm, KeepAliveClient, PromptEvalStats
 
 def test_get_llm_model_ollama():
     """Test correctly instantiating Ollama model."""
     
     # We patch the class constructor to prevent real network calls/initialization
-    with patch('llm_factory.Ollama') as MockOllama:
-        llm = get_llm_model(model_name="llama3.1:8b")
+    with patch('llm_factory.Ollama') as MockOllama, patch('llm_factory.Client'):
+        llm = get_llm("Local (Ollama)", model_name="llama3.1:8b")
         
         MockOllama.assert_called_once()
         # Verify args passed to Ollama constructor
         call_kwargs = MockOllama.call_args.kwargs
         assert call_kwargs['model'] == "llama3.1:8b"
         assert call_kwargs['request_timeout'] == 300.0
+        assert isinstance(call_kwargs['client'], KeepAliveClient)
+
+def test_keep_alive_client_sends_keep_alive_and_records_timings():
+    """Test that every chat request keeps the model loaded and reports prompt-eval time."""
+    inner = MagicMock()
+    inner.chat.return_value = {"message": {"role": "assistant", "content": "Hi"},
+                               "prompt_eval_count": 100, "prompt_eval_duration": 500_000_000}
+    stats = PromptEvalStats()
+    client = KeepAliveClient(inner, keep_alive="30m", stats=stats)
+
+    # 2000 chars ~ 500 tokens, only 100 evaluated -> ~400 came from Ollama's prompt cache
+    client.chat(model="llama3.1:8b", messages=[{"role": "system", "content": "x" * 2000}])
+
+    assert inner.chat.call_args.kwargs["keep_alive"] == "30m"
+    summary = stats.summary()
+    assert summary["avg_prompt_eval_ms"] == 500
+    assert summary["est_prompt_tokens_reused"] == 400
+    assert summary["est_seconds_saved"] == 2.0
+
+def test_keep_alive_client_records_final_stream_chunk():
+    inner = MagicMock()
+    inner.chat.return_value = iter([{"message": {"content": "a"}, "done": False},
+                                    {"message": {"content": "b"}, "done": True, "prompt_eval_count": 10,
+                                     "prompt_eval_duration": 10_000_000}])
+    stats = PromptEvalStats()
+    chunks = list(KeepAliveClient(inner, stats=stats).chat(model="m", messages=[], stream=True))
+    assert len(chunks) == 2
+    assert stats.calls == 1
@@ -0,0 +1,40 @@
+import time
+import pytest
+from benchmarking import percentile, record_stage
+from load_test import FakeLLM, run_load_test
+
+class TestLoadTest:
+
+    def test_percentile_interpolates(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 95) == 0.0
+
+    def test_run_load_test_reports_stages(self):
+        """Test that every simulated user's requests are timed per stage."""
+        class StubEngine:
+            def chat(self, question):
+                record_stage("retrieve", 0.01)
+                time.sleep(0.005)
+
+        report = run_load_test(StubEngine, ["How do estates work?"], users=3, requests_per_user=4)
+
+        assert report["requests"] == 12
+        assert report["errors"] == 0
+        assert report["stages"]["retrieve"]["p50_ms"] == pytest.approx(10.0)
+        assert report["stages"]["total"]["p99_ms"] >= 5.0
+        assert list(report["stages"]) == ["retrieve", "total"]
+
+    def test_fake_llm_serializes_generations(self):
+        """Test that one slot makes concurrent users queue, like a single Ollama server."""
+        llm = FakeLLM(prompt_token_latency=0.0, first_token_latency=0.05, token_latency=0.0,
+                      output_tokens=3, slots=1)
+
+        class LLMEngine:
+            def chat(self, question):
+                llm.complete(question)
+
+        report = run_load_test(LLMEngine, ["q"], users=2, requests_per_user=1)
+        assert report["stages"]["llm_queue"]["p99_ms"] >= 40
+        assert llm.complete("q").text == "word word word "
@@ -0,0 +1,51 @@
+import pytest
+from manifest import CorpusManifest, read_header, MANIFEST_FILENAME
+
+class TestCorpusManifest:
+
+    def _write(self, data_dir, name, content):
+        (data_dir / name).write_text(content, encoding="utf-8")
+        return content
+
+    def test_record_and_reload(self, temp_data_dir):
+        """Test that recorded entries survive a save/load round trip."""
+        manifest = CorpusManifest(str(temp_data_dir))
+        content = self._write(temp_data_dir, "Estate.txt", "Source URL: https://wiki/Estate\nSource Date: 2025-01-02\n\nBody")
+        manifest.record("Estate.txt", content, url="https://wiki/Estate", date="2025-01-02")
+        manifest.save()
+
+        reloaded = CorpusManifest(str(temp_data_dir))
+        entry = reloaded.get("Estate.txt")
+        assert entry["url"] == "https://wiki/Estate"
+        assert entry["date"] == "2025-01-02"
+        assert entry["size"] == len(content.encode("utf-8"))
+        assert (temp_data_dir / MANIFEST_FILENAME).exists()
+
+    def test_get_detects_edited_file(self, temp_data_dir):
+        """Test that a file edited after recording is reported as stale."""
+        manifest = CorpusManifest(str(temp_data_dir))
+        content = self._write(temp_data_dir, "Laws.txt", "Source Date: 2025-01-02\n\nBody")
+        manifest.record("Laws.txt", content, date="2025-01-02")
+
+        self._write(temp_data_dir, "Laws.txt", "Source Date: 2025-03-04\n\nA much longer body")
+        assert manifest.get("Laws.txt") is None
+
+    def test_sync_backfills_and_prunes(self, temp_data_dir):
+        """Test that sync() picks up pre-existing files and drops deleted ones."""
+        self._write(temp_data_dir, "tinto_talk.txt", "Source URL: https://forum/t\nSource Date: 2024-02-28\n\nPost")
+        self._write(temp_data_dir, "manual_video.txt", "Source: Manual (video.txt)\nSource Date: 2025-05-05\nURL: local_file\n\nText")
+
+        manifest = CorpusManifest(str(temp_data_dir))
+        assert manifest.sync() == 2
+        assert manifest.get("tinto_talk.txt")["prefix"] == "tinto_"
+        assert manifest.get("manual_video.txt")["url"] is None
+
+        (temp_data_dir / "tinto_talk.txt").unlink()
+        assert manifest.sync() == 1
+        assert "tinto_talk.txt" not in manifest
+
+    def test_read_header_stops_at_body(self, temp_data_dir):
+        """Test that header parsing ignores 'Source Date:' lines inside the body."""
+        path = temp_data_dir / "Patches.txt"
+        path.write_text("Source URL: https://wiki/Patches\n\nSource Date: 1999-01-01", encoding="utf-8")
+        assert read_header(path) == {"url": "https://wiki/Patches"}
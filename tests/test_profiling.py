@@ -0,0 +1,46 @@
+import importlib.util
+import time
+from profiling import profile_call
+
+def load_module(path, source):
+    """Loads a throwaway module from `path`, so profiled functions have library-like file paths."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source, encoding="utf-8")
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class TestProfiling:
+
+    def test_stages_are_attributed(self, tmp_path):
+        """Test that time spent in embedding and LLM code shows up under those stages."""
+        embeddings = load_module(tmp_path / "embeddings" / "base.py",
+                                 "import time\ndef get_query_embedding(q):\n    time.sleep(0.02)\n    return [0.1]\n")
+        llms = load_module(tmp_path / "llms" / "fake.py",
+                           "import time\ndef chat(messages):\n    time.sleep(0.05)\n    return 'answer'\n")
+
+        def answer(question):
+            embeddings.get_query_embedding(question)
+            return llms.chat([question])
+
+        result, profile = profile_call("How do estates work?", answer, "How do estates work?")
+
+        assert result == "answer"
+        assert profile.stages["embedding"] >= 0.02
+        assert profile.stages["llm"] >= 0.05
+        assert profile.stages["vector_search"] == 0.0
+        assert any("sleep" in row["function"] for row in profile.hot_functions)
+
+    def test_streamed_llm_time_and_dump(self, tmp_path):
+        """Test that LLM time measured off the profiled thread is added as a stage and the profile dumps."""
+        result, profile = profile_call("hi", lambda message: time.sleep(0.01) or f"re: {message}", "hi")
+        profile.set_stage("llm", 0.5)
+
+        assert result == "re: hi"
+        assert profile.stages["llm"] == 0.5
+        assert profile.stages["other"] == 0.0
+
+        prof_path = profile.dump(tmp_path / "profiles")
+        assert prof_path.exists()
+        assert prof_path.with_suffix(".json").exists()
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from llama_index.core.schema import NodeWithScore, TextNode
+from query_cache import CachingRetriever, LRUCache
+
+class TestQueryCache:
+
+    @pytest.fixture
+    def embed_model(self):
+        with patch('query_cache.Settings') as mock_settings:
+            mock_settings.embed_model.model_name = "BAAI/bge-small-en-v1.5"
+            mock_settings.embed_model.get_query_embedding.return_value = [0.1, 0.2]
+            yield mock_settings.embed_model
+
+    def make_retriever(self, index_version, embeddings, retrievals):
+        index = MagicMock()
+        index.as_retriever.return_value.retrieve.return_value = [
+            NodeWithScore(node=TextNode(text=f"chunk {i}", id_=node_id), score=0.9 - i / 10)
+            for i, node_id in enumerate(["node-a", "node-b"])
+        ]
+        retriever = CachingRetriever(index, index_version, similarity_top_k=7,
+                                     embeddings=embeddings, retrievals=retrievals)
+        return retriever, index.as_retriever.return_value
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_repeated_question_skips_embedding_and_search(self, embed_model):
+        """Test that a hot question is answered from the retrieval cache."""
+        embeddings, retrievals = LRUCache(16), LRUCache(16)
+        retriever, inner = self.make_retriever("eu5_docs_v3", embeddings, retrievals)
+
+        first = retriever.retrieve("How do estates work?")
+        second = retriever.retrieve("  How do estates   work? ")
+
+        assert [n.node.node_id for n in first] == ["node-a", "node-b"]
+        assert [n.node.node_id for n in second] == ["node-a", "node-b"]
+
+        assert inner.retrieve.call_count == 1
+        assert embed_model.get_query_embedding.call_count == 1
+        assert inner.retrieve.call_args.args[0].embedding == [0.1, 0.2]
+        assert retrievals.stats()["hits"] == 1
+
+    def test_new_index_version_misses_retrieval_but_reuses_embedding(self, embed_model):
+        """Test that promoting a new version invalidates results, not query embeddings."""
+        embeddings, retrievals = LRUCache(16), LRUCache(16)
+        old, _ = self.make_retriever("eu5_docs_v3", embeddings, retrievals)
+        new, new_inner = self.make_retriever("eu5_docs_v4", embeddings, retrievals)
+
+        old.retrieve("How do estates work?")
+        new.retrieve("How do estates work?")
+
+        assert new_inner.retrieve.call_count == 1
+        assert embed_model.get_query_embedding.call_count == 1
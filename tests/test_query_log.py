@@ -0,0 +1,71 @@
+import json
+import multiprocessing
+import pytest
+from query_log import QueryLog, build_report, query_hash
+
+
+def log_question(log, question, total_ms, retrieval=None, faq=None):
+    log.record(question, "llama3.1:8b", "eu5_docs_v2", ["node-1", "node-2"],
+               {"retrieve_ms": total_ms / 10, "total_ms": total_ms}, {"retrieval": retrieval, "faq": faq})
+
+
+class TestQueryLog:
+
+    def test_records_compact_lines(self, tmp_path):
+        log = QueryLog(str(tmp_path))
+        log_question(log, "How do estates work?", 1200.0, retrieval=False)
+
+        line = (tmp_path / "queries.jsonl").read_text(encoding="utf-8")
+        entry = json.loads(line)
+        assert ": " not in line
+        assert entry["h"] == query_hash("how do  ESTATES work?")
+        assert entry["n"] == ["node-1", "node-2"]
+        assert entry["c"] == {"retrieval": False}
+
+    def test_rotation_keeps_every_record_readable(self, tmp_path):
+        log = QueryLog(str(tmp_path), max_bytes=500, backup_count=50)
+        for i in range(30):
+            log_question(log, f"Question {i}", float(i))
+
+        assert list(tmp_path.glob("queries.*.jsonl.gz"))
+        assert [r["q"] for r in log.records()] == [f"Question {i}" for i in range(30)]
+
+    def test_rotation_drops_oldest_beyond_backup_count(self, tmp_path):
+        log = QueryLog(str(tmp_path), max_bytes=1, backup_count=3)
+        for i in range(10):
+            log_question(log, f"Question {i}", float(i))
+
+        assert len(list(tmp_path.glob("queries.*.jsonl.gz"))) == 3
+        assert [r["q"] for r in log.records()] == ["Question 7", "Question 8", "Question 9"]
+
+    def test_processes_sharing_the_directory_lose_nothing(self, tmp_path):
+        """Test that app processes writing and rotating one log at once keep every record."""
+        def write(worker):
+            log = QueryLog(str(tmp_path), max_bytes=300, backup_count=1000)
+            for i in range(50):
+                log_question(log, f"Worker {worker} question {i}", float(i))
+
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=write, args=(w,)) for w in range(4)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join(30)
+
+        questions = [r["q"] for r in QueryLog(str(tmp_path), backup_count=1000).records()]
+        assert sorted(questions) == sorted(f"Worker {w} question {i}" for w in range(4) for i in range(50))
+
+    def test_report(self, tmp_path):
+        log = QueryLog(str(tmp_path))
+        for _ in range(3):
+            log_question(log, "How do estates work?", 100.0, retrieval=True, faq=False)
+        log_question(log, "how do estates work? ", 50.0, faq=True)
+        log_question(log, "What is the best opening for Portugal?", 9000.0, retrieval=False, faq=False)
+
+        report = build_report(list(log.records()), top=2)
+
+        assert report["queries"] == 5 and report["distinct"] == 2
+        assert report["top_queries"][0] == {"question": "How do estates work?", "count": 4}
+        assert report["slowest"][0]["question"] == "What is the best opening for Portugal?"
+        assert report["hit_rates"] == {"retrieval": 0.75, "faq": 0.2}
+        assert report["stages"]["total_ms"]["p50_ms"] == pytest.approx(100.0)
@@ -0,0 +1,130 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.llms import MockLLM
+from generation import CancellableChatEngine
+from query_router import (QUERY_PLANS, AdaptiveRetriever, classify_query, context_token_budget, count_tokens,
+                          merge_results, split_compound_query)
+from rag_engine import SYSTEM_PROMPT
+
+# Roughly the size of a data/ chunk split at chunk_size=1024
+LONG_CHUNK = " ".join(f"The burgher estate controls trade in city {i} and demands privileges." for i in range(80))
+
+
+class TestQueryRouter:
+
+    @pytest.mark.parametrize("question,plan", [
+        ("What is the console command for adding gold?", "lookup"),
+        ("What is crown power?", "lookup"),
+        ("How do estates work?", "general"),
+        ("What changed in patch 1.0.3?", "recent"),
+        ("What did the latest Tinto Talks say about trade?", "recent"),
+        ("What is the best opening for Portugal?", "strategy"),
+        ("Compare the burghers and the nobility", "strategy"),
+    ])
+    def test_classify_query(self, question, plan):
+        assert classify_query(question) == plan
+
+    @pytest.fixture
+    def make_index(self):
+        """Index whose retrievers return as many dated nodes as their top_k, with text from chunk_text(i)."""
+        def make(chunk_text):
+            def as_retriever(similarity_top_k, filters=None):
+                retriever = MagicMock()
+                retriever.retrieve.return_value = [
+                    NodeWithScore(node=TextNode(text=chunk_text(i), metadata={"date": f"2024-01-{i + 1:02d}"}),
+                                  score=1.0 - i / 100)
+                    for i in range(similarity_top_k)
+                ]
+                return retriever
+
+            index = MagicMock()
+            index.as_retriever.side_effect = as_retriever
+            return index
+
+        with patch('query_cache.Settings') as mock_settings:
+            mock_settings.embed_model.model_name = "BAAI/bge-small-en-v1.5"
+            mock_settings.embed_model.get_query_embedding.return_value = [0.1, 0.2]
+            yield make
+
+    @pytest.fixture
+    def index(self, make_index):
+        return make_index(lambda i: f"chunk {i}")
+
+    def test_lookup_keeps_best_matches_only(self, index):
+        retriever = AdaptiveRetriever(index, index_version="router-test-lookup")
+
+        nodes = retriever.retrieve("What is the console command for adding gold?")
+
+        assert [n.node.text for n in nodes] == ["chunk 0", "chunk 1"]
+        assert retriever.last_plan["type"] == "lookup"
+        assert retriever.last_hit is False
+
+    def test_strategy_gets_deeper_recent_context(self, index):
+        retriever = AdaptiveRetriever(index, index_version="router-test-strategy")
+
+        nodes = retriever.retrieve("How should I prepare for my first war as Castile?")
+
+        # The newest chunks of the 12 retrieved win
+        assert len(nodes) == QUERY_PLANS["strategy"]["keep"]
+        assert nodes[0].node.metadata["date"] == "2024-01-12"
+        retriever.retrieve("How should I prepare for my first war as Castile?")
+        assert retriever.last_hit is True
+
+    @pytest.mark.parametrize("question", [
+        "What is the console command for adding gold?",
+        "How do estates work?",
+        "What changed in patch 1.0.3?",
+        "How should I prepare for my first war as Castile?",
+    ])
+    def test_every_plan_fits_the_context_window(self, make_index, question):
+        """Test that full-size chunks are trimmed instead of overflowing ContextChatEngine's token limit."""
+        llm = MockLLM()  # LlamaIndex's default 3900-token window
+        budget = context_token_budget(llm.metadata.context_window, SYSTEM_PROMPT)
+        retriever = AdaptiveRetriever(make_index(lambda i: LONG_CHUNK), index_version=f"router-test-budget-{question}",
+                                      max_context_tokens=budget)
+        engine = CancellableChatEngine.from_defaults(retriever=retriever, llm=llm, system_prompt=SYSTEM_PROMPT)
+
+        response = engine.chat(question)
+
+        assert count_tokens(LONG_CHUNK) > 900
+        assert 1 <= len(response.source_nodes) <= QUERY_PLANS[retriever.last_plan["type"]]["keep"]
+        assert sum(count_tokens(n.node.get_content()) for n in response.source_nodes) <= budget
+
+    @pytest.mark.parametrize("question,parts", [
+        ("compare estates and parliament and how they affect control",
+         ["estates", "parliament", "how they affect control"]),
+        ("Castile vs Portugal", ["Castile", "Portugal"]),
+        ("What is crown power? How do I raise it?", ["What is crown power", "How do I raise it"]),
+    ])
+    def test_split_compound_query(self, question, parts):
+        assert split_compound_query(question) == [question] + parts
+
+    def test_single_clause_is_not_split(self):
+        assert split_compound_query("How do estates and parliament work?") == ["How do estates and parliament work?"]
+
+    def test_merge_interleaves_and_dedups(self):
+        a, b, c = (NodeWithScore(node=TextNode(text=t, id_=t), score=0.5) for t in "abc")
+        assert [n.node.node_id for n in merge_results([[a, b], [a, c], [b]])] == ["a", "b", "c"]
+
+    def test_multi_query_merges_subquery_results(self, index):
+        retriever = AdaptiveRetriever(index, index_version="router-test-multi", multi_query=True)
+
+        nodes = retriever.retrieve("compare estates and parliament and how they affect control")
+
+        # Four sub-queries searched, one extra chunk kept for each beyond the first
+        assert retriever.last_plan["subqueries"] == 4
+        assert len(nodes) == QUERY_PLANS["strategy"]["keep"] + 3
+        assert retriever.last_hit is None
+
+    def test_multi_query_shares_the_context_budget(self, make_index):
+        """Test that sub-queries add chunks only while they fit the question's token budget."""
+        budget = context_token_budget(MockLLM().metadata.context_window, SYSTEM_PROMPT)
+        retriever = AdaptiveRetriever(make_index(lambda i: f"{LONG_CHUNK} ({i})"), index_version="router-test-multi-budget",
+                                      multi_query=True, max_context_tokens=budget)
+
+        nodes = retriever.retrieve("How do estates work and how do they affect control?")
+
+        assert retriever.last_plan["subqueries"] == 3
+        assert 1 <= len(nodes) < QUERY_PLANS[retriever.last_plan["type"]]["keep"] + 2
+        assert sum(count_tokens(n.node.get_content()) for n in nodes) <= budget
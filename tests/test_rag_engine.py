@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import MagicMock, patch
 from rag_engine import RAGEngine
@@ -9,11 +10,11 @@ class TestRAGEngine:
         with patch('rag_engine.chromadb.PersistentClient') as mock:
             yield mock
 
-    @patch('rag_engine.SimpleDirectoryReader')
+    @patch('rag_engine.IndexBuilder')
     @patch('rag_engine.VectorStoreIndex')
     @patch('rag_engine.ChromaVectorStore')
     @patch('rag_engine.StorageContext')
-    def test_build_index_slow_path(self, mock_storage_ctx, mock_cvs, mock_vsi, mock_sdr, mock_chroma, temp_data_dir, temp_chroma_dir):
+    def test_build_index_slow_path(self, mock_storage_ctx, mock_cvs, mock_vsi, mock_builder, mock_chroma, temp_data_dir, temp_chroma_dir):
         """Test building index when DB is empty (Slow Path)."""
         
         # Setup mocks
@@ -28,21 +29,23 @@ class TestRAGEngine:
         index = engine.load_index()
         
         # Assertions
-        # 1. verify SimpleDirectoryReader was called since DB count was 0
-        mock_sdr.assert_called()
+        # 1. verify the parallel builder was pointed at the Chroma vector store
+        mock_builder.assert_called_once()
+        assert mock_builder.call_args.args[0] is mock_cvs.return_value
         
-        # 2. verify we tried to list files (glob/iterdir logic is internal but we verify result of SDR loading)
-        mock_sdr.return_value.load_data.assert_called_once()
+        # 2. verify the data files were handed to the builder
+        built_files = mock_builder.return_value.build.call_args.args[0]
+        assert [f.name for f in built_files] == ["test.txt"]
         
-        # 3. verify Index created from documents
-        mock_vsi.from_documents.assert_called_once()
-        mock_vsi.from_vector_store.assert_not_called()
+        # 3. verify Index is served from the freshly populated vector store
+        mock_vsi.from_vector_store.assert_called_once()
+        mock_vsi.from_documents.assert_not_called()
 
-    @patch('rag_engine.SimpleDirectoryReader')
+    @patch('rag_engine.IndexBuilder')
     @patch('rag_engine.VectorStoreIndex')
     @patch('rag_engine.ChromaVectorStore')
     @patch('rag_engine.StorageContext')
-    def test_load_index_fast_path(self, mock_storage_ctx, mock_cvs, mock_vsi, mock_sdr, mock_chroma, temp_data_dir, temp_chroma_dir):
+    def test_load_index_fast_path(self, mock_storage_ctx, mock_cvs, mock_vsi, mock_builder, mock_chroma, temp_data_dir, temp_chroma_dir):
         """Test loading index when DB has data (Fast Path)."""
         
         # Setup mocks
@@ -54,9 +57,95 @@ class TestRAGEngine:
         index = engine.load_index()
         
         # Assertions
-        # 1. SimpleDirectoryReader should NOT be called
-        mock_sdr.assert_not_called()
+        # 1. The builder should NOT be called
+        mock_builder.assert_not_called()
         
         # 2. Index loaded from vector store
         mock_vsi.from_vector_store.assert_called_once()
         mock_vsi.from_documents.assert_not_called()
+
+    @patch('rag_engine.IndexBuilder')
+    @patch('rag_engine.ChromaVectorStore')
+    def test_refresh_index_builds_then_promotes(self, mock_cvs, mock_builder, mock_chroma, temp_data_dir, temp_chroma_dir):
+        """Test that a refresh builds a new version next to the live one before promoting it."""
+        mock_db_client = mock_chroma.return_value
+        mock_db_client.list_collections.return_value = []
+        (temp_data_dir / "test.txt").write_text("content")
+        
+        engine = RAGEngine(str(temp_data_dir), str(temp_chroma_dir))
+        assert engine.collection_name == "eu5_docs"
+        
+        name = engine.refresh_index()
+        
+        assert name == "eu5_docs_v1"
+        mock_db_client.get_or_create_collection.assert_called_with("eu5_docs_v1")
+        mock_builder.return_value.build.assert_called_once()
+        assert engine.versions.active() == "eu5_docs_v1"
+
+    @patch('rag_engine.copy_collection', return_value=10)
+    @patch('rag_engine.IndexBuilder')
+    @patch('rag_engine.ChromaVectorStore')
+    def test_sharded_update_only_versions_changed_shard(self, mock_cvs, mock_builder, mock_copy, mock_chroma,
+                                                        temp_data_dir, temp_chroma_dir):
+        """Test that a changed Tinto Talks file leaves the wiki shard's version alone."""
+        mock_db_client = mock_chroma.return_value
+        mock_builder.return_value.build.return_value = {"nodes": 3}
+        (temp_data_dir / "Estates.txt").write_text("content")
+        (temp_data_dir / "tinto_talk_1.txt").write_text("content")
+
+        with patch('rag_engine.SHARDED_INDEX', True), patch('shards.SHARDED_INDEX', True):
+            engine = RAGEngine(str(temp_data_dir), str(temp_chroma_dir))
+            for versions in engine.shard_versions.values():
+                versions.promote(versions.reserve_next())
+            mock_db_client.list_collections.return_value = []
+
+            version = engine.update_documents(["tinto_talk_1.txt"])
+
+        assert version == "eu5_docs_wiki_v1+eu5_docs_tinto_v2+eu5_docs_manual_v1+eu5_docs_youtube_v1"
+        mock_db_client.get_collection.assert_called_with("eu5_docs_tinto_v1")
+        built_files = mock_builder.return_value.build.call_args.args[0]
+        assert [f.name for f in built_files] == ["tinto_talk_1.txt"]
+
+    @patch('rag_engine.copy_collection', return_value=10)
+    @patch('rag_engine.IndexBuilder')
+    @patch('rag_engine.ChromaVectorStore')
+    def test_update_reembeds_copies_of_changed_file(self, mock_cvs, mock_builder, mock_copy, mock_chroma,
+                                                    temp_data_dir, temp_chroma_dir):
+        """Test that chunks dropped as copies of a deleted wiki page are embedded again."""
+        mock_db_client = mock_chroma.return_value
+        mock_db_client.list_collections.return_value = []
+        mock_builder.return_value.build.return_value = {"nodes": 3}
+        (temp_data_dir / "manual_estates.txt").write_text("content")
+
+        engine = RAGEngine(str(temp_data_dir), str(temp_chroma_dir))
+        engine.versions.promote(engine.versions.reserve_next())
+        (temp_chroma_dir / "dedup_eu5_docs_v1.json").write_text(
+            json.dumps({"Estates.txt": ["manual_estates.txt"], "Trade.txt": ["youtube_trade.txt"]}))
+
+        name = engine.update_documents(["Estates.txt"])
+
+        assert mock_copy.call_args.kwargs["exclude_doc_ids"] == {"Estates.txt", "manual_estates.txt"}
+        built_files = mock_builder.return_value.build.call_args.args[0]
+        assert [f.name for f in built_files] == ["manual_estates.txt"]
+        assert json.loads((temp_chroma_dir / f"dedup_{name}.json").read_text()) == \
+            {"Trade.txt": ["youtube_trade.txt"]}
+
+    @patch('rag_engine.register_collection')
+    @patch('rag_engine.IndexBuilder')
+    @patch('rag_engine.VectorStoreIndex')
+    @patch('rag_engine.ChromaVectorStore')
+    @patch('rag_engine.StorageContext')
+    def test_sharded_load_skips_empty_shards_without_files(self, mock_storage_ctx, mock_cvs, mock_vsi, mock_builder,
+                                                           mock_register, mock_chroma, temp_data_dir, temp_chroma_dir):
+        """Test that loading never builds or seeds dedup for shards with nothing to index."""
+        counts = {"eu5_docs_wiki": 100, "eu5_docs_tinto": 40, "eu5_docs_manual": 5, "eu5_docs_youtube": 0}
+        mock_chroma.return_value.get_or_create_collection.side_effect = \
+            lambda name: MagicMock(count=MagicMock(return_value=counts[name]))
+        (temp_data_dir / "Estates.txt").write_text("content")
+
+        with patch('rag_engine.SHARDED_INDEX', True), patch('shards.SHARDED_INDEX', True):
+            index = RAGEngine(str(temp_data_dir), str(temp_chroma_dir)).load_index()
+
+        assert sorted(index.indexes) == ["manual", "tinto", "wiki"]
+        mock_builder.assert_not_called()
+        mock_register.assert_not_called()
@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from scheduler import IngestionScheduler
+
+HOUR = 3600
+
+class TestIngestionScheduler:
+
+    @pytest.fixture
+    def ingestor(self, temp_data_dir):
+        ingestor = MagicMock()
+        ingestor.data_dir = temp_data_dir
+        ingestor.filename_for_url.side_effect = lambda url, prefix="": prefix + url.split("/")[-1] + ".txt"
+        return ingestor
+
+    @pytest.fixture(autouse=True)
+    def no_sleep(self):
+        with patch('scheduler.time.sleep'):
+            yield
+
+    def _scheduler(self, ingestor, on_change):
+        sources = [
+            ("https://wiki/Estate", "", "stable"),
+            ("https://forum/tinto-talks-1", "tinto_", "hot"),
+        ]
+        return IngestionScheduler(ingestor, on_change, sources=sources,
+                                  intervals={"hot": HOUR, "stable": 24 * HOUR})
+
+    def test_hot_sources_are_checked_first_and_more_often(self, ingestor):
+        """Test that due sources are ordered by priority and respect their interval."""
+        scheduler = self._scheduler(ingestor, MagicMock())
+        now = 100 * HOUR
+        assert [s[0] for s in scheduler.due_sources(now)] == ["https://forum/tinto-talks-1", "https://wiki/Estate"]
+
+        ingestor.scrape_url.return_value = True
+        ingestor.manifest.get.return_value = None
+        scheduler.run_once(now)
+
+        # Two hours later only the hot source is due again
+        assert [s[0] for s in scheduler.due_sources(now + 2 * HOUR)] == ["https://forum/tinto-talks-1"]
+
+    def test_only_changed_files_trigger_index_update(self, ingestor):
+        """Test that pages whose content hash did not change are not re-indexed."""
+        on_change = MagicMock()
+        scheduler = self._scheduler(ingestor, on_change)
+
+        hashes = {"Estate.txt": ["aaa", "aaa"], "tinto_tinto-talks-1.txt": ["bbb", "ccc"]}
+        ingestor.manifest.get.side_effect = lambda name: {"sha256": hashes[name].pop(0)}
+        ingestor.scrape_url.return_value = True
+
+        changed = scheduler.run_once(100 * HOUR)
+
+        assert changed == ["tinto_tinto-talks-1.txt"]
+        on_change.assert_called_once_with(["tinto_tinto-talks-1.txt"])
+
+    def test_failed_scrape_is_retried_next_cycle(self, ingestor):
+        """Test that a source is not marked as checked when scraping failed."""
+        scheduler = self._scheduler(ingestor, MagicMock())
+        ingestor.scrape_url.return_value = False
+
+        scheduler.run_once(100 * HOUR)
+        assert len(scheduler.due_sources(100 * HOUR + 1)) == 2
+
+    def test_changed_tinto_thread_is_found_by_url(self, temp_data_dir):
+        """Test that a Tinto Talks thread (URL ending in '/', file named after the page title) is tracked."""
+        from ingestion import DataIngestor, TINTO_TALKS_URLS
+        url = TINTO_TALKS_URLS[0]
+        filename = "tinto_Tinto_Talks_#1_-_February_28th_2024_Paradox_Interactive_Forums.txt"
+        ingestor = DataIngestor(str(temp_data_dir))
+
+        def save(content):
+            (temp_data_dir / filename).write_text(content, encoding="utf-8")
+            ingestor.manifest.record(filename, content, url=url, prefix="tinto_", etag='"v1"')
+
+        save("first version of the thread")
+        assert ingestor.filename_for_url(url, "tinto_") == filename
+
+        on_change = MagicMock()
+        scheduler = IngestionScheduler(ingestor, on_change, sources=[(url, "tinto_", "hot")],
+                                       intervals={"hot": HOUR, "stable": 24 * HOUR})
+        with patch.object(ingestor, "scrape_url", side_effect=lambda u, prefix="": save("new replies") or True):
+            changed = scheduler.run_once(100 * HOUR)
+
+        assert changed == [filename]
+        on_change.assert_called_once_with([filename])
+
+    def test_tinto_threads_are_not_scraped_when_polled_via_rss(self, ingestor):
+        """Test that RSS-followed Tinto threads are not also scraped into a second file."""
+        from ingestion import TINTO_TALKS_URLS
+        scraped = IngestionScheduler(ingestor, MagicMock())
+        polled = IngestionScheduler(ingestor, MagicMock(), tinto_poller=MagicMock())
+
+        assert TINTO_TALKS_URLS[0] in [s[0] for s in scraped.sources]
+        assert not any(prefix == "tinto_" for _, prefix, _ in polled.sources)
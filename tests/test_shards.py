@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from llama_index.core.schema import NodeWithScore, TextNode
+from shards import SHARDS, ShardedIndex, active_version, shard_collections, shard_for, shard_versions
+
+
+def shard_index(scores):
+    """Index whose retriever returns one node per score."""
+    index = MagicMock()
+    index.as_retriever.return_value.retrieve.return_value = [
+        NodeWithScore(node=TextNode(text=f"{score}"), score=score) for score in scores
+    ]
+    return index
+
+
+class TestShards:
+
+    @pytest.mark.parametrize("filename,shard", [
+        ("Estates.txt", "wiki"),
+        ("tinto_Tinto_Talks_42.txt", "tinto"),
+        ("manual_notes.txt", "manual"),
+        ("youtube_abc123.txt", "youtube"),
+    ])
+    def test_shard_for(self, filename, shard):
+        assert shard_for(filename) == shard
+
+    def test_version_names_every_shard(self, temp_chroma_dir):
+        versions = shard_versions(str(temp_chroma_dir))
+        versions["tinto"].promote(versions["tinto"].reserve_next())
+
+        with patch('shards.SHARDED_INDEX', True):
+            version = active_version(str(temp_chroma_dir))
+
+        assert shard_collections(version) == {"wiki": "eu5_docs_wiki", "tinto": "eu5_docs_tinto_v1",
+                                              "manual": "eu5_docs_manual", "youtube": "eu5_docs_youtube"}
+        # The unsharded pointer is untouched
+        with patch('shards.SHARDED_INDEX', False):
+            assert active_version(str(temp_chroma_dir)) == "eu5_docs"
+
+    def test_retriever_merges_shards_by_score(self):
+        index = ShardedIndex({"wiki": shard_index([0.9, 0.5]), "tinto": shard_index([0.8, 0.7])})
+
+        retriever = index.as_retriever(similarity_top_k=3)
+        with patch('shards.cached_query_embedding', return_value=[0.1, 0.2]) as embed:
+            nodes = retriever.retrieve("How do estates work?")
+
+        assert [n.score for n in nodes] == [0.9, 0.8, 0.7]
+        # One query embedding for all shards
+        embed.assert_called_once()
+
+    def test_subset_searches_only_chosen_shards(self):
+        wiki, tinto = shard_index([0.9]), shard_index([0.8])
+        index = ShardedIndex({"wiki": wiki, "tinto": tinto})
+
+        with patch('shards.cached_query_embedding', return_value=[0.1, 0.2]):
+            nodes = index.subset(["tinto"]).as_retriever(similarity_top_k=3).retrieve("Tinto Talks on trade")
+
+        assert [n.score for n in nodes] == [0.8]
+        wiki.as_retriever.assert_not_called()
+        with pytest.raises(ValueError):
+            index.subset(["forum"])
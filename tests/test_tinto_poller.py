@@ -0,0 +1,91 @@
+import pytest
+from http.server import BaseHTTPRequestHandler
+from ingestion import DataIngestor
+from scheduler import IngestionScheduler
+from tinto_poller import TintoPoller, parse_feed
+
+THREAD_URL = "https://forum.paradoxplaza.com/forum/developer-diary/tinto-talks-5-march-27th-2024.1647775/"
+
+def item(post_id, text, date="Wed, 27 Mar 2024 10:00:00 +0000"):
+    return (f"<item><link>https://forum.paradoxplaza.com/forum/threads/tinto.1647775/post-{post_id}</link>"
+            f"<pubDate>{date}</pubDate><dc:creator>Johan</dc:creator>"
+            f"<description><![CDATA[<p>{text}</p>]]></description></item>")
+
+def feed(items):
+    return ('<?xml version="1.0"?><rss xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+            + "".join(items) + "</channel></rss>").encode("utf-8")
+
+
+@pytest.fixture
+def forum(http_server):
+    state = {"items": [], "etag": '"v1"', "requests": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"].append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == state["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = feed(state["items"])
+            self.send_response(200)
+            self.send_header("ETag", state["etag"])
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    state["url"] = http_server(Handler) + "/index.rss"
+    return state
+
+
+class TestTintoPoller:
+
+    def test_parse_feed_orders_posts_by_id(self):
+        posts = parse_feed(feed([item(20, "reply"), item(10, "diary")]))
+        assert [p["id"] for p in posts] == [10, 20]
+        assert posts[0]["date"] == "2024-03-27"
+        assert posts[0]["author"] == "Johan"
+
+    def test_poll_appends_only_new_posts(self, forum, temp_data_dir):
+        """Test that a second poll appends the new reply and leaves earlier posts alone."""
+        ingestor = DataIngestor(str(temp_data_dir))
+        poller = TintoPoller(ingestor, urls=[THREAD_URL], per_host_interval=0,
+                             rss_url=lambda url: forum["url"])
+        forum["items"] = [item(10, "Estates are reworked."), item(11, "Great diary!")]
+
+        changed = poller.poll()
+        assert changed == ["tinto_rss_tinto-talks-5-march-27th-2024.1647775.txt"]
+        path = temp_data_dir / changed[0]
+
+        # Unchanged feed: conditional request, no document change
+        assert poller.poll() == []
+        assert forum["requests"][-1] == '"v1"'
+
+        forum["items"].append(item(12, "When is the release?"))
+        forum["etag"] = '"v2"'
+        assert poller.poll() == changed
+
+        content = path.read_text(encoding="utf-8")
+        assert content.startswith(f"Source URL: {THREAD_URL}\nSource Date: 2024-03-27")
+        assert [line for line in content.splitlines() if line.startswith("=== Post")] == [
+            "=== Post 10 (Johan) ===", "=== Post 11 (Johan) ===", "=== Post 12 (Johan) ==="]
+
+    def test_polled_thread_replaces_its_scraped_copy(self, forum, temp_data_dir):
+        """Test that a thread followed via RSS is indexed once: the scraped file goes and is not re-scraped."""
+        ingestor = DataIngestor(str(temp_data_dir))
+        ingestor._save_document("tinto_Tinto_Talks_5.txt", THREAD_URL, "2024-03-27", "Estates are reworked. " * 20,
+                                prefix="tinto_")
+        poller = TintoPoller(ingestor, urls=[THREAD_URL], per_host_interval=0,
+                             rss_url=lambda url: forum["url"])
+        forum["items"] = [item(10, "Estates are reworked.")]
+
+        changed = poller.poll()
+
+        assert changed == ["tinto_rss_tinto-talks-5-march-27th-2024.1647775.txt", "tinto_Tinto_Talks_5.txt"]
+        assert not (temp_data_dir / "tinto_Tinto_Talks_5.txt").exists()
+        assert "tinto_Tinto_Talks_5.txt" not in DataIngestor(str(temp_data_dir)).manifest
+        scheduler = IngestionScheduler(DataIngestor(str(temp_data_dir)), on_change=lambda files: None)
+        assert THREAD_URL not in [url for url, _, _ in scheduler.sources]
@@ -0,0 +1,71 @@
+import json
+import pytest
+from http.server import BaseHTTPRequestHandler
+from url_health import UrlHealthChecker, HostRateLimiter, write_report, load_dead_urls
+
+@pytest.fixture
+def site(http_server):
+    """Local site with a working page, a redirect, a removed page and a HEAD-hostile page."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, with_body):
+            if self.path == "/old":
+                self.send_response(301)
+                self.send_header("Location", "/page")
+            elif self.path == "/page":
+                self.send_response(200)
+            elif self.path == "/no-head" and self.command == "HEAD":
+                self.send_response(405)
+            elif self.path == "/no-head":
+                self.send_response(200)
+            else:
+                self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_HEAD(self):
+            self._respond(False)
+
+        def do_GET(self):
+            self._respond(True)
+
+        def log_message(self, *args):
+            pass
+
+    return http_server(Handler)
+
+class TestUrlHealthChecker:
+
+    def test_check_all_classifies_urls(self, site):
+        """Test statuses, redirect capture and HEAD -> GET fallback in one concurrent run."""
+        urls = [f"{site}/page", f"{site}/old", f"{site}/gone", f"{site}/no-head"]
+        results = UrlHealthChecker(max_workers=4, per_host_interval=0).check_all(urls)
+
+        page, old, gone, no_head = results
+        assert page["ok"] and not page["redirects"]
+        assert old["ok"] and old["final_url"] == f"{site}/page"
+        assert old["redirects"] == [{"url": f"{site}/old", "status": 301}]
+        assert gone["dead"] and gone["status"] == 404
+        assert no_head["ok"] and no_head["method"] == "GET"
+
+    def test_report_round_trip(self, site, tmp_path):
+        """Test that dead URLs in the JSON report can be loaded by the ingestor."""
+        results = UrlHealthChecker(per_host_interval=0).check_all([f"{site}/page", f"{site}/gone"])
+        report_path = tmp_path / "url_report.json"
+        write_report(results, report_path)
+
+        assert json.loads(report_path.read_text())["summary"]["dead"] == 1
+        assert load_dead_urls(report_path) == {f"{site}/gone"}
+        assert load_dead_urls(tmp_path / "missing.json") == set()
+
+    def test_rate_limiter_spaces_same_host(self, monkeypatch):
+        """Test that a second request to the same host waits for its slot."""
+        sleeps = []
+        monkeypatch.setattr("url_health.time.sleep", sleeps.append)
+        limiter = HostRateLimiter(min_interval=1.0)
+
+        limiter.wait("https://wiki.example/a")
+        limiter.wait("https://forum.example/a")
+        limiter.wait("https://wiki.example/b")
+
+        assert len(sleeps) == 1 and 0.9 < sleeps[0] <= 1.0
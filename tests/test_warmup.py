@@ -0,0 +1,85 @@
+import json
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, patch
+import warmup
+from warmup import Readiness, make_ready_server, warm_up
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestWarmUp:
+
+    @patch('warmup.Settings')
+    @patch('warmup.AdaptiveRetriever')
+    @patch('warmup.load_engine')
+    def test_warm_up_runs_every_step(self, mock_load, mock_router, mock_settings, temp_chroma_dir):
+        index = MagicMock()
+        mock_load.return_value = (MagicMock(), index)
+        readiness = Readiness()
+
+        with patch('llm_factory.start_ollama_server', return_value=(True, "started")) as start, \
+                patch('llm_factory.preload_ollama_model') as preload:
+            warm_up("data", str(temp_chroma_dir), questions=["How do estates work?"], model="llama3.1:8b",
+                    readiness=readiness)
+
+        assert readiness.ready
+        assert list(readiness.snapshot()["steps_ms"]) == ["load_index", "embedding", "retrieval", "replay", "llm"]
+        mock_router.return_value.retrieve.assert_called_once_with("How do estates work?")
+        start.assert_called_once()
+        preload.assert_called_once()
+
+    @patch('warmup.Settings')
+    @patch('warmup.AdaptiveRetriever')
+    @patch('warmup.load_engine')
+    def test_logged_questions_are_read_on_the_warm_up_thread(self, mock_load, mock_router, mock_settings,
+                                                             temp_chroma_dir):
+        mock_load.return_value = (MagicMock(), MagicMock())
+
+        with patch('warmup.top_logged_questions', return_value=["What is crown power?"]) as top, \
+                patch('warmup.threading.Thread') as thread, patch('warmup._started', False):
+            assert warmup.start("data", str(temp_chroma_dir), log_dir="query_logs")
+            top.assert_not_called()
+            # Run the thread's target here instead
+            kwargs = thread.call_args.kwargs
+            kwargs["target"](*kwargs["args"], model=None, readiness=Readiness(), **kwargs["kwargs"])
+
+        top.assert_called_once_with("query_logs")
+        mock_router.return_value.retrieve.assert_called_once_with("What is crown power?")
+
+    @patch('warmup.load_engine', side_effect=RuntimeError("chroma_db is locked"))
+    def test_failed_index_load_is_not_ready(self, mock_load, temp_chroma_dir):
+        readiness = warm_up("data", str(temp_chroma_dir), model=None, readiness=Readiness())
+
+        assert readiness.snapshot()["status"] == "failed"
+        assert "locked" in readiness.snapshot()["error"]
+
+    @patch('warmup.Settings')
+    @patch('warmup.load_engine')
+    def test_llm_preload_failure_still_ready(self, mock_load, mock_settings, temp_chroma_dir):
+        mock_load.return_value = (MagicMock(), MagicMock())
+
+        with patch('llm_factory.start_ollama_server', return_value=(False, "Ollama not found!")), \
+                patch('llm_factory.preload_ollama_model') as preload:
+            readiness = warm_up("data", str(temp_chroma_dir), model="llama3.1:8b", readiness=Readiness())
+
+        assert readiness.ready
+        assert "llm" not in readiness.snapshot()["steps_ms"]
+        preload.assert_not_called()
+
+    def test_ready_endpoint(self, http_server):
+        readiness = Readiness()
+        url = http_server(make_ready_server(readiness, host="127.0.0.1", port=0))
+
+        assert get(url + "/health")[0] == 200
+        status, body = get(url + "/ready")
+        assert status == 503 and body["status"] == "starting"
+
+        readiness.mark_ready()
+        assert get(url + "/ready")[0] == 200
@@ -0,0 +1,107 @@
+import pytest
+from urllib.parse import urlparse, parse_qs
+from ingestion import DataIngestor
+from json_store import JsonRequestHandler
+from wiki_api import MediaWikiClient, WikiApiSync, TITLES_PER_REQUEST
+
+BODY = "<p>" + "Estates hold power over your country. " * 20 + "</p>"
+
+class FakeWiki:
+    """Minimal stand-in for the MediaWiki action API, served from a local HTTP server."""
+
+    def __init__(self):
+        self.pages = {}
+        self.changes = []
+        self.requests = []
+        self.failing = set()
+        self.now = "2025-12-15T00:00:00Z"
+
+    def edit(self, title, revid, timestamp="2025-12-01T10:00:00Z"):
+        self.pages[title] = {"revid": revid, "timestamp": timestamp,
+                             "html": f'<div class="mw-parser-output"><h2>{title}</h2>{BODY} rev {revid}</div>'}
+        self.changes.append({"title": title, "timestamp": timestamp})
+        self.now = max(self.now, timestamp)
+
+    def handle(self, params):
+        self.requests.append(params)
+        if params["action"] == "parse":
+            if params["page"] in self.failing:
+                return {"error": {"info": "internal_api_error"}}
+            page = self.pages[params["page"]]
+            return {"parse": {"title": params["page"], "revid": page["revid"], "text": page["html"]}}
+        if params.get("list") == "recentchanges":
+            since = params["rcstart"]
+            return {"curtimestamp": self.now,
+                    "query": {"recentchanges": [c for c in self.changes if c["timestamp"] > since]}}
+        if params.get("prop") == "revisions":
+            pages = [{"title": t, "revisions": [self.pages[t]]} if t in self.pages else {"title": t, "missing": True}
+                     for t in params["titles"].split("|")]
+            return {"query": {"pages": pages}}
+        return {"curtimestamp": self.now}
+
+
+@pytest.fixture
+def fake_wiki(http_server):
+    wiki = FakeWiki()
+
+    class Handler(JsonRequestHandler):
+        def do_GET(self):
+            params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            self._send(200, wiki.handle(params))
+
+    wiki.api_url = http_server(Handler) + "/api.php"
+    return wiki
+
+
+class TestWikiApiSync:
+
+    def test_revisions_are_fetched_in_bulk(self, fake_wiki):
+        """Test that revision ids for many pages cost one request per TITLES_PER_REQUEST titles."""
+        titles = [f"Page {i}" for i in range(TITLES_PER_REQUEST + 10)]
+        for i, title in enumerate(titles):
+            fake_wiki.edit(title, revid=i + 1)
+
+        revisions = MediaWikiClient(fake_wiki.api_url).revisions(titles)
+
+        assert len(revisions) == len(titles)
+        assert len(fake_wiki.requests) == 2
+
+    def test_sync_only_refetches_edited_pages(self, fake_wiki, temp_data_dir):
+        """Test the full cycle: baseline via bulk revisions, then change feed polling."""
+        urls = ["https://eu5.paradoxwikis.com/Estate", "https://eu5.paradoxwikis.com/Beginner%27s_guide"]
+        fake_wiki.edit("Estate", revid=10)
+        fake_wiki.edit("Beginner's guide", revid=20)
+        ingestor = DataIngestor(str(temp_data_dir))
+        sync = WikiApiSync(ingestor, MediaWikiClient(fake_wiki.api_url), urls=urls)
+
+        assert sorted(sync.sync()) == ["Beginner%27s_guide.txt", "Estate.txt"]
+        assert "Estates hold power" in (temp_data_dir / "Estate.txt").read_text(encoding="utf-8")
+        assert ingestor.manifest.get("Estate.txt")["revid"] == 10
+
+        # Nothing edited: one change-feed request and no page fetches
+        fake_wiki.requests.clear()
+        assert sync.sync() == []
+        assert len(fake_wiki.requests) == 1
+
+        # One edit: only that page is parsed again
+        fake_wiki.edit("Estate", revid=11, timestamp="2025-12-20T08:00:00Z")
+        fake_wiki.requests.clear()
+        assert sync.sync() == ["Estate.txt"]
+        assert [r["page"] for r in fake_wiki.requests if r["action"] == "parse"] == ["Estate"]
+        assert ingestor.manifest.get("Estate.txt")["date"] == "2025-12-20"
+
+    def test_failed_fetch_is_retried_after_cursor_moves_on(self, fake_wiki, temp_data_dir):
+        """Test that an edit whose fetch failed is not lost when the change-feed cursor advances."""
+        urls = ["https://eu5.paradoxwikis.com/Estate"]
+        fake_wiki.edit("Estate", revid=10)
+        ingestor = DataIngestor(str(temp_data_dir))
+        sync = WikiApiSync(ingestor, MediaWikiClient(fake_wiki.api_url), urls=urls)
+        sync.sync()
+
+        fake_wiki.edit("Estate", revid=11, timestamp="2025-12-20T08:00:00Z")
+        fake_wiki.failing.add("Estate")
+        assert sync.sync() == []
+
+        fake_wiki.failing.clear()
+        assert sync.sync() == ["Estate.txt"]
+        assert ingestor.manifest.get("Estate.txt")["revid"] == 11
@@ -0,0 +1,30 @@
+from youtube_transcripts import TranscriptCache, merge_segments, video_id_from_url
+
+class TestYouTubeTranscripts:
+
+    def test_video_id_from_url(self):
+        assert video_id_from_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42") == "dQw4w9WgXcQ"
+        assert video_id_from_url("https://youtu.be/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+        assert video_id_from_url(" dQw4w9WgXcQ ") == "dQw4w9WgXcQ"
+
+    def test_merge_segments_into_paragraphs(self):
+        """Test that fragments are joined, noise dropped and pauses start a new paragraph."""
+        segments = [
+            {"text": "welcome back", "start": 0.0, "duration": 1.0},
+            {"text": "[Music]", "start": 1.0, "duration": 1.0},
+            {"text": "today we look\nat estates", "start": 1.2, "duration": 2.0},
+            {"text": "first the nobility", "start": 10.0, "duration": 2.0},
+        ]
+        assert merge_segments(segments) == ["welcome back today we look at estates", "first the nobility"]
+
+    def test_merge_segments_caps_unpunctuated_paragraphs(self):
+        segments = [{"text": "word " * 20, "start": i * 1.0, "duration": 1.0} for i in range(30)]
+        paragraphs = merge_segments(segments, max_chars=200)
+        assert len(paragraphs) > 1
+        assert all(len(p) <= 2 * 200 + 100 for p in paragraphs)
+
+    def test_cache_round_trip(self, tmp_path):
+        cache = TranscriptCache(str(tmp_path / "youtube_cache"))
+        assert cache.get("abc") is None
+        cache.put("abc", "EU5 Economy Guide", [{"text": "hi", "start": 0.0, "duration": 1.0}])
+        assert cache.get("abc")["title"] == "EU5 Economy Guide"
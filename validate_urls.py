@@ -1,45 +1,44 @@
-import requests
-from src.ingestion import CORE_WIKI_URLS
-import time
-
-def check_url(url):
-    """Check if a URL returns a valid response."""
-    try:
-        response = requests.head(url, timeout=10, allow_redirects=True)
-        if response.status_code == 200:
-            return True, response.status_code
-        else:
-            # Try GET as some servers don't support HEAD
-            response = requests.get(url, timeout=10)
-            return response.status_code == 200, response.status_code
-    except Exception as e:
-        return False, str(e)
-
-print(f"Checking {len(CORE_WIKI_URLS)} URLs...\n")
-
-broken_urls = []
-working_urls = []
-
-for i, url in enumerate(CORE_WIKI_URLS, 1):
-    is_valid, status = check_url(url)
-    
-    if is_valid:
-        working_urls.append(url)
-        print(f"✅ [{i}/{len(CORE_WIKI_URLS)}] {url}")
+import sys
+from pathlib import Path
+
+# Add src to path (ingestion imports its sibling modules by bare name)
+sys.path.append(str(Path(__file__).parent / "src"))
+
+from ingestion import CORE_WIKI_URLS, TINTO_TALKS_URLS
+from url_health import UrlHealthChecker, write_report, REPORT_FILENAME
+
+urls = CORE_WIKI_URLS + (TINTO_TALKS_URLS if "--include-tinto" in sys.argv else [])
+report_path = Path(__file__).parent / REPORT_FILENAME
+
+print(f"Checking {len(urls)} URLs...\n")
+
+done = 0
+
+def print_result(result):
+    """Prints each result as soon as its worker finishes."""
+    global done
+    done += 1
+    if result["ok"]:
+        moved = f" -> {result['final_url']}" if result["redirects"] else ""
+        print(f"✅ [{done}/{len(urls)}] {result['url']}{moved}")
     else:
-        broken_urls.append((url, status))
-        print(f"❌ [{i}/{len(CORE_WIKI_URLS)}] {url} - Status: {status}")
-    
-    # Be polite to the server
-    time.sleep(0.5)
+        print(f"❌ [{done}/{len(urls)}] {result['url']} - Status: {result['status'] or result['error']}")
+
+# Concurrent checks share one connection pool; the per-host limiter keeps us polite
+results = UrlHealthChecker().check_all(urls, on_result=print_result)
+write_report(results, report_path)
+
+broken_urls = [r for r in results if not r["ok"]]
+dead_urls = [r for r in results if r["dead"]]
 
 print(f"\n{'='*80}")
 print(f"Summary:")
-print(f"Working URLs: {len(working_urls)}")
-print(f"Broken URLs: {len(broken_urls)}")
+print(f"Working URLs: {len(results) - len(broken_urls)}")
+print(f"Broken URLs: {len(broken_urls)} ({len(dead_urls)} gone for good, skipped by the next ingest)")
+print(f"Report written to {report_path}")
 
 if broken_urls:
     print(f"\n{'='*80}")
     print("Broken URLs to remove:")
-    for url, status in broken_urls:
-        print(f"  - {url} (Status: {status})")
+    for r in broken_urls:
+        print(f"  - {r['url']} (Status: {r['status'] or r['error']})")